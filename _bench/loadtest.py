@@ -0,0 +1,476 @@
+'''------------------------------------------------------------------------------------------------
+Program:    loadtest.py
+Version:    0.2.0
+Py Ver:     2.7
+Purpose:    Load test for the registration and scoreboard apps; simulates an event's displays,
+            registration kiosks and operator, and reports latency, throughput and database
+            queries per request.
+
+Dependents: argparse
+            json
+            random
+            re
+            seed
+            threading
+            time
+            urllib
+            urllib2
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The apps must be running, and connected to the database seeded by seed.py.
+
+Use:        > python loadtest.py
+            > python loadtest.py --duration 120 --displays 20 --json results.json
+            > python loadtest.py --baseline results.json
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       Registrations post the avatar's name, rather than its URL,
+                                        as the registration page now does.
+------------------------------------------------------------------------------------------------'''
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib
+import urllib2
+
+import seed
+
+
+#PROMETHEUS QUERY COUNTER SAMPLES: db_query_seconds_count{query="qry_name"} 12
+RE_QUERY_COUNT = re.compile(r'^db_query_seconds_count\{query="([^"]*)"\}\s+(\S+)$', re.M)
+
+
+class NoRedirect(urllib2.HTTPRedirectHandler):
+
+    '''
+    PURPOSE:
+    Redirects are not followed; so an operator action is timed alone,
+    rather than with the scoreboard page it redirects to.
+    '''
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS NO REDIRECT REQUEST
+    def redirect_request(self, *args, **kwargs):
+
+        return None
+
+
+class Recorder(object):
+
+    '''
+    PURPOSE:
+    This class records the latency of each request, and the errors,
+    under a label (e.g. 'display GET /'); for all actor threads.
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, timeout):
+
+        self._lock      = threading.Lock()
+        self._opener    = urllib2.build_opener(NoRedirect)
+        self._timeout   = timeout
+        self.latencies  = dict()
+        self.errors     = dict()
+        self.counters   = dict()
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION MAKES AND TIMES A REQUEST
+    def request(self, label, url, data=None, headers=None):
+
+        '''
+        PURPOSE:
+        The request() function makes the request, records its latency
+        under the passed label, and returns the response body; or None
+        if the request failed.
+
+        DESIGN:
+        A redirect (3xx) response is a success.  Any other error, or a
+        timeout, is counted as an error; and its latency is not
+        recorded.
+        '''
+
+        req = urllib2.Request(url, data=data, headers=headers or dict())
+        start = time.time()
+        body = None
+
+        try:
+            body = self._opener.open(req, timeout=self._timeout).read()
+
+        except urllib2.HTTPError as err:
+            if not 300 <= err.code < 400:
+                self.count(self.errors, label)
+                return None
+            body = ''
+
+        except Exception:
+            self.count(self.errors, label)
+            return None
+
+        with self._lock:
+            self.latencies.setdefault(label, list()).append(time.time() - start)
+
+        return body
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO INCREMENT A COUNTER
+    def count(self, counters, label):
+
+        with self._lock:
+            counters[label] = counters.get(label, 0) + 1
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS A PERCENTILE OF A LIST OF VALUES
+def percentile(values, pct):
+
+    '''
+    PURPOSE:
+    The percentile() function returns the nearest-rank percentile of
+    the passed values.
+    '''
+
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1)
+
+    return ordered[min(index, len(ordered) - 1)]
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE QUERY COUNTS FROM AN APP'S METRICS
+def query_counts(rec, url):
+
+    '''
+    PURPOSE:
+    The query_counts() function returns a dictionary of
+    {statement name: executions} from the app's /metrics route; or an
+    empty dictionary if the metrics are not available.
+    '''
+
+    body = rec.request(label='metrics', url=url + '/metrics')
+
+    return dict((name, float(val)) for name, val in RE_QUERY_COUNT.findall(body or ''))
+
+
+#-----------------------------------------------------------------------
+#ACTOR: SCOREBOARD DISPLAY
+def display(cfg, rec, stop):
+
+    '''
+    PURPOSE:
+    A scoreboard display; loads the scoreboard page every
+    'load_display_interval' seconds.
+    '''
+
+    #STAGGER DISPLAYS
+    stop.wait(random.random() * cfg['load_display_interval'])
+
+    while not stop.is_set():
+        start = time.time()
+        rec.request(label='display GET /', url=cfg['scoreboard_url'] + '/')
+        stop.wait(max(0, cfg['load_display_interval'] - (time.time() - start)))
+
+
+#-----------------------------------------------------------------------
+#ACTOR: REGISTRATION KIOSKS
+def registration(cfg, rec, stop):
+
+    '''
+    PURPOSE:
+    A burst of 'load_burst_size' simultaneous registrations, every
+    'load_burst_interval' seconds; as when a group arrives at the
+    registration kiosks.
+
+    DESIGN:
+    Aliases are picked at random from the registration page's options;
+    so some registrations are rejected as the alias is already taken,
+    as at an event.  Both outcomes are counted.
+    '''
+
+    images = ('alien.png', 'bart.png', 'ninja.png', 'tux.png', 'viking.png')
+
+    def register():
+        colour = random.choice(seed.COLOURS)
+        animal = random.choice(seed.ANIMALS)
+        number = random.choice(seed.NUMBERS)
+        form = dict(colour=colour, animal=animal, number=number,
+                    email='%s%s%s@example.com' % (colour, animal, number),
+                    phone='07700900%03d' % random.randint(0, 999),
+                    image_name=random.choice(images), submit='Register!')
+        body = rec.request(label='registration POST /add_rec',
+                           url=cfg['registration_url'] + '/add_rec', data=urllib.urlencode(form))
+        if body is not None:
+            rec.count(rec.counters, 'alias taken' if 'already been taken' in body
+                      else 'registered')
+
+    while not stop.wait(cfg['load_burst_interval']):
+        burst = [threading.Thread(target=register) for _ in range(cfg['load_burst_size'])]
+        for thread in burst:
+            thread.start()
+        for thread in burst:
+            thread.join()
+
+
+#-----------------------------------------------------------------------
+#ACTOR: OPERATOR AND GAME
+def operator(cfg, rec, stop, db_config):
+
+    '''
+    PURPOSE:
+    The operator's tablet and the game PC.  Every
+    'load_operator_interval' seconds, the scoreboard state is read;
+    then:
+        - if no player is playing, the first queued player is set to
+          playing (/player_playing)
+        - if a player has been playing for 'load_game_seconds', their
+          game is completed; the game's result is written to the
+          database directly, as by the game PC
+        - occasionally, a queued player is moved to the back of the
+          queue (/player_move) or removed (/player_delete)
+    '''
+
+    rnd = random.Random()
+    playing = dict()
+    conn = seed.connect(db_config)
+
+    try:
+        while not stop.wait(cfg['load_operator_interval']):
+            body = rec.request(label='operator GET /api/state',
+                               url=cfg['scoreboard_url'] + '/api/state')
+            if body is None:
+                continue
+
+            state = json.loads(body)
+            player = state['playing'].get('name') if state['playing'] else None
+            queue = [row['name'] for row in state['queue'] if row['name'] != player]
+
+            if not player and queue:
+                rec.request(label='operator /player_playing',
+                            url='%s/player_playing?alias=%s' % (cfg['scoreboard_url'],
+                                                                urllib.quote(queue[0])))
+                playing = {queue[0]: time.time()}
+
+            elif player and time.time() - playing.setdefault(player, time.time()) \
+                    >= cfg['load_game_seconds']:
+                complete_game(conn=conn, rnd=rnd, alias=player, points=cfg['seed_profile_points'])
+                rec.count(rec.counters, 'games completed')
+
+            elif len(queue) > 1 and rnd.random() < 0.2:
+                action = rnd.choice(('player_move', 'player_delete'))
+                rec.request(label='operator /%s' % action,
+                            url='%s/%s?alias=%s' % (cfg['scoreboard_url'], action,
+                                                    urllib.quote(rnd.choice(queue[1:]))))
+
+    finally:
+        conn.close()
+
+
+#-----------------------------------------------------------------------
+#METHOD USED TO WRITE A COMPLETED GAME (AS THE GAME PC)
+def complete_game(conn, rnd, alias, points):
+
+    actual, target, score = seed.profile(rnd=rnd, points=points, skill=rnd.betavariate(5, 2))
+    now = int(time.time())
+
+    cur = conn.cursor()
+    cur.execute('INSERT INTO gamedata (name, actualprofiledata, targetprofiledata, gamehighscore, '
+                'completiontime, profiled) VALUES (%s, %s, %s, %s, %s, 0)',
+                (alias, actual, target, score, now))
+    cur.execute("UPDATE avatardata SET status = 'COMPLETE', gamehighscore = %s, "
+                "completiontime = %s WHERE name = %s AND status = 'PLAYING'",
+                (score, now, alias))
+    conn.commit()
+    cur.close()
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RUNS THE LOAD TEST AND RETURNS THE RESULTS
+def run(cfg, db_config):
+
+    '''
+    PURPOSE:
+    The run() function starts the actor threads, waits for
+    'load_duration' seconds, stops the actors and returns the results
+    dictionary (refer to results()).
+
+    DESIGN:
+    The database query counters are read from each app's /metrics
+    route before and after the run; the difference is the number of
+    queries made during the run.
+    '''
+
+    rec = Recorder(timeout=cfg['load_timeout'])
+    stop = threading.Event()
+    apps = dict(registration=cfg['registration_url'], scoreboard=cfg['scoreboard_url'])
+    before = dict((app, query_counts(rec=rec, url=url)) for app, url in apps.items())
+
+    actors = [threading.Thread(target=display, args=(cfg, rec, stop))
+              for _ in range(cfg['load_displays'])]
+    actors.append(threading.Thread(target=registration, args=(cfg, rec, stop)))
+    actors.append(threading.Thread(target=operator, args=(cfg, rec, stop, db_config)))
+
+    started = time.time()
+    for actor in actors:
+        actor.daemon = True
+        actor.start()
+
+    try:
+        time.sleep(cfg['load_duration'])
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join()
+
+    elapsed = time.time() - started
+    after = dict((app, query_counts(rec=rec, url=url)) for app, url in apps.items())
+
+    return results(rec=rec, elapsed=elapsed, before=before, after=after)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION SUMMARISES THE RECORDED REQUESTS
+def results(rec, elapsed, before, after):
+
+    '''
+    PURPOSE:
+    The results() function returns a dictionary of:
+        - requests: {label: count, errors, rps, p50, p95, p99 (ms)}
+        - queries: {app: queries, requests, per_request, by_statement}
+        - counters: outcome counts (registered, alias taken, etc.)
+        - duration: seconds
+    '''
+
+    labels = set(rec.latencies) | set(rec.errors)
+    labels.discard('metrics')
+    requests = dict()
+
+    for label in labels:
+        times = rec.latencies.get(label, [])
+        requests[label] = dict(count=len(times), errors=rec.errors.get(label, 0),
+                               rps=round(len(times) / elapsed, 2))
+        for pct in (50, 95, 99):
+            requests[label]['p%d' % pct] = (round(percentile(times, pct) * 1000, 1)
+                                            if times else None)
+
+    queries = dict()
+    for app in after:
+        by_statement = dict((name, int(after[app][name] - before[app].get(name, 0)))
+                            for name in after[app])
+        total = sum(by_statement.values())
+        made = sum(val['count'] for label, val in requests.items()
+                   if (app == 'registration') == label.startswith('registration'))
+        queries[app] = dict(queries=total, requests=made,
+                            per_request=round(float(total) / made, 3) if made else None,
+                            by_statement=by_statement)
+
+    return dict(duration=round(elapsed, 1), requests=requests, queries=queries,
+                counters=rec.counters)
+
+
+#-----------------------------------------------------------------------
+#METHOD USED TO PRINT THE RESULTS
+def report(res):
+
+    print
+    print '%-34s %7s %6s %8s %9s %9s %9s' % ('REQUEST', 'COUNT', 'ERRORS', 'REQ/S',
+                                             'P50 MS', 'P95 MS', 'P99 MS')
+    for label in sorted(res['requests']):
+        row = res['requests'][label]
+        print '%-34s %7d %6d %8.2f %9s %9s %9s' % (label, row['count'], row['errors'],
+                                                   row['rps'], row['p50'], row['p95'],
+                                                   row['p99'])
+
+    print
+    print '%-34s %7s %8s %9s' % ('DATABASE', 'QUERIES', 'REQUESTS', 'PER REQ')
+    for app in sorted(res['queries']):
+        row = res['queries'][app]
+        print '%-34s %7d %8d %9s' % (app, row['queries'], row['requests'], row['per_request'])
+        for name in sorted(row['by_statement']):
+            print '    %-30s %7d' % (name, row['by_statement'][name])
+
+    print
+    for label in sorted(res['counters']):
+        print '%-34s %7d' % (label, res['counters'][label])
+    print 'Duration: %ss' % res['duration']
+
+
+#-----------------------------------------------------------------------
+#FUNCTION COMPARES THE RESULTS WITH A BASELINE
+def compare(res, baseline, tolerance):
+
+    '''
+    PURPOSE:
+    The compare() function returns a list of regression messages;
+    where a request's p95 latency, or an app's queries per request,
+    is more than 'tolerance' (e.g. 0.2 = 20%) higher than the
+    baseline results (as written by --json).
+    '''
+
+    found = list()
+
+    for label, row in res['requests'].items():
+        old = baseline['requests'].get(label, {}).get('p95')
+        if old and row['p95'] and row['p95'] > old * (1 + tolerance):
+            found.append('%s: p95 %sms (baseline %sms)' % (label, row['p95'], old))
+
+    for app, row in res['queries'].items():
+        old = baseline['queries'].get(app, {}).get('per_request')
+        if old and row['per_request'] and row['per_request'] > old * (1 + tolerance):
+            found.append('%s: %s queries per request (baseline %s)'
+                         % (app, row['per_request'], old))
+
+    return found
+
+
+#-----------------------------------------------------------------------
+#MAIN CONTROLLER
+def main():
+
+    parser = argparse.ArgumentParser(description='Load test the registration and scoreboard apps.')
+    parser.add_argument('--config', default='config.json', help='benchmark config file')
+    parser.add_argument('--duration', type=int, help='seconds to run')
+    parser.add_argument('--displays', type=int, help='number of scoreboard displays')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare the results with this results file')
+    args = parser.parse_args()
+
+    cfg = seed.load_config(args.config)
+    cfg['load_duration'] = args.duration or cfg['load_duration']
+    cfg['load_displays'] = args.displays or cfg['load_displays']
+
+    #NOTIFICATION
+    print 'Running for %ss with %d displays ...' % (cfg['load_duration'], cfg['load_displays'])
+
+    res = run(cfg=cfg, db_config=seed.load_config(cfg['db_config']))
+    report(res=res)
+
+    if args.json:
+        with open(args.json, 'w') as fjson:
+            json.dump(res, fjson, indent=2, sort_keys=True)
+
+    if args.baseline:
+        found = compare(res=res, baseline=seed.load_config(args.baseline),
+                        tolerance=cfg['load_tolerance'])
+        for msg in found:
+            print 'REGRESSION: %s' % msg
+        if found:
+            sys.exit(1)
+
+
+#-----------------------------------------------------------------------
+#RUN PROGRAM
+if __name__ == '__main__':
+
+    main()
@@ -0,0 +1,348 @@
+'''------------------------------------------------------------------------------------------------
+Program:    seed.py
+Version:    0.2.0
+Py Ver:     2.7
+Purpose:    Seed a benchmark database with a synthetic event; for use with loadtest.py.
+
+Dependents: argparse
+            hashlib
+            json
+            math
+            migrate (from the registration and scoreboard programs)
+            mysql.connector
+            os
+            random
+            sys
+            time
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The database named in db_config.json is created (if required), brought up to the
+            latest schema using the registration and scoreboard migrations, then emptied and
+            filled with the synthetic event.  Do *not* point this program at a live event
+            database.
+
+Use:        > python seed.py
+            > python seed.py --players 50000 --reset
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       The avatar images are loaded into the avatarcatalog table,
+                                        and each player references an image by its avatar_id.
+------------------------------------------------------------------------------------------------'''
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from datetime import datetime as dt
+
+import mysql.connector
+
+
+#ALIAS VALUES (AS OFFERED BY THE REGISTRATION PAGE)
+COLOURS = ('black', 'blue', 'gold', 'green', 'orange', 'pink', 'purple', 'red', 'silver',
+           'white', 'yellow')
+ANIMALS = ('bird', 'cat', 'cheetah', 'dinosaur', 'dog', 'eagle', 'elephant', 'fox', 'horse',
+           'leopard', 'lion', 'monkey', 'panda', 'rabbit', 'seahorse', 'shark', 'snake', 'tiger',
+           'turtle', 'zebra')
+NUMBERS = ('01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '13', '73')
+
+#ROWS PER INSERT STATEMENT
+BATCH_SIZE = 500
+
+QRY_INSERT_AVATARDATA = '''
+INSERT INTO avatardata (
+      datecreated, name, queueposition, status, gamehighscore, colour, animal, number
+    , email, phone, avatar_id, completiontime
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'''
+
+QRY_INSERT_AVATARCATALOG = '''
+INSERT IGNORE INTO avatarcatalog (avatar_id, image, datecreated) VALUES (%s, %s, NOW())'''
+
+QRY_INSERT_GAMEDATA = '''
+INSERT INTO gamedata (
+      name, actualprofiledata, targetprofiledata, gamehighscore, completiontime, profiled
+    ) VALUES (%s, %s, %s, %s, %s, %s)'''
+
+
+#-----------------------------------------------------------------------
+#FUNCTION USED TO LOAD A JSON CONFIG FILE
+def load_config(path):
+
+    return json.loads(open(path).read())
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS A CONNECTION TO THE BENCHMARK DATABASE
+def connect(db_config):
+
+    '''
+    PURPOSE:
+    The connect() function returns a new connection to the database
+    named in the passed db_config dictionary (the database is created
+    if it does not exist).
+
+    DESIGN:
+    The 'pool' key (if present) is ignored; so an app's
+    db_config.json file can also be used.
+    '''
+
+    params = dict((key, val) for key, val in db_config.items() if key != 'pool')
+    database = params.pop('database')
+
+    conn = mysql.connector.connect(**params)
+    cur = conn.cursor()
+    cur.execute('CREATE DATABASE IF NOT EXISTS `%s`' % database)
+    cur.close()
+    conn.database = database
+
+    return conn
+
+
+#-----------------------------------------------------------------------
+#FUNCTION APPLIES THE REGISTRATION AND SCOREBOARD MIGRATIONS
+def migrate_all(cfg, db_config):
+
+    '''
+    PURPOSE:
+    The migrate_all() function brings the benchmark database up to the
+    latest schema, using the same migrations as the apps; registration
+    first, as the scoreboard's procedures read the avatardata table.
+    '''
+
+    sys.path.insert(0, os.path.abspath(cfg['dir_registration']))
+    import migrate
+
+    for component, directory in (('registration', cfg['dir_registration']),
+                                 ('scoreboard', cfg['dir_scoreboard'])):
+        path = os.path.join(directory, 'db_resource', 'migrations')
+        migrate.Migrator(connect=lambda: connect(db_config), component=component,
+                         path=path).migrate()
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS A PLAYER'S TARGET AND ACTUAL FLIGHT PROFILES
+def profile(rnd, points, skill):
+
+    '''
+    PURPOSE:
+    The profile() function returns a tuple of (actual, target, score)
+    for a synthetic game.
+
+    DESIGN:
+    The target profile is a smooth climb, cruise and descent curve of
+    the passed number of points.  The actual profile follows the target
+    with a random error, scaled by the player's skill (0-1; 1 is a
+    perfect flight).  The score is 1000, less the mean absolute error,
+    rounded to one decimal place; so tied scores occur, as at an event.
+
+    The profiles are formatted as the game writes them to the gamedata
+    table ('[1.0, 2.5, ...]'), as expected by the profiler.
+    '''
+
+    target = [round(100 * math.sin(math.pi * i / (points - 1)) ** 0.5, 2) for i in range(points)]
+    drift = 0.0
+    actual = list()
+
+    for value in target:
+        drift = drift * 0.8 + rnd.gauss(0, 12 * (1 - skill))
+        actual.append(round(max(0.0, value + drift), 2))
+
+    error = sum(abs(a - t) for a, t in zip(actual, target)) / points
+    score = round(max(0.0, 1000 - 10 * error), 1)
+
+    return (str(actual), str(target), score)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE AVATAR IMAGES OFFERED BY THE REGISTRATION PAGE
+def load_avatars(cfg):
+
+    '''
+    PURPOSE:
+    The load_avatars() function returns a list of (avatar_id, image)
+    tuples; the id is the image's SHA-1 digest, as stored in the
+    avatarcatalog table by the registration app.
+    '''
+
+    path = os.path.join(cfg['dir_registration'], 'static', 'images')
+    images = [open(os.path.join(path, fname), 'rb').read()
+              for fname in sorted(os.listdir(path)) if fname.endswith('.png')]
+
+    return [(hashlib.sha1(image).hexdigest(), image) for image in images]
+
+
+#-----------------------------------------------------------------------
+#GENERATOR YIELDS THE SYNTHETIC PLAYERS
+def players(cfg, count):
+
+    '''
+    PURPOSE:
+    This generator yields an (avatardata row, gamedata row) tuple for
+    each synthetic player; the gamedata row is None for players who
+    have not completed a game.
+
+    DESIGN:
+    Players register at an even rate over the event; their queue
+    position is the registration time (epoch seconds), as set by the
+    registration app.  The status mix is taken from the
+    'seed_status_mix' config key: the latest registrations are
+    'QUEUED' (the oldest of these is 'PLAYING'), and the earlier
+    registrations are either 'COMPLETE' or 'DELETED' (no-shows).
+
+    As the alias space offered by the registration page (2640 aliases)
+    is smaller than a large event, a sequence number is appended to
+    each alias to keep it unique.
+    '''
+
+    rnd = random.Random(cfg['seed_random'])
+    mix = cfg['seed_status_mix']
+    avatars = [avatar_id for avatar_id, _ in load_avatars(cfg=cfg)]
+    start = int(time.time()) - int(cfg['seed_event_hours'] * 3600)
+    step = cfg['seed_event_hours'] * 3600.0 / count
+    queued = max(2, int(count * mix['QUEUED']))
+    complete = mix['COMPLETE'] / (mix['COMPLETE'] + mix['DELETED'])
+
+    for i in range(count):
+        colour, animal, number = rnd.choice(COLOURS), rnd.choice(ANIMALS), rnd.choice(NUMBERS)
+        name = '%s%s%s%05d' % (colour, animal, number, i)
+        queueposition = start + int(i * step)
+
+        #STATUS BY REGISTRATION ORDER
+        if i == count - queued:
+            status = 'PLAYING'
+        elif i > count - queued:
+            status = 'QUEUED'
+        elif rnd.random() < complete:
+            status = 'COMPLETE'
+        else:
+            status = 'DELETED'
+
+        game = None
+        score = 0.0
+        completiontime = None
+
+        if status == 'COMPLETE':
+            actual, target, score = profile(rnd=rnd, points=cfg['seed_profile_points'],
+                                            skill=rnd.betavariate(5, 2))
+            completiontime = queueposition + rnd.randint(300, 3600)
+            game = (name, actual, target, score, completiontime, 1)
+
+        yield ((dt.fromtimestamp(queueposition), name, queueposition, status, score,
+                colour, animal, number, '%s@example.com' % name, '07700%06d' % i,
+                rnd.choice(avatars), completiontime),
+               game)
+
+
+#-----------------------------------------------------------------------
+#METHOD USED TO INSERT A BATCH OF PLAYERS AND GAMES
+def insert(cur, rows, games):
+
+    #MYSQL.CONNECTOR SENDS EACH BATCH AS A SINGLE MULTI-ROW INSERT
+    if rows:
+        cur.executemany(QRY_INSERT_AVATARDATA, rows)
+    if games:
+        cur.executemany(QRY_INSERT_GAMEDATA, games)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION LOADS THE SYNTHETIC EVENT INTO THE DATABASE
+def seed(cfg, db_config, count, reset):
+
+    '''
+    PURPOSE:
+    The seed() function empties the avatardata, avatarcatalog,
+    gamedata and leaderboard tables and loads the avatar images and
+    the synthetic event, in batches of BATCH_SIZE rows.
+
+    DESIGN:
+    If the tables already hold data, the reset argument must be True;
+    so a database is not emptied by accident.
+
+    The tables are emptied using TRUNCATE, which (unlike DELETE) does
+    not fire the leaderboard triggers for each row.  The leaderboard is
+    refreshed once the load is complete.
+    '''
+
+    conn = connect(db_config)
+    cur = conn.cursor()
+
+    try:
+        #TEST FOR EXISTING DATA
+        cur.execute('SELECT COUNT(*) FROM avatardata')
+        if cur.fetchall()[0][0] and not reset:
+            print 'ERR: The avatardata table is not empty.  Use --reset to replace its data.'
+            return False
+
+        for table in ('gamedata', 'avatardata', 'avatarcatalog', 'leaderboard'):
+            cur.execute('TRUNCATE TABLE %s' % table)
+
+        cur.executemany(QRY_INSERT_AVATARCATALOG, load_avatars(cfg=cfg))
+
+        #LOAD IN BATCHES
+        rows, games = list(), list()
+        for row, game in players(cfg=cfg, count=count):
+            rows.append(row)
+            if game:
+                games.append(game)
+
+            if len(rows) == BATCH_SIZE:
+                insert(cur=cur, rows=rows, games=games)
+                conn.commit()
+                rows, games = list(), list()
+
+        insert(cur=cur, rows=rows, games=games)
+
+        cur.execute('CALL refresh_leaderboard()')
+        conn.commit()
+
+        #SUMMARY
+        cur.execute('SELECT status, COUNT(*) FROM avatardata GROUP BY status ORDER BY status')
+        for status, total in cur.fetchall():
+            print '%-10s %8d' % (status, total)
+
+    finally:
+        cur.close()
+        conn.close()
+
+    return True
+
+
+#-----------------------------------------------------------------------
+#MAIN CONTROLLER
+def main():
+
+    parser = argparse.ArgumentParser(description='Seed the benchmark database.')
+    parser.add_argument('--config', default='config.json', help='benchmark config file')
+    parser.add_argument('--players', type=int, help='number of players (registrations)')
+    parser.add_argument('--reset', action='store_true', help='replace any existing data')
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    db_config = load_config(cfg['db_config'])
+
+    #SCHEMA >> DATA
+    migrate_all(cfg=cfg, db_config=db_config)
+    started = time.time()
+    if not seed(cfg=cfg, db_config=db_config, count=args.players or cfg['seed_players'],
+                reset=args.reset):
+        sys.exit(1)
+
+    #NOTIFICATION
+    print 'Seeded %s in %.1fs' % (db_config['database'], time.time() - started)
+
+
+#-----------------------------------------------------------------------
+#RUN PROGRAM
+if __name__ == '__main__':
+
+    main()
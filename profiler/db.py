@@ -1,11 +1,14 @@
 '''------------------------------------------------------------------------------------------------
 Program:    db.py
-Version:    0.2.1
+Version:    0.5.1
 Py Ver:     2.7
 Purpose:    Database class for the pibike profiler program.
 
 Dependents: json
+            metrics
             mysql.connector
+            pool
+            statements
             pandas
             time
 
@@ -37,11 +40,37 @@ Date        Programmer      Version     Update
                                         Added new_profile_data() funtion.
                                         Added update_profiled_flag() method.
 25.08.17    J. Berendt      0.2.1       Generalised company branding for github. pylint (10/10)
+18.10.26    J. Berendt      0.3.0       Added a connection pool (pool.py).  connect() now returns a
+                                        pooled connection, and close() returns the connection to
+                                        the pool.  Pool settings are read from the 'pool' key in
+                                        db_config.json.  Added pool_stats() function.
+18.10.26    J. Berendt      0.4.0       Added a SQL statement registry (statements.py).  All SQL
+                                        files are loaded and validated once, on instantiation,
+                                        rather than being read from disk on each call.
+18.10.26    J. Berendt      0.5.0       Added metrics (metrics.py): the time taken by each SQL
+                                        statement (by statement name), the time taken to open a
+                                        new connection, and the connection pool gauges.
+                                        The number of players waiting for a profile graph is
+                                        recorded in the profiler_pending_profiles gauge.
+18.10.26    J. Berendt      0.5.1       BUG: If a query failed, the connection was not returned
+                                        to the connection pool (only closed on success).
+                                        FIX: Each connection is closed in a finally block.
 ------------------------------------------------------------------------------------------------'''
 
 import json
+import metrics
 import pandas as pd
 import mysql.connector
+import pool
+import statements
+
+#METRICS
+QUERY_TIME      = metrics.REGISTRY.histogram('db_query_seconds',
+                                             'Time taken to execute a SQL statement, by name.')
+CONNECT_TIME    = metrics.REGISTRY.histogram('db_connect_seconds',
+                                             'Time taken to open a new database connection.')
+PENDING         = metrics.REGISTRY.gauge('profiler_pending_profiles',
+                                         'Players waiting for a profile graph.')
 
 
 class DBConn(object):
@@ -54,6 +83,20 @@ class DBConn(object):
         self._db_config = json.loads(open(db_config_file).read())
         self._config    = json.loads(open('config.json').read())
 
+        #LOAD AND VALIDATE ALL SQL STATEMENTS (FAILS ON STARTUP IF A FILE IS MISSING)
+        self.statements = statements.Statements(config=self._config,
+                                                reload_interval=self._config['sql_reload_interval'])
+
+        #CREATE CONNECTION POOL (POOL SETTINGS ARE NOT PASSED TO THE CONNECTION)
+        self._pool = pool.ConnectionPool(connect=self._connect,
+                                         **self._db_config.pop('pool', {}))
+
+        #REPORT CONNECTION POOL GAUGES
+        metrics.REGISTRY.gauge('db_pool_open_connections', 'Open database connections.',
+                               func=lambda: self._pool.stats()['open'])
+        metrics.REGISTRY.gauge('db_pool_idle_connections', 'Idle database connections.',
+                               func=lambda: self._pool.stats()['idle'])
+
 
     #-------------------------------------------------------------------
     #FUNCTION RETURNS THE DB CONNECTION OBJECT
@@ -65,13 +108,14 @@ class DBConn(object):
         in the db_config.json file, which is read into the
         self._db_config variable on class instantiation.
 
-        This dictionary is passed into the mysql.connector.connect()
-        function as a **kwargs argument.
+        Connections are taken from the connection pool, which opens new
+        connections using this dictionary (refer to _connect()).  Calling
+        close() on the returned connection returns it to the pool.
         '''
 
         try:
             #RETURN A CONNECTION TO THE DATABASE
-            return mysql.connector.connect(**self._db_config)
+            return self._pool.acquire()
 
         except Exception as err:
             #NOTIFICATION
@@ -90,20 +134,21 @@ class DBConn(object):
         database records with a 'profiled' value of 0.
         '''
 
+        #CONNECT TO DB
+        conn = self.connect()
+
         try:
-            #CONNECT TO DB >> GET CURSOR OBJECT
-            conn = self.connect()
+            #GET CURSOR OBJECT
             cur = conn.cursor()
 
-            #READ QUERY
-            qry = open(self._config['qry_count_profile']).read()
+            #GET QUERY
+            qry = self.statements['qry_count_profile']
 
             #GET DATA
-            cur.execute(qry)
-            res = cur.fetchone()[0]
-
-            #CLOSE CONNECTION
-            conn.close()
+            with QUERY_TIME.time(query='qry_count_profile'):
+                cur.execute(qry)
+                res = cur.fetchone()[0]
+            PENDING.set(res)
 
             #RETURN BOOLEAN VALUE
             return False if res == 0 else True
@@ -115,6 +160,11 @@ class DBConn(object):
 
             return False
 
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
 
     #-------------------------------------------------------------------
     #FUNCTION USED TO GET DATA FOR A NEW PROFILE GRAPH
@@ -134,18 +184,16 @@ class DBConn(object):
         to be plotted.
         '''
 
-        try:
-            #CONNECT TO DB >> GET CURSOR OBJECT
-            conn = self.connect()
+        #CONNECT TO DB
+        conn = self.connect()
 
-            #READ QUERY
-            qry = open(self._config['qry_getdata_profile']).read()
+        try:
+            #GET QUERY
+            qry = self.statements['qry_getdata_profile']
 
             #GET DATA >> AS SERIES
-            df = pd.read_sql(qry, conn)
-
-            #CLOSE DB CONNECTION
-            conn.close()
+            with QUERY_TIME.time(query='qry_getdata_profile'):
+                df = pd.read_sql(qry, conn)
 
             #RETURN DATA
             return df
@@ -158,25 +206,32 @@ class DBConn(object):
             #RETURN AN EMPTY DATAFRAME
             return pd.DataFrame()
 
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
 
     #-------------------------------------------------------------------
     #METHOD USED TO UPDATE THE PROFILE FLAG, AFTER GRAPH IS CREATED
     def update_profiled_flag(self, alias):
 
+        #CONNECT TO DB
+        conn = self.connect()
+
         try:
-            #CONNECT TO DB >> GET CURSOR OBJECT
-            conn = self.connect()
+            #GET CURSOR OBJECT
             cur = conn.cursor()
 
-            #READ QUERY
-            qry = open(self._config['qry_update_profiled']).read()
+            #GET QUERY
+            qry = self.statements['qry_update_profiled']
 
             #UPDATE PROFILED FLAG
-            cur.execute(qry, (alias, ))
+            with QUERY_TIME.time(query='qry_update_profiled'):
+                cur.execute(qry, (alias, ))
 
-            #COMMIT >> CLOSE DB CONNECTION
+            #COMMIT
             conn.commit()
-            conn.close()
 
         except Exception as err:
             #NOTIFICATION
@@ -184,4 +239,42 @@ class DBConn(object):
                    'Player: %s' % alias
             print 'ERR: %s' % err
             #ROLLBACK
-            conn.rollback()
+            if conn is not None:
+                conn.rollback()
+
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CONNECTION POOL STATISTICS
+    def pool_stats(self):
+
+        '''
+        PURPOSE:
+        The pool_stats() function returns the connection pool's
+        statistics; including the time spent waiting for a connection.
+        Refer to the docstring for pool.ConnectionPool.stats().
+        '''
+
+        return self._pool.stats()
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TO OPEN A NEW DB CONNECTION (USED BY THE POOL)
+    def _connect(self):
+
+        '''
+        DESIGN:
+        The dictionary of connection values (db_config.json) is passed
+        into the mysql.connector.connect() function as a **kwargs
+        argument.
+
+        The time taken to open the connection is recorded in the
+        db_connect_seconds metric.
+        '''
+
+        with CONNECT_TIME.time():
+            return mysql.connector.connect(**self._db_config)
@@ -0,0 +1,408 @@
+'''------------------------------------------------------------------------------------------------
+Program:    pool.py
+Version:    0.1.0
+Py Ver:     2.7
+Purpose:    Bounded, thread-safe database connection pool, used by the db.DBConn class.
+
+Dependents: collections
+            threading
+            time
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   This module is shared by the registration, scoreboard and profiler programs.  Each
+            program holds its own copy; keep the copies identical.
+
+Use:        From the db module:
+            ---------------------
+            import pool
+
+            cpool = pool.ConnectionPool(connect=open_connection_function, size=5)
+
+            conn = cpool.acquire()
+            cur = conn.cursor()
+            conn.close()    # returns the connection to the pool
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+------------------------------------------------------------------------------------------------'''
+
+import threading
+import time
+
+from collections import deque
+
+
+class PoolTimeout(Exception):
+
+    '''
+    PURPOSE:
+    Raised by ConnectionPool.acquire() when no connection becomes
+    available within the pool's timeout.
+    '''
+
+    pass
+
+
+class ConnectionPool(object):
+
+    '''
+    PURPOSE:
+    This class holds a bounded set of open database connections,
+    which are re-used between database actions, rather than opening
+    and closing a new connection for every action.
+
+    DESIGN:
+    Connections are created on demand, up to the pool size.  When all
+    connections are in use, acquire() waits for a connection to be
+    returned, up to the timeout (seconds), then raises PoolTimeout.
+
+    The connection returned by acquire() is wrapped in a
+    PooledConnection object, which behaves as the underlying
+    connection; however calling close() returns the connection to the
+    pool rather than closing it.
+
+    On checkout:
+        - idle connections older than max_lifetime (seconds), or idle
+          for longer than idle_timeout (seconds), are closed
+        - a connection which has been idle for longer than ping_after
+          (seconds) is health checked (is_connected()), and replaced if
+          the check fails
+
+    On return, any open transaction is rolled back and any unread
+    results are consumed, so the next user receives a clean
+    connection.
+
+    Statistics, including the time spent waiting for a connection, are
+    available from the stats() function.
+
+    USE:
+    import pool
+
+    cpool = pool.ConnectionPool(connect=open_connection_function, size=5)
+    conn = cpool.acquire()
+    conn.close()
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    #pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, connect, size=5, timeout=10, idle_timeout=300, max_lifetime=3600,
+                 ping_after=30):
+
+        '''
+        DESIGN:
+        connect:        function returning a new database connection
+        size:           maximum number of open connections
+        timeout:        seconds to wait for a free connection
+        idle_timeout:   seconds a connection may be idle before it is
+                        closed
+        max_lifetime:   seconds after which a connection is closed
+        ping_after:     seconds a connection may be idle before it is
+                        health checked on checkout
+        '''
+
+        self._connect       = connect
+        self._size          = size
+        self._timeout       = timeout
+        self._idle_timeout  = idle_timeout
+        self._max_lifetime  = max_lifetime
+        self._ping_after    = ping_after
+        self._cond          = threading.Condition(threading.Lock())
+        #IDLE CONNECTIONS AS (CONNECTION, CREATED, LAST USED); MOST RECENTLY USED ON THE RIGHT
+        self._idle          = deque()
+        self._open          = 0
+        self._stats         = dict(created=0, reused=0, closed=0, failed_checks=0,
+                                   checkouts=0, waits=0, timeouts=0,
+                                   wait_total=0.0, wait_max=0.0, connect_total=0.0)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A CONNECTION FROM THE POOL
+    def acquire(self):
+
+        '''
+        PURPOSE:
+        The acquire() function returns a PooledConnection, either by
+        re-using an idle connection or by opening a new connection.
+
+        DESIGN:
+        Refer to the class docstring.  The health check and the opening
+        of new connections are performed outside of the pool's lock, so
+        other threads are not blocked by network calls.
+        '''
+
+        start = time.time()
+
+        while True:
+            #GET AN IDLE CONNECTION, OR PERMISSION TO OPEN A NEW ONE
+            entry = self._checkout(start=start)
+
+            #OPEN A NEW CONNECTION
+            if entry is None:
+                return self._create()
+
+            #RE-USE AN IDLE CONNECTION >> HEALTH CHECK IF IDLE FOR A WHILE
+            conn, created, used = entry
+            if time.time() - used < self._ping_after or self._healthy(conn):
+                with self._cond:
+                    self._stats['reused'] += 1
+                return PooledConnection(pool=self, conn=conn, created=created)
+
+            #FAILED HEALTH CHECK >> DISCARD AND TRY AGAIN
+            with self._cond:
+                self._stats['failed_checks'] += 1
+            self.discard(conn=conn)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO RETURN A CONNECTION TO THE POOL
+    def release(self, conn, created):
+
+        '''
+        PURPOSE:
+        The release() method returns a connection to the pool; called
+        by PooledConnection.close().
+
+        DESIGN:
+        Connections past their max_lifetime, or which cannot be reset,
+        are closed rather than returned to the pool.
+        '''
+
+        #TEST CONNECTION AGE
+        if time.time() - created >= self._max_lifetime:
+            self.discard(conn=conn)
+            return
+
+        try:
+            #CLEAR UNREAD RESULTS AND OPEN TRANSACTIONS
+            if getattr(conn, 'unread_result', False):
+                conn.consume_results()
+            if getattr(conn, 'in_transaction', False):
+                conn.rollback()
+
+        except Exception:
+            self.discard(conn=conn)
+            return
+
+        #RETURN TO POOL >> WAKE A WAITING THREAD
+        with self._cond:
+            self._idle.append((conn, created, time.time()))
+            self._cond.notify()
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO CLOSE A CONNECTION AND REMOVE IT FROM THE POOL
+    def discard(self, conn):
+
+        '''
+        PURPOSE:
+        The discard() method closes a checked out connection and frees
+        its place in the pool.
+        '''
+
+        self._close(conn=conn)
+
+        with self._cond:
+            self._open -= 1
+            self._stats['closed'] += 1
+            self._cond.notify()
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE POOL STATISTICS
+    def stats(self):
+
+        '''
+        PURPOSE:
+        The stats() function returns a dictionary of the pool's
+        counters, including:
+            - size / open / idle: pool size, open and idle connections
+            - waits: number of checkouts which had to wait
+            - wait_total / wait_max / wait_avg: seconds spent waiting
+            - connect_avg: average seconds taken to open a connection
+        '''
+
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self._size, open=self._open, idle=len(self._idle))
+
+        stats['wait_avg'] = stats['wait_total'] / max(stats['checkouts'], 1)
+        stats['connect_avg'] = stats['connect_total'] / max(stats['created'], 1)
+
+        return stats
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TO RESERVE AN IDLE CONNECTION OR A NEW SLOT
+    def _checkout(self, start):
+
+        '''
+        PURPOSE:
+        The _checkout() function returns an idle connection entry, or
+        None if a new connection should be opened (the slot is reserved
+        by incrementing the open count).
+
+        DESIGN:
+        Expired idle connections are closed first.  If the pool is full
+        and no connection is idle, the function waits for a connection
+        to be returned, until the timeout is reached.
+        '''
+
+        waited = False
+
+        with self._cond:
+            while True:
+                #CLOSE EXPIRED IDLE CONNECTIONS
+                self._evict()
+
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+
+                if self._open < self._size:
+                    self._open += 1
+                    entry = None
+                    break
+
+                #WAIT FOR A CONNECTION TO BE RETURNED
+                remaining = self._timeout - (time.time() - start)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout('No database connection available after %ss.'
+                                      % self._timeout)
+                waited = True
+                self._cond.wait(remaining)
+
+            #UPDATE WAIT STATISTICS
+            wait = time.time() - start
+            self._stats['checkouts'] += 1
+            self._stats['waits'] += 1 if waited else 0
+            self._stats['wait_total'] += wait
+            self._stats['wait_max'] = max(self._stats['wait_max'], wait)
+
+        return entry
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TO OPEN A NEW CONNECTION
+    def _create(self):
+
+        '''
+        PURPOSE:
+        The _create() function opens a new connection in the slot
+        reserved by _checkout().  If the connection fails, the slot is
+        freed and the error is raised.
+        '''
+
+        start = time.time()
+
+        try:
+            conn = self._connect()
+
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats['created'] += 1
+            self._stats['connect_total'] += time.time() - start
+
+        return PooledConnection(pool=self, conn=conn, created=start)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD TO CLOSE EXPIRED IDLE CONNECTIONS (LOCK MUST BE HELD)
+    def _evict(self):
+
+        now = time.time()
+        keep = deque()
+
+        for conn, created, used in self._idle:
+            if now - used >= self._idle_timeout or now - created >= self._max_lifetime:
+                self._close(conn=conn)
+                self._open -= 1
+                self._stats['closed'] += 1
+            else:
+                keep.append((conn, created, used))
+
+        self._idle = keep
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TO TEST A CONNECTION
+    @staticmethod
+    def _healthy(conn):
+
+        try:
+            return conn.is_connected()
+
+        except Exception:
+            return False
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD TO CLOSE A CONNECTION, IGNORING ERRORS
+    @staticmethod
+    def _close(conn):
+
+        try:
+            conn.close()
+
+        except Exception:
+            pass
+
+
+class PooledConnection(object):
+
+    '''
+    PURPOSE:
+    This class wraps a connection checked out from a ConnectionPool.
+
+    DESIGN:
+    All attributes and methods are passed to the underlying
+    connection, except close(), which returns the connection to the
+    pool.
+
+    If the object is garbage collected without close() being called
+    (for example, after an error), the connection is closed and its
+    place in the pool is freed, as its state is unknown.
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, pool, conn, created):
+
+        self._pool      = pool
+        self._conn      = conn
+        self._created   = created
+
+
+    #-------------------------------------------------------------------
+    #PASS ATTRIBUTES TO THE UNDERLYING CONNECTION
+    def __getattr__(self, name):
+
+        return getattr(self.__dict__.get('_conn'), name)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO RETURN THE CONNECTION TO THE POOL
+    def close(self):
+
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn=conn, created=self._created)
+
+
+    #-------------------------------------------------------------------
+    #FREE THE POOL SLOT IF THE CONNECTION WAS NOT CLOSED
+    def __del__(self):
+
+        if self.__dict__.get('_conn') is not None:
+            conn, self._conn = self._conn, None
+            self._pool.discard(conn=conn)
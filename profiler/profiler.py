@@ -1,6 +1,6 @@
 '''------------------------------------------------------------------------------------------------
 Program:    profiler.py
-Version:    0.3.0
+Version:    0.6.0
 Platform:   Windows / Linux
 Py Ver:     2.7
 Purpose:    This program creates the 'results for [player]' graph on the digital engine simulator
@@ -11,8 +11,11 @@ Dependents: datetime
             os
             sys
             time
+            urllib
+            urllib2
             db
             matplotlib
+            metrics
             numpy
             seaborn
             scipy
@@ -42,6 +45,19 @@ Date        Programmer      Version     Update
                                         Generalised company branding for github.
                                         Added GPL license file.
                                         Added readme file for design, deployment and use.
+18.10.26    J. Berendt      0.4.0       Added the player's overall rank ('you placed #N of M') to
+                                        the profile graph's subtitle.  The rank is requested from
+                                        the scoreboard's /rank/<alias> route (rank_url key in
+                                        config.json).
+18.10.26    J. Berendt      0.5.0       The profile graphs are now written using save_graph(),
+                                        which writes to a temporary file and renames it into
+                                        place; so the scoreboard never reads a partly written
+                                        graph, and sees each new graph as a new file.
+18.10.26    J. Berendt      0.6.0       Added metrics (metrics.py): the time taken to create each
+                                        profile graph, and the database metrics recorded by
+                                        db.py.  As the profiler does not run a web server, the
+                                        metrics are written to the 'metrics_file' (Prometheus
+                                        text format) after each check for new profiles.
 ------------------------------------------------------------------------------------------------'''
 
 #ALLOW OPENING DOCSTRING
@@ -51,11 +67,14 @@ import json
 import os
 import sys
 import time
+import urllib
+import urllib2
 
 from datetime import datetime as dt
 
 import db
 import matplotlib.pyplot as plt
+import metrics
 import numpy as np
 import seaborn as sns
 
@@ -63,6 +82,12 @@ from scipy.interpolate import spline
 from _version import __version__
 
 
+#METRICS
+RENDER_TIME = metrics.REGISTRY.histogram('profiler_render_seconds',
+                                         'Time taken to create and save a profile graph.')
+PROFILES    = metrics.REGISTRY.counter('profiler_profiles_total', 'Profile graphs created.')
+
+
 #-----------------------------------------------------------------------
 #FUNCTION USED TO LOAD THE CONFIG FILE
 def setup_config():
@@ -102,6 +127,41 @@ def decode(df, col_name):
     return [int(i) for i in decoded]
 
 
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE PLAYER'S OVERALL RANK
+def get_rank(alias, score):
+
+    '''
+    PURPOSE:
+    The get_rank() function returns a tuple of the player's overall
+    rank and the total number of completed players, as requested from
+    the scoreboard's /rank/<alias> route.
+
+    DESIGN:
+    The route's URL is defined by the 'rank_url' key in config.json,
+    where %s is replaced by the (quoted) alias.  The player's score is
+    also passed, as the player's status may not yet be 'COMPLETE'.
+
+    If the scoreboard cannot be reached within 'rank_timeout' seconds,
+    None is returned, and the graph is created without the rank.
+    '''
+
+    try:
+        #BUILD URL >> REQUEST RANK
+        url = '%s?%s' % (CFG['rank_url'] % urllib.quote(alias, safe=''),
+                         urllib.urlencode(dict(score=score)))
+        data = json.loads(urllib2.urlopen(url, timeout=CFG['rank_timeout']).read())
+
+        return data['rank'], data['total']
+
+    except Exception as err:
+        #NOTIFICATION
+        print 'ERR: Could not get the rank for player: %s' % alias
+        print 'ERR: %s' % err
+
+        return None
+
+
 #-----------------------------------------------------------------------
 #METHOD TO PLOT PLAYER RESULTS AGAINST TARGET
 def create_graph(data, alias, score):
@@ -187,17 +247,51 @@ def create_graph(data, alias, score):
                      verticalalignment='bottom', color=CFG['grey_dark'])
     #-------------------------------------------------------------------
 
-    #SET GRAPH TITLE >> ADD PLAYER'S SCORE
+    #SET GRAPH TITLE >> ADD PLAYER'S SCORE AND RANK (IF AVAILABLE)
     plt.title('RESULTS FOR %s' % alias.upper(),
               fontsize=25, color=CFG['grey_med'], y=1.15, ha='center')
-    plt.suptitle('your score is: %s' % score, fontsize=12, color=CFG['grey_med'], ha='center')
+    subtitle = 'your score is: %s' % score
+    rank = get_rank(alias=alias, score=score)
+    if rank:
+        subtitle += '  |  you placed #%d of %d' % rank
+    plt.suptitle(subtitle, fontsize=12, color=CFG['grey_med'], ha='center')
 
     #STORE IMAGE FOR DISPLAY
-    plt.savefig(os.path.join(CFG['dir_graph'], 'profile.png'), bbox_inches='tight', dpi=300)
+    save_graph(path=os.path.join(CFG['dir_graph'], 'profile.png'))
 
     #STORE IMAGE FOR PLAYER (IF REQUESTED)
-    plt.savefig(os.path.join(CFG['dir_graph_player'], '%s_profile.png' % alias),
-                bbox_inches='tight', dpi=300)
+    save_graph(path=os.path.join(CFG['dir_graph_player'], '%s_profile.png' % alias))
+
+
+#-----------------------------------------------------------------------
+#METHOD USED TO SAVE THE CURRENT GRAPH TO A FILE
+def save_graph(path):
+
+    '''
+    PURPOSE:
+    The save_graph() method saves the current matplotlib figure to the
+    passed path, as a PNG file.
+
+    DESIGN:
+    The graph is written to a temporary file in the same directory,
+    which is then renamed to the target path.  On Linux the rename
+    replaces the target file atomically; so the scoreboard never
+    serves a partly written graph, and the new graph's content
+    version (and therefore its URL) changes once the file is
+    complete.
+
+    As Windows does not allow a rename over an existing file, the
+    target file is removed first on Windows.
+    '''
+
+    #WRITE TO TEMPORARY FILE
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    plt.savefig(tmp, format='png', bbox_inches='tight', dpi=300)
+
+    #MOVE INTO PLACE
+    if sys.platform.startswith('win') and os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
 
 
 #-----------------------------------------------------------------------
@@ -230,7 +324,9 @@ def new_profile():
         print '%s: Creating profile for: %s' % (dt.now(), df.loc[0, 'name'])
 
         #CREATE THE GRAPH FOR THE DASHBOARD / SCOREBOARD
-        create_graph(data=df, alias=df.loc[0, 'name'], score=df.loc[0, 'gamehighscore'])
+        with RENDER_TIME.time():
+            create_graph(data=df, alias=df.loc[0, 'name'], score=df.loc[0, 'gamehighscore'])
+        PROFILES.inc()
 
         #UPDATE PLAYER'S PROFILED FLAG
         DBC.update_profiled_flag(alias=df.loc[0, 'name'])
@@ -267,6 +363,28 @@ def image_dir_test():
         if not os.path.exists(dir_): os.makedirs(dir_)
 
 
+#-----------------------------------------------------------------------
+#METHOD USED TO WRITE THE METRICS FILE
+def dump_metrics():
+
+    '''
+    PURPOSE:
+    This method writes the program's metrics to the file defined by
+    the 'metrics_file' key in the config file, in the Prometheus text
+    format; for example, for the node_exporter textfile collector.
+    If the key is empty, no file is written.
+    '''
+
+    if CFG['metrics_file']:
+        try:
+            metrics.REGISTRY.dump(path=CFG['metrics_file'])
+
+        except (IOError, OSError) as err:
+            #NOTIFICATION
+            print 'ERR: Could not write the metrics file.'
+            print 'ERR: %s' % err
+
+
 #-----------------------------------------------------------------------
 #APPLICATION LOOP TO REFRESH SCOREBOARD PLAYER'S PROFILE GRAPH
 def the_app_loop():
@@ -291,6 +409,8 @@ def the_app_loop():
 
         #DO THE WORK
         new_profile()
+        #WRITE METRICS
+        dump_metrics()
         #DEBUG BREAK
         #break
         #TIMEOUT
@@ -0,0 +1,179 @@
+'''------------------------------------------------------------------------------------------------
+Program:    statements.py
+Version:    0.1.0
+Py Ver:     2.7
+Purpose:    Registry of the SQL statements used by the db.DBConn class, loaded once at startup.
+
+Dependents: os
+            threading
+            time
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   This module is shared by the registration, scoreboard and profiler programs.  Each
+            program holds its own copy; keep the copies identical.
+
+Use:        From the db module:
+            ---------------------
+            import statements
+
+            sql = statements.Statements(config=config_dict)
+
+            qry = sql['qry_player_delete']
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+------------------------------------------------------------------------------------------------'''
+
+import os
+import threading
+import time
+
+
+class StatementError(Exception):
+
+    '''
+    PURPOSE:
+    Raised when a SQL file listed in config.json is missing, cannot be
+    read or contains no statement.
+    '''
+
+    pass
+
+
+class Statements(object):
+
+    '''
+    PURPOSE:
+    This class loads every SQL statement listed in the program's
+    config.json file (all keys starting with 'qry_') once, on program
+    startup; so the database methods do not read the SQL files from
+    disk on every call.
+
+    DESIGN:
+    Each file is read and validated when the class is instantiated.
+    If a file is missing, or contains no statement (only comments or
+    whitespace), a StatementError is raised; so a deployment problem
+    stops the program on startup, rather than on the first request.
+
+    Statements are accessed by their config key, as a dictionary:
+        qry = sql['qry_player_delete']
+
+    Optional reload:
+    If reload_interval is greater than 0, the files are checked for
+    changes (by modification time) at most once every (n) seconds,
+    and any changed files are re-loaded.  If set to 0 (default),
+    accessing a statement performs no file system actions at all.
+
+    USE:
+    import statements
+
+    sql = statements.Statements(config=config_dict)
+    qry = sql['qry_player_delete']
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, config, reload_interval=0):
+
+        '''
+        DESIGN:
+        config:             the program's config dictionary
+        reload_interval:    seconds between checks for changed files;
+                            0 disables reloading
+        '''
+
+        self._paths             = dict((key, val) for key, val in config.items()
+                                       if key.startswith('qry_'))
+        self._reload_interval   = reload_interval
+        self._lock              = threading.Lock()
+        self._checked           = time.time()
+        self._sql               = dict()
+        self._mtimes            = dict()
+
+        #LOAD AND VALIDATE ALL STATEMENTS
+        for name in self._paths:
+            self._load(name=name)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A STATEMENT BY ITS CONFIG KEY
+    def __getitem__(self, name):
+
+        #TEST IF A RELOAD CHECK IS DUE
+        if self._reload_interval > 0 and time.time() - self._checked >= self._reload_interval:
+            self.reload()
+
+        return self._sql[name]
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS TRUE IF THE STATEMENT EXISTS
+    def __contains__(self, name):
+
+        return name in self._sql
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A SORTED LIST OF THE STATEMENT NAMES
+    def names(self):
+
+        return sorted(self._sql)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO RE-LOAD ANY CHANGED SQL FILES
+    def reload(self):
+
+        '''
+        PURPOSE:
+        The reload() method re-loads any SQL file whose modification
+        time has changed since it was loaded.
+
+        DESIGN:
+        If a changed file fails validation, the error is printed and the
+        previously loaded statement is kept; so a bad edit does not
+        stop a running program.
+        '''
+
+        with self._lock:
+            self._checked = time.time()
+
+            for name, path in self._paths.items():
+                try:
+                    if os.path.getmtime(path) != self._mtimes[name]:
+                        self._load(name=name)
+
+                except (OSError, StatementError) as err:
+                    #NOTIFICATION
+                    print 'ERR: Could not re-load the SQL statement: %s' % name
+                    print 'ERR: %s' % err
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD TO LOAD AND VALIDATE A STATEMENT
+    def _load(self, name):
+
+        path = self._paths[name]
+
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path) as fsql:
+                sql = fsql.read()
+
+        except (IOError, OSError) as err:
+            raise StatementError('Could not read the SQL file for %s (%s): %s'
+                                 % (name, path, err))
+
+        #TEST FOR A STATEMENT (IGNORING COMMENT LINES AND WHITESPACE)
+        lines = [line for line in sql.splitlines()
+                 if line.strip() and not line.strip().startswith('--')]
+        if not lines:
+            raise StatementError('The SQL file for %s (%s) contains no statement.'
+                                 % (name, path))
+
+        self._sql[name] = sql
+        self._mtimes[name] = mtime
@@ -1,6 +1,6 @@
 '''------------------------------------------------------------------------------------------------
 Program:    app
-Package:    1.2.1
+Package:    1.8.1
 Py Ver:     2.7
 Purpose:    This program runs the user registration web interface for the digital engine simulator.
 
@@ -9,16 +9,21 @@ Dependents: sys
             time
             datetime
             flask
+            avatars
             db
+            metrics
 
 Developer:  J. Berendt
 Email:      support@73rdstreetdevelopment.co.uk
 
 Comments:
 
-Use:        To start the web interface:
+Use:        To start the web interface (development server):
             > python app.py
 
+            To start the web interface (production server; see wsgi.py):
+            > gunicorn -c gunicorn_conf.py wsgi:application
+
             In a browser, go to 127.0.0.1:5000
             [the host ip and port number are defined in config.json]
 
@@ -56,6 +61,46 @@ Date        Programmer      Version     Update
                                         the 'completiontime' field.
                                         Updated the README to include guidance for displaying the
                                         UI on a portable device.
+18.10.26    J. Berendt      1.3.0       Moved the program setup from main() into init(), so the
+                                        program can also be started by a WSGI server (wsgi.py).
+                                        The app_debug and app_threaded config values are now
+                                        parsed using str2bool(); previously any non-empty string
+                                        (including "False") enabled debug mode.
+18.10.26    J. Berendt      1.4.0       Added metrics (metrics.py), reported by the /metrics route
+                                        in the Prometheus text format: request time by route,
+                                        plus the database metrics recorded by db.py.
+18.10.26    J. Berendt      1.5.0       DATABASE:
+                                        Each avatar image is stored once, in the new avatarcatalog
+                                        table; the avatardata table holds the image's id
+                                        (avatar_id) rather than a copy of the image.  Existing
+                                        rows are moved to the catalog by migrations 0006 and 0007.
+18.10.26    J. Berendt      1.6.0       MODULE:
+                                        Added the avatar registry (avatars.py); the avatar images
+                                        are loaded and validated once, on startup, and added to
+                                        the avatar catalog.  A registration now looks up the
+                                        selected avatar by name, in memory; an unknown name is
+                                        rejected.  Removed img2blob() and the 'site' config key.
+                                        Added the /avatars route (avatar names and ids as JSON).
+                                        HTML:
+                                        The avatar gallery posts the image name, not its URL.
+18.10.26    J. Berendt      1.7.0       MODULE:
+                                        The avatar registry makes a thumbnail of each image for
+                                        each size in the 'avatar_thumbnail_sizes' config key
+                                        (requires PIL); the thumbnails are added to the database
+                                        with the images, for use by the scoreboard.
+18.10.26    J. Berendt      1.8.0       MODULE:
+                                        A registration is now a single INSERT; a taken alias is
+                                        detected by the database's unique index on the alias,
+                                        rather than by a separate query before the insert.  So
+                                        the same alias cannot be registered twice at once.
+                                        Removed the qry_alias_exists query.
+18.10.26    J. Berendt      1.8.1       BUG: Metrics were exported to /tmp by every process,
+                                        including the development server, and the files of
+                                        exited processes were never removed.
+                                        FIX: metrics_dir is now empty by default; when served by
+                                        the WSGI server (init(wsgi=True)), the private
+                                        wsgi_metrics_dir directory is used.  An unsafe directory
+                                        disables the export.
 ------------------------------------------------------------------------------------------------'''
 
 import json
@@ -63,8 +108,11 @@ import os
 import sys
 import time
 
+import avatars
+import metrics
+
 from datetime import datetime as dt
-from flask import Flask, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request
 from db import DBConn
 from _version import __version__
 
@@ -72,6 +120,10 @@ from _version import __version__
 APP = Flask(__name__)
 APP.secret_key = 'devkey'
 
+#METRICS
+REQUEST_TIME = metrics.REGISTRY.histogram('http_request_seconds',
+                                          'Time taken to handle a request, by route.')
+
 #IGNORED DUE TO DBC AND CONFIG BEING VALID GLOBAL 'CONSTANTS'
 #pylint: disable=global-variable-undefined
 
@@ -91,6 +143,51 @@ def setup():
     return json.loads(open('config.json').read())
 
 
+#-----------------------------------------------------------------------
+#FUNCTION CONVERTS A CONFIG VALUE TO A BOOLEAN
+def str2bool(value):
+
+    '''
+    PURPOSE:
+    This function is used to convert a true / false config value to a
+    boolean.
+
+    DESIGN:
+    The config file holds these values as strings (e.g. "True"), and
+    any non-empty string is truthy; therefore the string is tested
+    against the accepted 'true' values.
+    '''
+
+    return str(value).strip().lower() in ('true', 'yes', '1')
+
+
+#-----------------------------------------------------------------------
+#AVATAR REGISTRY SETUP
+def avatars_setup():
+
+    '''
+    PURPOSE:
+    Using the avatars.AvatarRegistry() class, this function loads and
+    validates the avatar images (static/images) once, and returns the
+    read-only registry used by each registration.
+
+    DESIGN:
+    A thumbnail of each image is made for each size (pixels) listed in
+    the 'avatar_thumbnail_sizes' key in config.json; these are the
+    sizes at which the scoreboard displays the avatars.
+    '''
+
+    registry = avatars.AvatarRegistry(folder=os.path.join(APP.static_folder, 'images'),
+                                      sizes=CFG['avatar_thumbnail_sizes'])
+
+    #TEST FOR IMAGES
+    if not len(registry):
+        #NOTIFICATION
+        print 'ERR: No valid avatar images were found; registrations will be rejected.'
+
+    return registry
+
+
 #-----------------------------------------------------------------------
 #DATABASE SETUP
 def db_setup():
@@ -98,7 +195,9 @@ def db_setup():
     '''
     PURPOSE:
     Using the db.DBConn() class, this method is used to create the
-    avatardata database table, if the table does not already exist.
+    avatardata database table, if the table does not already exist,
+    and apply any pending schema migrations.  The avatar registry's
+    images are then added to the avatar catalog.
     '''
 
     global DBC
@@ -107,6 +206,81 @@ def db_setup():
     DBC = DBConn('db_config.json')
     #ENSURE TABLE(S) IS/ARE CREATES
     DBC.create()
+    #ENSURE AVATAR IMAGES ARE IN THE CATALOG
+    DBC.add_avatars(avatars=AVATARS)
+
+
+#-----------------------------------------------------------------------
+#METRICS SETUP
+def metrics_setup():
+
+    '''
+    PURPOSE:
+    If the 'metrics_dir' key in config.json is set (or, when served by
+    the WSGI server, the 'wsgi_metrics_dir' key; refer to init()), this
+    method starts exporting this process's metrics to the directory;
+    so the /metrics route can report the totals of all worker
+    processes (refer to metrics.Registry.render_all()).
+
+    If the directory is not private to this user, an error is printed
+    and only this process's metrics are reported.
+    '''
+
+    if CFG['metrics_dir']:
+        try:
+            metrics.REGISTRY.start_export(directory=CFG['metrics_dir'],
+                                          interval=CFG['metrics_export_interval'])
+
+        except OSError as err:
+            #NOTIFICATION
+            print 'ERR: The metrics directory cannot be used; only this process\'s metrics are ' \
+                  'reported.'
+            print 'ERR: %s' % err
+
+
+#-----------------------------------------------------------------------
+#RECORD THE REQUEST START TIME
+@APP.before_request
+def metrics_start():
+
+    g.metrics_start = time.time()
+
+
+#-----------------------------------------------------------------------
+#RECORD THE REQUEST TIME
+@APP.after_request
+def metrics_record(resp):
+
+    '''
+    PURPOSE:
+    This function records the time taken to handle each request in
+    the http_request_seconds metric, labelled by the route (the URL
+    rule, such as '/add_rec'), method and status code.
+    '''
+
+    #TEST FOR A START TIME (NOT SET IF A BEFORE_REQUEST HOOK FAILED)
+    start = getattr(g, 'metrics_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_TIME.observe(time.time() - start, route=route, method=request.method,
+                             status=resp.status_code)
+
+    return resp
+
+
+#-----------------------------------------------------------------------
+#REPORT METRICS
+@APP.route('/metrics')
+def metrics_page():
+
+    '''
+    PURPOSE:
+    This method returns the program's metrics in the Prometheus text
+    format; for all worker processes, if the 'metrics_dir' key in
+    config.json is set (refer to metrics_setup()).
+    '''
+
+    return Response(metrics.REGISTRY.render_all(), content_type=metrics.CONTENT_TYPE)
 
 
 #-----------------------------------------------------------------------
@@ -122,6 +296,21 @@ def registration():
     return render_template('registration.html')
 
 
+#-----------------------------------------------------------------------
+#REPORT THE AVATAR REGISTRY
+@APP.route('/avatars')
+def avatars_page():
+
+    '''
+    PURPOSE:
+    This function returns the avatar registry as JSON, in the form
+    {name: avatar_id}; so other components can map an avatar's name
+    to its key in the avatarcatalog table.
+    '''
+
+    return jsonify(dict((avatar.name, avatar.avatar_id) for avatar in AVATARS))
+
+
 #-----------------------------------------------------------------------
 #METHOD FOR ADDING A RECORD TO THE DATABASE
 @APP.route('/add_rec', methods=['GET', 'POST'])
@@ -137,12 +326,14 @@ def add_record():
     The db.py module and its DBConn class are used to perform all
     database related tasks.
 
-    Before a new record is added, the following tests are performed:
-        - the user must have selected an avatar
-        - the user chosen alias *must not* already exist in the db
+    Before a new record is added, the user must have selected an
+    avatar, which is known to the avatar registry.
 
-    If both tests are passed, the record is added to the database and
-    the user is informed of their alias.
+    The user chosen alias *must not* already exist in the db.  This is
+    tested by the insert itself (refer to db.DBConn.insert()), which
+    returns False if the alias is taken.
+
+    If the record is added, the user is informed of their alias.
     '''
 
     #TEST REQUEST TYPE
@@ -157,17 +348,14 @@ def add_record():
             #STORE ALIAS NAME
             alias = build_alias(form_object=request.form)
 
-            #TEST AVATAR WAS SELECTED
-            if request.form['image_name'] != '':
+            #TEST A KNOWN AVATAR WAS SELECTED
+            if request.form['image_name'] in AVATARS:
 
                 #EXTRACT USER VALUES FROM HTML FORM
                 values = getuservalues(form_object=request.form)
 
-                #TEST IF ALIAS WAS FOUND
-                if DBC.user_exists(alias=alias) == 0:
-
-                    #ADD NEW RECORD
-                    DBC.insert(values=values)
+                #ADD NEW RECORD >> TEST IF ALIAS WAS TAKEN
+                if DBC.insert(values=values):
 
                     #MESSAGE FOR WEB OUTPUT
                     msg = 'Your user alias has been registered successfully!  Thank you.'
@@ -224,8 +412,10 @@ def getuservalues(form_object):
     epoch value is created using an integer conversion of the
     time module's time.time() function.
 
-    The avatar image is converted to binary format using the local
-    imb2blob() function.
+    The avatar is looked up by name (the image's filename, as posted
+    by the registration page) in the avatar registry; the player's row
+    stores the avatar's id.  The caller must first test that the name
+    is in the registry.
 
     The user's STATUS and GAMEHIGHSCORE values are defaulted to
     'QUEUED' and 0.0, respectively.
@@ -240,7 +430,7 @@ def getuservalues(form_object):
     queueposition   = int(time.time())
     email           = form_object['email'].lower()
     phone           = form_object['phone']
-    avatar          = img2blob(form_object['image_name'])
+    avatar          = AVATARS.get(form_object['image_name']).avatar_id
 
     #RETURN WRAPPED VALUES
     return (datecreated, name, queueposition, 'QUEUED', 0.0, colour,
@@ -248,48 +438,53 @@ def getuservalues(form_object):
 
 
 #-----------------------------------------------------------------------
-#FUNCTION TO CONVERT A FILE (FROM FILENAME) TO BINARY (FOR BLOB STORAGE)
-def img2blob(filename):
+#PROGRAM INITIALISATION
+def init(wsgi=False):
 
     '''
     PURPOSE:
-    The img2blob() function is used to convert the passed image file
-    to binary format.
+    This method reads the config file and sets up the database; used
+    by both main() (development server) and wsgi.py (production
+    server).
 
     DESIGN:
-    The selected avatar image's filename is returned from the
-    jinja / html template to python as
-    'http://127.0.0.1:5000/filename.ext'.  In order to convert the image
-    into binary format, the actual directory path to the image is
-    needed, for the open(filepath).read() function calls.
-
-    To make this work, a simple str.replace() hack is used to replace
-    the 'http://127.0.0.1:5000' with the program's __file__ variable,
-    to get the program's execution directory.
+    The wsgi argument is True when called by wsgi.py; the worker
+    processes' metrics are then exported to the 'wsgi_metrics_dir'
+    directory in config.json.  The development server does not export
+    its metrics, unless the 'metrics_dir' key is set.
     '''
 
-    #STRING REPLACEMENT TO FROM HTML SITE TO ACTUAL IMAGE LOCATION
-    fname = filename.replace(CFG['site'], os.path.dirname(os.path.realpath(__file__)))
-    #RETURN BINARY VALUE
-    return open(fname, 'rb').read()
-
-
-#-----------------------------------------------------------------------
-#MAIN CONTROLLER
-def main():
-
     global CFG
+    global AVATARS
 
     #READ THE CONFIG FILE INTO A GLOBAL CONSTANT
     CFG = setup()
 
+    #SHARE THE METRICS BETWEEN THE WSGI SERVER'S WORKER PROCESSES
+    if wsgi:
+        CFG['metrics_dir'] = CFG['wsgi_metrics_dir']
+
+    #LOAD THE AVATAR REGISTRY (BEFORE THE DATABASE SETUP, WHICH ADDS THE IMAGES TO THE CATALOG)
+    AVATARS = avatars_setup()
+
     #DATABASE SETUP
     db_setup()
 
+    #METRICS SETUP
+    metrics_setup()
+
+
+#-----------------------------------------------------------------------
+#MAIN CONTROLLER
+def main():
+
+    #PROGRAM SETUP
+    init()
+
     #RUN IT!
     APP.run(host=CFG['host'], port=CFG['port'],
-            debug=CFG['app_debug'],
-            threaded=CFG['app_threaded'])
+            debug=str2bool(CFG['app_debug']),
+            threaded=str2bool(CFG['app_threaded']))
 
 
 #-----------------------------------------------------------------------
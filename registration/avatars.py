@@ -0,0 +1,246 @@
+'''------------------------------------------------------------------------------------------------
+Program:    avatars.py
+Version:    0.2.0
+Py Ver:     2.7
+Purpose:    Read-only, in-memory registry of the avatar images offered by the registration page.
+
+Dependents: collections
+            hashlib
+            os
+            PIL (optional; Pillow)
+            StringIO
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:
+
+Use:        From the app program:
+            ---------------------
+            import avatars
+
+            registry = avatars.AvatarRegistry(folder='static/images', sizes=[40, 200])
+
+            if 'alien.png' in registry:
+                avatar = registry.get('alien.png')
+                print avatar.avatar_id, avatar.mimetype, len(avatar.image)
+                print dict(avatar.thumbnails).keys()
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       Added thumbnails: a smaller copy of each image is made
+                                        for each display size (e.g. 40px and 200px), when the
+                                        PIL (Pillow) package is installed.
+------------------------------------------------------------------------------------------------'''
+
+import hashlib
+import os
+
+from collections import namedtuple
+from StringIO import StringIO
+
+try:
+    from PIL import Image
+except ImportError:
+    #THUMBNAILS ARE NOT MADE; THE FULL SIZE IMAGES ARE USED AT ALL SIZES
+    Image = None
+
+
+#LARGEST IMAGE WHICH FITS THE AVATAR CATALOG'S BLOB FIELD
+MAX_SIZE = 65535
+
+#IMAGE FILE SIGNATURES
+SIGNATURES = (('\x89PNG\r\n\x1a\n', 'image/png'),
+              ('\xff\xd8\xff', 'image/jpeg'),
+              ('GIF87a', 'image/gif'),
+              ('GIF89a', 'image/gif'))
+
+#AVATAR RECORD (IMMUTABLE); THUMBNAILS IS A TUPLE OF (SIZE, PNG IMAGE) PAIRS
+Avatar = namedtuple('Avatar', ['name', 'avatar_id', 'mimetype', 'image', 'thumbnails'])
+
+
+class AvatarRegistry(object):
+
+    '''
+    PURPOSE:
+    This class holds the avatar images offered by the registration
+    page, so a registration looks up the selected image in memory by
+    its name (e.g. 'alien.png'), rather than reading the image file
+    from disk.
+
+    DESIGN:
+    Each image file in the folder is read, and validated, once on
+    instantiation.  An image is accepted if it is not empty, is no
+    larger than MAX_SIZE bytes, and has a PNG, JPEG or GIF file
+    signature.  Invalid files are reported and skipped; so an unknown
+    or invalid name is rejected by a registration, before the
+    database is used.
+
+    Each image is held as an Avatar (named tuple) of its name, id,
+    mimetype, binary data and thumbnails.  The id is the SHA-1 digest
+    of the image; the image's key in the avatarcatalog table.
+
+    Thumbnails:
+    For each of the passed sizes (pixels), a thumbnail is made, so the
+    scoreboard can send a small image for a small display size rather
+    than the full size image.  A thumbnail is only kept if the image is
+    larger than the size (images are not enlarged), and the thumbnail
+    is smaller (in bytes) than the image; otherwise the scoreboard
+    uses the full size image at that size.  Thumbnails are PNG images,
+    with the aspect ratio kept.  If the PIL (Pillow) package is not
+    installed, no thumbnails are made.
+
+    The registry is read-only once loaded: there are no methods to
+    add or remove images, and the Avatar records are immutable; so the
+    registry can be shared by any number of request threads (and
+    other modules) without locking.
+
+    USE:
+    import avatars
+
+    registry = avatars.AvatarRegistry(folder='static/images', sizes=[40, 200])
+    avatar = registry.get('alien.png')
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, folder, sizes=()):
+
+        self._folder    = folder
+        self._sizes     = sorted(set(sizes))
+        self._avatars   = dict()
+
+        #LOAD AND VALIDATE IMAGES
+        for fname in sorted(os.listdir(folder)):
+            avatar = self._load(fname=fname)
+            if avatar:
+                self._avatars[fname] = avatar
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS TRUE IF THE NAME IS A KNOWN AVATAR
+    def __contains__(self, name):
+
+        return name in self._avatars
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE NUMBER OF AVATARS
+    def __len__(self):
+
+        return len(self._avatars)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS AN ITERATOR OVER THE AVATARS, IN NAME ORDER
+    def __iter__(self):
+
+        return iter([self._avatars[name] for name in sorted(self._avatars)])
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS AN AVATAR BY NAME
+    def get(self, name):
+
+        '''
+        PURPOSE:
+        The get() function returns the Avatar record for the passed
+        name (image filename), or None if the name is unknown.
+        '''
+
+        return self._avatars.get(name)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE AVATAR NAMES
+    def names(self):
+
+        return sorted(self._avatars)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION LOADS AND VALIDATES A SINGLE IMAGE
+    def _load(self, fname):
+
+        '''
+        PURPOSE:
+        The _load() function returns an Avatar record for the passed
+        file, or None if the file is not a valid avatar image (the
+        reason is printed).
+        '''
+
+        path = os.path.join(self._folder, fname)
+
+        #SKIP DIRECTORIES AND HIDDEN FILES
+        if fname.startswith('.') or not os.path.isfile(path):
+            return None
+
+        try:
+            with open(path, 'rb') as fimage:
+                image = fimage.read()
+
+        except (IOError, OSError) as err:
+            #NOTIFICATION
+            print 'ERR: Could not read the avatar image %s.' % fname
+            print 'ERR: %s' % err
+            return None
+
+        #VALIDATE
+        mimetype = next((mime for sig, mime in SIGNATURES if image.startswith(sig)), None)
+        if not image or len(image) > MAX_SIZE or mimetype is None:
+            #NOTIFICATION
+            print 'ERR: The avatar image %s is empty, too large or not an image; ignored.' % fname
+            return None
+
+        return Avatar(name=fname, avatar_id=hashlib.sha1(image).hexdigest(),
+                      mimetype=mimetype, image=image,
+                      thumbnails=self._thumbnails(fname=fname, image=image))
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION RETURNS THE THUMBNAILS OF AN IMAGE
+    def _thumbnails(self, fname, image):
+
+        '''
+        PURPOSE:
+        The _thumbnails() function returns a tuple of (size, image)
+        pairs; one for each size at which a smaller image is made.
+        Refer to the class docstring.
+        '''
+
+        #TEST FOR PIL
+        if Image is None or not self._sizes:
+            return ()
+
+        thumbnails = list()
+
+        try:
+            source = Image.open(StringIO(image))
+            source.load()
+            #CONVERT PALETTE AND GREYSCALE IMAGES, SO THEY ARE RESAMPLED SMOOTHLY
+            if source.mode not in ('RGB', 'RGBA'):
+                source = source.convert('RGBA')
+
+            for size in self._sizes:
+                #DO NOT ENLARGE
+                if max(source.size) <= size:
+                    continue
+
+                thumb = source.copy()
+                thumb.thumbnail((size, size), Image.ANTIALIAS)
+                buf = StringIO()
+                thumb.save(buf, format='PNG', optimize=True)
+
+                #KEEP ONLY IF SMALLER
+                if len(buf.getvalue()) < len(image):
+                    thumbnails.append((size, buf.getvalue()))
+
+        except Exception as err:
+            #NOTIFICATION
+            print 'ERR: Could not make thumbnails of the avatar image %s.' % fname
+            print 'ERR: %s' % err
+            return ()
+
+        return tuple(thumbnails)
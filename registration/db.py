@@ -1,11 +1,16 @@
 '''------------------------------------------------------------------------------------------------
 Program:    db.py
-Version:    1.0.1
+Version:    1.8.1
 Py Ver:     2.7
 Purpose:    Database class for pibike registration program.
 
-Dependents: json
+Dependents: datetime
+            json
+            metrics
+            migrate
             mysql.connector
+            pool
+            statements
 
 Developer:  J. Berendt
 Email:      support@73rdstreetdevelopment.co.uk
@@ -39,10 +44,58 @@ Date        Programmer      Version     Update
                                         Extended header to 100 characters.  pylint (10/10)
 25.08.17    J. Berendt      1.0.1       No functional changes.
                                         Generalised company branding for github.
+18.10.26    J. Berendt      1.1.0       Added a connection pool (pool.py).  connect() now returns a
+                                        pooled connection, and _close() returns the connection to
+                                        the pool.  Pool settings are read from the 'pool' key in
+                                        db_config.json.  Added pool_stats() function.
+18.10.26    J. Berendt      1.2.0       Added a SQL statement registry (statements.py).  All SQL
+                                        files are loaded and validated once, on instantiation,
+                                        rather than being read from disk on each call.
+18.10.26    J. Berendt      1.3.0       create() now applies the versioned schema migrations in
+                                        db_resource/migrations (migrate.py), which create the
+                                        avatardata table and its indexes, and upgrade existing
+                                        databases in place.
+18.10.26    J. Berendt      1.4.0       Added metrics (metrics.py): the time taken by each SQL
+                                        statement (by statement name), the time taken to open a
+                                        new connection, and the connection pool gauges.
+18.10.26    J. Berendt      1.5.0       insert() now stores each avatar image once, in the
+                                        avatarcatalog table (keyed by the image's SHA-1 digest),
+                                        and stores only the digest (avatar_id) in the player's
+                                        avatardata row.
+18.10.26    J. Berendt      1.6.0       Added add_avatars(), which stores the avatar registry's
+                                        images in the avatarcatalog table once, on startup.
+                                        insert() now receives the avatar id, rather than the
+                                        image, so no image data is sent on a registration.
+18.10.26    J. Berendt      1.7.0       add_avatars() also stores each avatar's thumbnails in the
+                                        avatarthumbnail table.
+18.10.26    J. Berendt      1.8.0       insert() now returns False if the alias is already taken;
+                                        detected by the unique index on the name field (duplicate
+                                        key error), so no separate alias check is needed.
+                                        Removed user_exists().  Other insert errors are now
+                                        raised to the caller, rather than reported as a success.
+18.10.26    J. Berendt      1.8.1       BUG: If the connection failed, add_avatars() raised an
+                                        UnboundLocalError (closing an unset connection), which
+                                        stopped the program on startup.
+                                        FIX: The connection is only closed if it was opened.
 ------------------------------------------------------------------------------------------------'''
 
 import json
+import metrics
+import migrate
 import mysql.connector
+import pool
+import statements
+
+from datetime import datetime as dt
+
+#DUPLICATE KEY ERROR; RAISED BY THE UNIQUE INDEX ON avatardata.name WHEN AN ALIAS IS TAKEN
+ERR_DUPLICATE = 1062
+
+#METRICS
+QUERY_TIME      = metrics.REGISTRY.histogram('db_query_seconds',
+                                             'Time taken to execute a SQL statement, by name.')
+CONNECT_TIME    = metrics.REGISTRY.histogram('db_connect_seconds',
+                                             'Time taken to open a new database connection.')
 
 
 class DBConn(object):
@@ -54,7 +107,8 @@ class DBConn(object):
 
     DESIGN:
     On class instantiation, both the database and the program config
-    files are read into class dictionary objects.
+    files are read into class dictionary objects, and the connection
+    pool is created.
 
     USE:
     import db
@@ -79,6 +133,20 @@ class DBConn(object):
         self._db_config = json.loads(open(db_config_file).read())
         self._config    = json.loads(open('config.json').read())
 
+        #LOAD AND VALIDATE ALL SQL STATEMENTS (FAILS ON STARTUP IF A FILE IS MISSING)
+        self.statements = statements.Statements(config=self._config,
+                                                reload_interval=self._config['sql_reload_interval'])
+
+        #CREATE CONNECTION POOL (POOL SETTINGS ARE NOT PASSED TO THE CONNECTION)
+        self._pool = pool.ConnectionPool(connect=self._connect,
+                                         **self._db_config.pop('pool', {}))
+
+        #REPORT CONNECTION POOL GAUGES
+        metrics.REGISTRY.gauge('db_pool_open_connections', 'Open database connections.',
+                               func=lambda: self._pool.stats()['open'])
+        metrics.REGISTRY.gauge('db_pool_idle_connections', 'Idle database connections.',
+                               func=lambda: self._pool.stats()['idle'])
+
 
     #-------------------------------------------------------------------
     #FUNCTION RETURNS THE DB CONNECTION OBJECT
@@ -86,13 +154,15 @@ class DBConn(object):
 
         '''
         DESIGN:
-        The connect() function uses mysql.connector.connect() to make
-        a connection to the database - passing in a dictionary of
-        connection values.  This is the dictionary (.json file)
-        initially passed into the class on instantiaion.
+        The connect() function returns a connection from the
+        connection pool.  New connections are made using
+        mysql.connector.connect() - passing in a dictionary of
+        connection values (refer to _connect()).  This is the
+        dictionary (.json file) initially passed into the class on
+        instantiaion.
         '''
 
-        return mysql.connector.connect(**self._db_config)
+        return self._pool.acquire()
 
 
     #-------------------------------------------------------------------
@@ -101,103 +171,174 @@ class DBConn(object):
 
         '''
         PURPOSE:
-        This method is used to create the avatardata table.
+        This method is used to create the avatardata table and its
+        indexes, or upgrade an existing table to the latest schema.
 
         DESIGN:
         This method should be called *once* on program startup; perhaps
         from the main() method of the program.
 
-        The create script is contained in the
-        /db_resource/qry_create_avatardata.sql file.
+        The create script and the schema changes are contained in the
+        /db_resource/migrations directory, and are applied in order by
+        the migrate.Migrator class.  The schema version is recorded in
+        the schema_version table under the 'registration' component.
         '''
 
         try:
-            #CREATE CONNECTION AND CURSOR OBJECTS
-            conn = self.connect()
-            cur  = conn.cursor()
-
-            #READ QUERY
-            qry = open(self._config['qry_create_avatardata']).read()
-
-            #EXECUTE / COMMIT / CLOSE CONNECTION
-            cur.execute(qry)
-            conn.commit()
-            self._close(connection=conn)
+            #APPLY PENDING MIGRATIONS
+            migrator = migrate.Migrator(connect=self.connect, component='registration',
+                                        path=self._config['dir_migrations'])
+            migrator.migrate()
 
         except Exception as err:
             #NOTIFICATION
-            print 'ERR: An error occurred while creating the table.'
+            print 'ERR: An error occurred while creating / migrating the table.'
             print 'ERR: %s' % err
 
 
     #-------------------------------------------------------------------
-    #METHOD USED TO INSERT DATA INTO THE DATABASE
+    #FUNCTION USED TO INSERT DATA INTO THE DATABASE
     def insert(self, values):
 
         '''
         PURPOSE:
-        The insert() method is used for inserting new registration
-        data into the avatardata table.
+        The insert() function is used for inserting new registration
+        data into the avatardata table.  True is returned if the player
+        was added, or False if the alias (name) is already taken.
+
+        DESIGN:
+        The alias is checked by the database, in the same statement: the
+        unique index on the name field (refer to the
+        0002_avatardata_indexes.sql migration) rejects a taken alias
+        with a duplicate key error.  This takes a single round trip, and
+        two registrations of the same alias at the same time cannot both
+        be added.
+
+        Any other error is reported and raised to the caller.
+
+        The last value is the avatar id (the key of the image in the
+        avatarcatalog table); the images are added to the catalog on
+        startup, by add_avatars().
         '''
 
+        #CONNECT TO DB
+        conn = self.connect()
+
         try:
-            #CONNECT TO DB
-            conn = self.connect()
             cur  = conn.cursor()
 
-            #READ QUERY
-            qry = open(self._config['qry_insert_avatardata']).read()
+            #GET QUERY
+            qry = self.statements['qry_insert_avatardata']
 
             #ADD NEW RECORD / COMMIT / CLOSE
-            cur.execute(qry, values)
-            conn.commit()
+            with QUERY_TIME.time(query='qry_insert_avatardata'):
+                cur.execute(qry, values)
+                conn.commit()
 
         except Exception as err:
             #ROLL BACK ON ERROR
             conn.rollback()
+
+            #TEST FOR A TAKEN ALIAS
+            if getattr(err, 'errno', None) == ERR_DUPLICATE:
+                return False
+
             #NOTIFICATION
             print 'ERR: An error occurred while inserting data.'
             print 'ERR: %s' % err
+            raise
 
         finally:
             #CLOSE CONNECTION
             self._close(connection=conn)
 
+        return True
+
 
     #-------------------------------------------------------------------
-    #FUNCTION RETURNS ZERO IF THE USER DOES NOT EXIST
-    def user_exists(self, alias):
+    #METHOD USED TO ADD THE AVATAR IMAGES TO THE AVATAR CATALOG
+    def add_avatars(self, avatars):
 
         '''
         PURPOSE:
-        This function is used to test if a name (alias) exists, before
-        adding a new name (alias).
+        The add_avatars() method stores each image in the passed avatar
+        registry (avatars.AvatarRegistry) in the avatarcatalog table,
+        and each image's thumbnails in the avatarthumbnail table; where
+        the scoreboard reads them.
+
+        DESIGN:
+        This method should be called *once* on program startup, after
+        create().  Images already held in the catalog are ignored (the
+        catalog is keyed by the image's digest), so the images are only
+        written when first deployed, or when changed.  Thumbnails are
+        replaced; so thumbnails made with different settings, or a new
+        version of PIL, take effect on restart.
         '''
 
-        #INITIALISE
-        result = None
+        #NOT SET IF THE CONNECTION FAILS
+        conn = None
 
         try:
             #CONNECT TO DB
             conn = self.connect()
-            cur = conn.cursor()
+            cur  = conn.cursor()
 
-            #READ QUERY
-            qry = open(self._config['qry_alias_exists']).read()
+            #ADD ALL IMAGES IN ONE STATEMENT
+            now = dt.now()
+            with QUERY_TIME.time(query='qry_insert_avatarcatalog'):
+                cur.executemany(self.statements['qry_insert_avatarcatalog'],
+                                [(avatar.avatar_id, avatar.image, now) for avatar in avatars])
 
-            #ADD NEW RECORD / COMMIT / CLOSE
-            cur.execute(qry, (alias,))
-            result = cur.fetchall()[0][0]
+            #ADD ALL THUMBNAILS / COMMIT
+            thumbnails = [(avatar.avatar_id, size, image)
+                          for avatar in avatars for size, image in avatar.thumbnails]
+            if thumbnails:
+                with QUERY_TIME.time(query='qry_insert_avatarthumbnail'):
+                    cur.executemany(self.statements['qry_insert_avatarthumbnail'], thumbnails)
+
+            conn.commit()
 
         except Exception as err:
             #NOTIFICATION
+            print 'ERR: An error occurred while adding the avatar images to the catalog.'
             print 'ERR: %s' % err
 
         finally:
-            #CLOSE CONNECTION
-            self._close(connection=conn)
+            #CLOSE CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                self._close(connection=conn)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CONNECTION POOL STATISTICS
+    def pool_stats(self):
+
+        '''
+        PURPOSE:
+        The pool_stats() function returns the connection pool's
+        statistics; including the time spent waiting for a connection.
+        Refer to the docstring for pool.ConnectionPool.stats().
+        '''
+
+        return self._pool.stats()
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TO OPEN A NEW DB CONNECTION (USED BY THE POOL)
+    def _connect(self):
+
+        '''
+        DESIGN:
+        The dictionary of connection values (db_config.json) is passed
+        into the mysql.connector.connect() function as a **kwargs
+        argument.
+
+        The time taken to open the connection is recorded in the
+        db_connect_seconds metric.
+        '''
 
-        return result
+        with CONNECT_TIME.time():
+            return mysql.connector.connect(**self._db_config)
 
 
     #-------------------------------------------------------------------
@@ -207,7 +348,8 @@ class DBConn(object):
         '''
         PURPOSE:
         The _close() method is a 'private' method used to close a
-        database connection.
+        database connection.  For a pooled connection, the connection
+        is returned to the pool.
         '''
 
         #:no-self-use (R0201): *Method could be a function*
@@ -0,0 +1,29 @@
+
+-- ADD INDEXES FOR THE QUEUE, SCOREBOARD AND ALIAS QUERIES
+
+-- RENAME ANY DUPLICATE ALIASES (KEEPING THE FIRST REGISTRATION) SO THE UNIQUE INDEX CAN BE ADDED
+-- THE ROWNUM IS APPENDED TO THE ALIAS, TRUNCATED TO FIT THE FIELD WIDTH
+UPDATE
+    avatardata a
+    INNER JOIN (
+        SELECT
+              name
+            , MIN(rownum) AS keep
+        FROM
+            avatardata
+        GROUP BY
+            name
+        HAVING
+            COUNT(*) > 1
+    ) d ON a.name = d.name AND a.rownum <> d.keep
+SET
+    a.name = CONCAT(LEFT(a.name, 24), '~', a.rownum);
+
+-- ALIAS LOOKUP (ALIAS CHECK, PLAYER ACTIONS); ENFORCES ONE PLAYER PER ALIAS
+ALTER TABLE avatardata ADD UNIQUE INDEX ux_avatardata_name (name);
+
+-- NOW PLAYING AND QUEUE (FILTER ON STATUS, ORDER BY QUEUE POSITION)
+ALTER TABLE avatardata ADD INDEX ix_avatardata_status_queue (status, queueposition);
+
+-- SCOREBOARD (FILTER ON STATUS, ORDER BY HIGH SCORE)
+ALTER TABLE avatardata ADD INDEX ix_avatardata_status_score (status, gamehighscore);
\ No newline at end of file
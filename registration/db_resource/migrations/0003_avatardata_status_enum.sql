@@ -0,0 +1,16 @@
+
+-- STORE THE PLAYER STATUS AS AN ENUM, SO THE STATUS QUERIES CAN COMPARE THE COLUMN DIRECTLY
+-- (RATHER THAN USING UPPER(status), WHICH CANNOT USE THE STATUS INDEXES)
+-- ANY CASE VARIANT WRITTEN LATER (E.G. 'Complete') IS STORED AS THE CANONICAL UPPER CASE VALUE
+
+-- NORMALISE EXISTING VALUES
+UPDATE avatardata SET status = UPPER(TRIM(status)) WHERE status IS NOT NULL;
+
+-- NULL STATUSES WERE NEVER DISPLAYED >> DELETED
+UPDATE avatardata SET status = 'DELETED' WHERE status IS NULL;
+
+-- UNKNOWN STATUSES WERE DISPLAYED IN THE QUEUE >> QUEUED
+UPDATE avatardata SET status = 'QUEUED' WHERE status NOT IN ('QUEUED', 'PLAYING', 'COMPLETE', 'DELETED');
+
+-- CONVERT COLUMN
+ALTER TABLE avatardata MODIFY status ENUM('QUEUED', 'PLAYING', 'COMPLETE', 'DELETED') NOT NULL DEFAULT 'QUEUED';
\ No newline at end of file
@@ -0,0 +1,91 @@
+
+-- MATERIALISED TOP-N LEADERBOARD, READ BY THE SCOREBOARD RATHER THAN SORTING EVERY COMPLETED GAME
+-- THE TABLE IS REBUILT (BY THE refresh_leaderboard PROCEDURE) ONLY WHEN A COMPLETED PLAYER CHANGES:
+--   - A PLAYER'S STATUS MOVES TO, OR FROM, 'COMPLETE'
+--   - A COMPLETED PLAYER'S SCORE, NAME OR AVATAR CHANGES
+-- FIELDS:
+--   - position:    1-N, IN SCOREBOARD ORDER (HIGH SCORE, THEN FIRST REGISTERED)
+--   - ranking:     1 + NUMBER OF HIGHER SCORES; SO TIED SCORES SHARE A RANK
+--   - rownum:      THE PLAYER'S avatardata ROW (AVATAR REFERENCE)
+
+CREATE TABLE IF NOT EXISTS leaderboard (
+      position          INTEGER         PRIMARY KEY  NOT NULL
+    , ranking           INTEGER         NOT NULL
+    , rownum            INTEGER         NOT NULL
+    , name              VARCHAR(35)
+    , gamehighscore     FLOAT
+    );
+
+DROP PROCEDURE IF EXISTS refresh_leaderboard;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_ins;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_upd;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_del;
+
+DELIMITER $$
+
+-- REBUILD THE LEADERBOARD FROM THE TOP 10 COMPLETED PLAYERS (A MARGIN ABOVE THE 5 DISPLAYED)
+-- THE TOP-N ROWS AND THEIR RANKS ARE READ FROM THE (status, gamehighscore) INDEX
+CREATE PROCEDURE refresh_leaderboard()
+BEGIN
+    DELETE FROM leaderboard;
+
+    INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+    SELECT
+          1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND (a.gamehighscore > t.gamehighscore
+                      OR (a.gamehighscore = t.gamehighscore AND a.rownum < t.rownum)))
+        , 1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND a.gamehighscore > t.gamehighscore)
+        , t.rownum
+        , t.name
+        , t.gamehighscore
+    FROM (
+        SELECT
+              rownum
+            , name
+            , gamehighscore
+        FROM
+            avatardata
+        WHERE
+            status = 'COMPLETE'
+        ORDER BY
+              gamehighscore DESC
+            , rownum ASC
+        LIMIT 10
+    ) t;
+END $$
+
+CREATE TRIGGER avatardata_leaderboard_ins AFTER INSERT ON avatardata
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'COMPLETE' THEN
+        CALL refresh_leaderboard();
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_leaderboard_upd AFTER UPDATE ON avatardata
+FOR EACH ROW
+BEGIN
+    IF (NEW.status = 'COMPLETE' OR OLD.status = 'COMPLETE')
+       AND NOT (NEW.status <=> OLD.status
+                AND NEW.gamehighscore <=> OLD.gamehighscore
+                AND NEW.name <=> OLD.name
+                AND NEW.avatar <=> OLD.avatar) THEN
+        CALL refresh_leaderboard();
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_leaderboard_del AFTER DELETE ON avatardata
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'COMPLETE' THEN
+        CALL refresh_leaderboard();
+    END IF;
+END $$
+
+DELIMITER ;
+
+-- INITIAL POPULATION
+CALL refresh_leaderboard();
\ No newline at end of file
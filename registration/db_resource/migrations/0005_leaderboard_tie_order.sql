@@ -0,0 +1,48 @@
+
+-- ORDER TIED SCORES BY THE LATEST REGISTRATION FIRST (rownum DESC), MATCHING THE PAGED LEADERBOARD
+-- WITH BOTH FIELDS DESCENDING, THE (status, gamehighscore) INDEX (WHICH ENDS WITH rownum) CAN BE
+-- READ BACKWARDS, WITHOUT A SORT
+-- (THE TRIGGERS CALL THE PROCEDURE BY NAME, SO ARE NOT CHANGED)
+
+DROP PROCEDURE IF EXISTS refresh_leaderboard;
+
+DELIMITER $$
+
+-- REBUILD THE LEADERBOARD FROM THE TOP 10 COMPLETED PLAYERS (A MARGIN ABOVE THE 5 DISPLAYED)
+-- THE TOP-N ROWS AND THEIR RANKS ARE READ (BACKWARDS) FROM THE (status, gamehighscore) INDEX
+CREATE PROCEDURE refresh_leaderboard()
+BEGIN
+    DELETE FROM leaderboard;
+
+    INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+    SELECT
+          1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND (a.gamehighscore > t.gamehighscore
+                      OR (a.gamehighscore = t.gamehighscore AND a.rownum > t.rownum)))
+        , 1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND a.gamehighscore > t.gamehighscore)
+        , t.rownum
+        , t.name
+        , t.gamehighscore
+    FROM (
+        SELECT
+              rownum
+            , name
+            , gamehighscore
+        FROM
+            avatardata
+        WHERE
+            status = 'COMPLETE'
+        ORDER BY
+              gamehighscore DESC
+            , rownum DESC
+        LIMIT 10
+    ) t;
+END $$
+
+DELIMITER ;
+
+-- RE-POPULATE
+CALL refresh_leaderboard();
\ No newline at end of file
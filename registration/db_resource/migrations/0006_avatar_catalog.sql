@@ -0,0 +1,25 @@
+-- STORE EACH AVATAR IMAGE ONCE, IN THE avatarcatalog TABLE, KEYED BY THE SHA-1 DIGEST OF THE IMAGE
+-- EACH PLAYER'S avatardata ROW HOLDS ONLY THE DIGEST (avatar_id), RATHER THAN A COPY OF THE IMAGE
+-- THE DIGEST IS ALSO USED BY THE SCOREBOARD AS THE AVATAR'S URL AND ETAG (/avatar/<avatar_id>)
+
+CREATE TABLE IF NOT EXISTS avatarcatalog (
+      avatar_id         CHAR(40)        PRIMARY KEY  NOT NULL
+    , image             BLOB            NOT NULL
+    , datecreated       DATETIME
+    );
+
+ALTER TABLE avatardata ADD COLUMN avatar_id CHAR(40) AFTER avatar;
+
+-- COPY EACH DISTINCT IMAGE INTO THE CATALOG (DUPLICATES ARE IGNORED BY THE PRIMARY KEY)
+INSERT IGNORE INTO avatarcatalog (avatar_id, image, datecreated)
+SELECT
+      SHA1(avatar)
+    , avatar
+    , NOW()
+FROM
+    avatardata
+WHERE
+    avatar IS NOT NULL;
+
+-- REFERENCE THE CATALOG FROM EACH PLAYER
+UPDATE avatardata SET avatar_id = SHA1(avatar) WHERE avatar IS NOT NULL AND avatar_id IS NULL;
@@ -0,0 +1,23 @@
+-- REMOVE THE COPY OF THE AVATAR IMAGE FROM EACH PLAYER (NOW HELD IN THE avatarcatalog TABLE)
+-- THE LEADERBOARD UPDATE TRIGGER IS RE-CREATED FIRST, TO TEST THE avatar_id FIELD RATHER THAN THE
+-- DROPPED avatar FIELD (REFER TO 0004_leaderboard.sql)
+
+DROP TRIGGER IF EXISTS avatardata_leaderboard_upd;
+
+DELIMITER $$
+
+CREATE TRIGGER avatardata_leaderboard_upd AFTER UPDATE ON avatardata
+FOR EACH ROW
+BEGIN
+    IF (NEW.status = 'COMPLETE' OR OLD.status = 'COMPLETE')
+       AND NOT (NEW.status <=> OLD.status
+                AND NEW.gamehighscore <=> OLD.gamehighscore
+                AND NEW.name <=> OLD.name
+                AND NEW.avatar_id <=> OLD.avatar_id) THEN
+        CALL refresh_leaderboard();
+    END IF;
+END $$
+
+DELIMITER ;
+
+ALTER TABLE avatardata DROP COLUMN avatar;
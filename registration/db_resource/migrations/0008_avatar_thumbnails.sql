@@ -0,0 +1,13 @@
+-- SMALLER COPIES (THUMBNAILS) OF THE AVATAR CATALOG IMAGES, ONE PER DISPLAY SIZE
+-- WRITTEN BY THE REGISTRATION APP ON STARTUP, AND READ BY THE SCOREBOARD (/avatar/<avatar_id>?size=n)
+-- FIELDS:
+--   - avatar_id:   THE IMAGE'S KEY IN THE avatarcatalog TABLE
+--   - size:        THE LARGEST SIDE OF THE THUMBNAIL, IN PIXELS
+--   - image:       THE THUMBNAIL (PNG)
+
+CREATE TABLE IF NOT EXISTS avatarthumbnail (
+      avatar_id         CHAR(40)        NOT NULL
+    , size              SMALLINT        NOT NULL
+    , image             BLOB            NOT NULL
+    , PRIMARY KEY (avatar_id, size)
+    );
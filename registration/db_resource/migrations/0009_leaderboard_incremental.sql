@@ -0,0 +1,193 @@
+
+-- MAINTAIN THE LEADERBOARD INCREMENTALLY, FROM THE CHANGED ROW ONLY (REFER TO 0004_leaderboard.sql)
+-- PREVIOUSLY, EACH QUALIFYING avatardata CHANGE REBUILT THE WHOLE LEADERBOARD (DELETE, THEN
+-- INSERT ... SELECT) INSIDE THE WRITER'S TRANSACTION; TAKING SHARED LOCKS ACROSS THE COMPLETED
+-- PLAYERS, AND SERIALISING WRITERS
+-- NOW, THE TRIGGERS PASS THE CHANGED ROW TO THE leaderboard_apply PROCEDURE, WHICH:
+--   - READS ONLY THE LEADERBOARD (10 ROWS) FOR A PLAYER WHO IS NOT, AND DOES NOT ENTER, THE TOP 10
+--     (MOST COMPLETED GAMES); THE LEADERBOARD IS NOT WRITTEN
+--   - READS ONE avatardata ROW (FROM THE (status, gamehighscore) INDEX) ONLY WHEN A PLAYER LEAVES
+--     THE TOP 10, TO TAKE THEIR PLACE
+-- THE LEADERBOARD IS ALWAYS THE TOP 10 OF THE ORDERING; SO EACH ENTRY'S RANK (1 + NUMBER OF HIGHER
+-- SCORES) CAN BE COUNTED WITHIN THE LEADERBOARD ITSELF
+-- COMPLETED PLAYERS WITHOUT A SCORE (NULL) ARE NOT HELD ON THE LEADERBOARD
+-- THE LEADERBOARD IS NOW KEYED BY rownum, SO ENTRIES CAN BE ADDED AND RE-NUMBERED IN PLACE
+-- refresh_leaderboard() IS KEPT FOR A FULL REBUILD (E.G. AFTER A BULK LOAD)
+
+ALTER TABLE leaderboard DROP PRIMARY KEY, ADD PRIMARY KEY (rownum);
+
+DROP PROCEDURE IF EXISTS refresh_leaderboard;
+DROP PROCEDURE IF EXISTS leaderboard_apply;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_ins;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_upd;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_del;
+
+DELIMITER $$
+
+-- REBUILD THE LEADERBOARD FROM THE TOP 10 COMPLETED PLAYERS (AS 0005_leaderboard_tie_order.sql,
+-- EXCLUDING PLAYERS WITHOUT A SCORE)
+CREATE PROCEDURE refresh_leaderboard()
+BEGIN
+    DELETE FROM leaderboard;
+
+    INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+    SELECT
+          1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND (a.gamehighscore > t.gamehighscore
+                      OR (a.gamehighscore = t.gamehighscore AND a.rownum > t.rownum)))
+        , 1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND a.gamehighscore > t.gamehighscore)
+        , t.rownum
+        , t.name
+        , t.gamehighscore
+    FROM (
+        SELECT
+              rownum
+            , name
+            , gamehighscore
+        FROM
+            avatardata
+        WHERE
+            status = 'COMPLETE'
+            AND gamehighscore IS NOT NULL
+        ORDER BY
+              gamehighscore DESC
+            , rownum DESC
+        LIMIT 10
+    ) t;
+END $$
+
+-- APPLY A CHANGE TO ONE PLAYER:
+--   - p_rownum / p_name / p_score:     THE PLAYER'S NEW VALUES
+--   - p_complete:                      TRUE IF THE PLAYER IS NOW COMPLETE, WITH A SCORE
+-- STEPS:
+--   1) REMOVE THE PLAYER, IF ON THE LEADERBOARD
+--   2) IF REMOVED, TAKE THE NEXT PLAYER (AFTER THE LAST ENTRY) FROM avatardata; SO THE LEADERBOARD
+--      HOLDS THE TOP 10 OF THE OTHER PLAYERS
+--   3) IF COMPLETE, ADD THE PLAYER IF THEY PLACE ABOVE THE LAST ENTRY (OR THERE ARE FEWER THAN 10),
+--      AND DROP THE LAST ENTRY IF THERE ARE NOW 11
+--   4) IF THE ENTRIES CHANGED, RE-NUMBER THEIR POSITIONS AND RANKS
+CREATE PROCEDURE leaderboard_apply(IN p_rownum INTEGER, IN p_name VARCHAR(35), IN p_score FLOAT,
+                                   IN p_complete BOOLEAN)
+BEGIN
+    DECLARE v_changed   BOOLEAN DEFAULT FALSE;
+    DECLARE v_found     BOOLEAN DEFAULT TRUE;
+    DECLARE v_count     INTEGER;
+    DECLARE v_score     FLOAT;
+    DECLARE v_rownum    INTEGER;
+    DECLARE v_name      VARCHAR(35);
+
+    -- NO ROW FOUND BY THE REFILL
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_found = FALSE;
+
+    -- 1) REMOVE
+    DELETE FROM leaderboard WHERE rownum = p_rownum;
+    SET v_changed = ROW_COUNT() > 0;
+
+    -- LAST ENTRY (LOWEST SCORE, THEN FIRST REGISTERED)
+    SELECT COUNT(*), MIN(gamehighscore) INTO v_count, v_score FROM leaderboard;
+    SELECT MIN(rownum) INTO v_rownum FROM leaderboard WHERE gamehighscore = v_score;
+
+    -- 2) REFILL
+    IF v_changed AND v_count < 10 THEN
+        SELECT
+              rownum
+            , name
+            , gamehighscore
+        INTO
+              v_rownum
+            , v_name
+            , v_score
+        FROM
+            avatardata
+        WHERE
+            status = 'COMPLETE'
+            AND gamehighscore IS NOT NULL
+            AND rownum <> p_rownum
+            AND (v_rownum IS NULL
+                 OR gamehighscore < v_score
+                 OR (gamehighscore = v_score AND rownum < v_rownum))
+        ORDER BY
+              gamehighscore DESC
+            , rownum DESC
+        LIMIT 1;
+
+        IF v_found THEN
+            INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+            VALUES (0, 0, v_rownum, v_name, v_score);
+            SET v_count = v_count + 1;
+        END IF;
+
+        SELECT MIN(gamehighscore) INTO v_score FROM leaderboard;
+        SELECT MIN(rownum) INTO v_rownum FROM leaderboard WHERE gamehighscore = v_score;
+    END IF;
+
+    -- 3) ADD
+    IF p_complete AND (v_count < 10
+                       OR p_score > v_score
+                       OR (p_score = v_score AND p_rownum > v_rownum)) THEN
+        INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+        VALUES (0, 0, p_rownum, p_name, p_score);
+        IF v_count >= 10 THEN
+            DELETE FROM leaderboard WHERE rownum = v_rownum;
+        END IF;
+        SET v_changed = TRUE;
+    END IF;
+
+    -- 4) RE-NUMBER
+    IF v_changed THEN
+        UPDATE
+            leaderboard l
+            INNER JOIN (
+                SELECT
+                      a.rownum
+                    , 1 + SUM(b.gamehighscore > a.gamehighscore
+                              OR (b.gamehighscore = a.gamehighscore AND b.rownum > a.rownum))
+                                                                            AS position
+                    , 1 + SUM(b.gamehighscore > a.gamehighscore)            AS ranking
+                FROM
+                    leaderboard a
+                    CROSS JOIN leaderboard b
+                GROUP BY
+                    a.rownum
+            ) r ON r.rownum = l.rownum
+        SET
+              l.position = r.position
+            , l.ranking = r.ranking;
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_leaderboard_ins AFTER INSERT ON avatardata
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'COMPLETE' AND NEW.gamehighscore IS NOT NULL THEN
+        CALL leaderboard_apply(NEW.rownum, NEW.name, NEW.gamehighscore, TRUE);
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_leaderboard_upd AFTER UPDATE ON avatardata
+FOR EACH ROW
+BEGIN
+    IF (NEW.status = 'COMPLETE' OR OLD.status = 'COMPLETE')
+       AND NOT (NEW.status <=> OLD.status
+                AND NEW.gamehighscore <=> OLD.gamehighscore
+                AND NEW.name <=> OLD.name) THEN
+        CALL leaderboard_apply(NEW.rownum, NEW.name, NEW.gamehighscore,
+                               NEW.status = 'COMPLETE' AND NEW.gamehighscore IS NOT NULL);
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_leaderboard_del AFTER DELETE ON avatardata
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'COMPLETE' THEN
+        CALL leaderboard_apply(OLD.rownum, NULL, NULL, FALSE);
+    END IF;
+END $$
+
+DELIMITER ;
+
+-- RE-POPULATE
+CALL refresh_leaderboard();
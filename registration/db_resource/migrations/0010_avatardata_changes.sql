@@ -0,0 +1,95 @@
+
+-- CHANGE COUNTERS FOR THE avatardata TABLE, MAINTAINED BY ITS TRIGGERS
+-- THE SCOREBOARD READS THIS SINGLE ROW (BY PRIMARY KEY) EVERY snapshot_interval SECONDS TO DETECT
+-- CHANGES; RATHER THAN A CHECKSUM OF EVERY avatardata ROW (A FULL TABLE SCAN)
+-- FIELDS:
+--   - changes:         INCREMENTED WHEN A PLAYER IS ADDED OR REMOVED, OR A PLAYER'S STATUS, QUEUE
+--                      POSITION, SCORE, NAME OR AVATAR CHANGES (THE DATA SHOWN ON THE SCOREBOARD)
+--   - score_changes:   INCREMENTED WHEN THE COMPLETED PLAYERS CHANGE; A PLAYER'S STATUS MOVES TO,
+--                      OR FROM, 'COMPLETE', OR A COMPLETED PLAYER'S SCORE OR NAME CHANGES (USED BY
+--                      THE SCOREBOARD'S RANK INDEX)
+-- THE TRIGGERS ARE RENAMED (FROM avatardata_leaderboard_*), AS THEY NOW ALSO MAINTAIN THE COUNTERS;
+-- THE LEADERBOARD IS MAINTAINED AS IN 0009_leaderboard_incremental.sql
+
+CREATE TABLE IF NOT EXISTS avatardata_changes (
+      id                TINYINT         PRIMARY KEY  NOT NULL
+    , changes           BIGINT          NOT NULL
+    , score_changes     BIGINT          NOT NULL
+    );
+
+INSERT IGNORE INTO avatardata_changes (id, changes, score_changes) VALUES (1, 0, 0);
+
+DROP TRIGGER IF EXISTS avatardata_leaderboard_ins;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_upd;
+DROP TRIGGER IF EXISTS avatardata_leaderboard_del;
+DROP TRIGGER IF EXISTS avatardata_changes_ins;
+DROP TRIGGER IF EXISTS avatardata_changes_upd;
+DROP TRIGGER IF EXISTS avatardata_changes_del;
+
+DELIMITER $$
+
+CREATE TRIGGER avatardata_changes_ins AFTER INSERT ON avatardata
+FOR EACH ROW
+BEGIN
+    UPDATE
+        avatardata_changes
+    SET
+          changes = changes + 1
+        , score_changes = score_changes + (NEW.status = 'COMPLETE')
+    WHERE
+        id = 1;
+
+    IF NEW.status = 'COMPLETE' AND NEW.gamehighscore IS NOT NULL THEN
+        CALL leaderboard_apply(NEW.rownum, NEW.name, NEW.gamehighscore, TRUE);
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_changes_upd AFTER UPDATE ON avatardata
+FOR EACH ROW
+BEGIN
+    DECLARE v_scores BOOLEAN;
+
+    -- TEST FOR A CHANGE TO THE COMPLETED PLAYERS
+    SET v_scores = (NEW.status = 'COMPLETE' OR OLD.status = 'COMPLETE')
+                   AND NOT (NEW.status <=> OLD.status
+                            AND NEW.gamehighscore <=> OLD.gamehighscore
+                            AND NEW.name <=> OLD.name);
+
+    -- TEST FOR A CHANGE SHOWN ON THE SCOREBOARD
+    IF NOT (NEW.status <=> OLD.status
+            AND NEW.queueposition <=> OLD.queueposition
+            AND NEW.gamehighscore <=> OLD.gamehighscore
+            AND NEW.name <=> OLD.name
+            AND NEW.avatar_id <=> OLD.avatar_id) THEN
+        UPDATE
+            avatardata_changes
+        SET
+              changes = changes + 1
+            , score_changes = score_changes + v_scores
+        WHERE
+            id = 1;
+    END IF;
+
+    IF v_scores THEN
+        CALL leaderboard_apply(NEW.rownum, NEW.name, NEW.gamehighscore,
+                               NEW.status = 'COMPLETE' AND NEW.gamehighscore IS NOT NULL);
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_changes_del AFTER DELETE ON avatardata
+FOR EACH ROW
+BEGIN
+    UPDATE
+        avatardata_changes
+    SET
+          changes = changes + 1
+        , score_changes = score_changes + (OLD.status = 'COMPLETE')
+    WHERE
+        id = 1;
+
+    IF OLD.status = 'COMPLETE' THEN
+        CALL leaderboard_apply(OLD.rownum, NULL, NULL, FALSE);
+    END IF;
+END $$
+
+DELIMITER ;
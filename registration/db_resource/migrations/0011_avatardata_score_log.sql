@@ -0,0 +1,122 @@
+
+-- LOG OF THE CHANGES TO THE COMPLETED PLAYERS, MAINTAINED BY THE avatardata TRIGGERS
+-- THE SCOREBOARD'S RANK INDEX READS ONLY THE ENTRIES AFTER THE LAST ONE IT APPLIED; RATHER THAN
+-- RE-READING EVERY COMPLETED PLAYER EACH TIME A GAME IS COMPLETED
+-- FIELDS:
+--   - seq:             THE avatardata_changes.score_changes VALUE AFTER THE CHANGE; THE COUNTER ROW IS
+--                      LOCKED UNTIL THE WRITER COMMITS, SO THE ENTRIES ARE NUMBERED IN COMMIT ORDER,
+--                      WITHOUT GAPS
+--   - name:            THE PLAYER'S ALIAS
+--   - gamehighscore:   THE PLAYER'S NEW SCORE; NULL IF THE PLAYER WAS REMOVED (NO LONGER COMPLETE,
+--                      DELETED OR RENAMED), OR HAS NO SCORE
+-- ONLY THE LAST 1000 ENTRIES ARE KEPT; A READER WHICH HAS FALLEN FURTHER BEHIND RE-READS ALL COMPLETED
+-- PLAYERS (REFER TO qry_getdata_ranks.sql IN THE SCOREBOARD PROGRAM)
+-- THE TRIGGERS ARE REPLACED (REFER TO 0010_avatardata_changes.sql); score_changes IS NOW INCREMENTED
+-- ONCE PER LOG ENTRY
+
+CREATE TABLE IF NOT EXISTS avatardata_score_log (
+      seq               BIGINT          PRIMARY KEY  NOT NULL
+    , name              VARCHAR(35)
+    , gamehighscore     FLOAT
+    );
+
+DROP PROCEDURE IF EXISTS score_log;
+DROP TRIGGER IF EXISTS avatardata_changes_ins;
+DROP TRIGGER IF EXISTS avatardata_changes_upd;
+DROP TRIGGER IF EXISTS avatardata_changes_del;
+
+DELIMITER $$
+
+-- ADD AN ENTRY TO THE LOG (INCREMENTING score_changes) >> DROP THE OLDEST ENTRIES
+CREATE PROCEDURE score_log(IN p_name VARCHAR(35), IN p_score FLOAT)
+BEGIN
+    DECLARE v_seq       BIGINT;
+
+    UPDATE
+        avatardata_changes
+    SET
+        score_changes = score_changes + 1
+    WHERE
+        id = 1;
+
+    SELECT score_changes INTO v_seq FROM avatardata_changes WHERE id = 1;
+
+    INSERT INTO avatardata_score_log (seq, name, gamehighscore) VALUES (v_seq, p_name, p_score);
+    DELETE FROM avatardata_score_log WHERE seq <= v_seq - 1000;
+END $$
+
+CREATE TRIGGER avatardata_changes_ins AFTER INSERT ON avatardata
+FOR EACH ROW
+BEGIN
+    UPDATE
+        avatardata_changes
+    SET
+        changes = changes + 1
+    WHERE
+        id = 1;
+
+    IF NEW.status = 'COMPLETE' THEN
+        CALL score_log(NEW.name, NEW.gamehighscore);
+    END IF;
+
+    IF NEW.status = 'COMPLETE' AND NEW.gamehighscore IS NOT NULL THEN
+        CALL leaderboard_apply(NEW.rownum, NEW.name, NEW.gamehighscore, TRUE);
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_changes_upd AFTER UPDATE ON avatardata
+FOR EACH ROW
+BEGIN
+    DECLARE v_scores BOOLEAN;
+
+    -- TEST FOR A CHANGE TO THE COMPLETED PLAYERS
+    SET v_scores = (NEW.status = 'COMPLETE' OR OLD.status = 'COMPLETE')
+                   AND NOT (NEW.status <=> OLD.status
+                            AND NEW.gamehighscore <=> OLD.gamehighscore
+                            AND NEW.name <=> OLD.name);
+
+    -- TEST FOR A CHANGE SHOWN ON THE SCOREBOARD
+    IF NOT (NEW.status <=> OLD.status
+            AND NEW.queueposition <=> OLD.queueposition
+            AND NEW.gamehighscore <=> OLD.gamehighscore
+            AND NEW.name <=> OLD.name
+            AND NEW.avatar_id <=> OLD.avatar_id) THEN
+        UPDATE
+            avatardata_changes
+        SET
+            changes = changes + 1
+        WHERE
+            id = 1;
+    END IF;
+
+    IF v_scores THEN
+        -- REMOVE THE OLD ENTRY (NO LONGER COMPLETE, OR RENAMED) >> ADD THE NEW ENTRY
+        IF OLD.status = 'COMPLETE' AND NOT (NEW.status = 'COMPLETE' AND NEW.name <=> OLD.name) THEN
+            CALL score_log(OLD.name, NULL);
+        END IF;
+        IF NEW.status = 'COMPLETE' THEN
+            CALL score_log(NEW.name, NEW.gamehighscore);
+        END IF;
+
+        CALL leaderboard_apply(NEW.rownum, NEW.name, NEW.gamehighscore,
+                               NEW.status = 'COMPLETE' AND NEW.gamehighscore IS NOT NULL);
+    END IF;
+END $$
+
+CREATE TRIGGER avatardata_changes_del AFTER DELETE ON avatardata
+FOR EACH ROW
+BEGIN
+    UPDATE
+        avatardata_changes
+    SET
+        changes = changes + 1
+    WHERE
+        id = 1;
+
+    IF OLD.status = 'COMPLETE' THEN
+        CALL score_log(OLD.name, NULL);
+        CALL leaderboard_apply(OLD.rownum, NULL, NULL, FALSE);
+    END IF;
+END $$
+
+DELIMITER ;
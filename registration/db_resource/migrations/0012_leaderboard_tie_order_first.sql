@@ -0,0 +1,150 @@
+
+-- RESTORE THE ORIGINAL ORDER OF TIED SCORES: THE FIRST REGISTRATION FIRST (rownum ASC), AS IN
+-- 0004_leaderboard.sql; 0005_leaderboard_tie_order.sql HAD CHANGED IT TO THE LATEST REGISTRATION FIRST
+-- THE SCORE INDEX IS RE-CREATED AS (status, gamehighscore DESC, rownum), SO THE MIXED ORDER
+-- (gamehighscore DESC, rownum ASC) IS READ DIRECTLY FROM THE INDEX (MYSQL 8.0 OR LATER); EARLIER
+-- VERSIONS IGNORE THE DESC, GIVING THE SAME INDEX AS BEFORE (AN INDEX ENDS WITH THE PRIMARY KEY),
+-- AND SORT THE SCORE RANGE READ FROM IT
+-- leaderboard_apply IS REPLACED WITH THE SAME STEPS, USING THE RESTORED ORDER:
+--   - THE LAST ENTRY IS THE LOWEST SCORE, THEN THE LATEST REGISTERED
+--   - A TIED PLAYER PLACES ABOVE THE PLAYERS WHO REGISTERED AFTER THEM
+-- (THE TRIGGERS CALL THE PROCEDURES BY NAME, SO ARE NOT CHANGED)
+
+ALTER TABLE avatardata
+    DROP INDEX ix_avatardata_status_score,
+    ADD INDEX ix_avatardata_status_score (status, gamehighscore DESC, rownum);
+
+DROP PROCEDURE IF EXISTS refresh_leaderboard;
+DROP PROCEDURE IF EXISTS leaderboard_apply;
+
+DELIMITER $$
+
+-- REBUILD THE LEADERBOARD FROM THE TOP 10 COMPLETED PLAYERS (EXCLUDING PLAYERS WITHOUT A SCORE)
+CREATE PROCEDURE refresh_leaderboard()
+BEGIN
+    DELETE FROM leaderboard;
+
+    INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+    SELECT
+          1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND (a.gamehighscore > t.gamehighscore
+                      OR (a.gamehighscore = t.gamehighscore AND a.rownum < t.rownum)))
+        , 1 + (SELECT COUNT(*) FROM avatardata a
+               WHERE a.status = 'COMPLETE'
+                 AND a.gamehighscore > t.gamehighscore)
+        , t.rownum
+        , t.name
+        , t.gamehighscore
+    FROM (
+        SELECT
+              rownum
+            , name
+            , gamehighscore
+        FROM
+            avatardata
+        WHERE
+            status = 'COMPLETE'
+            AND gamehighscore IS NOT NULL
+        ORDER BY
+              gamehighscore DESC
+            , rownum ASC
+        LIMIT 10
+    ) t;
+END $$
+
+-- APPLY A CHANGE TO ONE PLAYER (REFER TO 0009_leaderboard_incremental.sql FOR THE STEPS)
+CREATE PROCEDURE leaderboard_apply(IN p_rownum INTEGER, IN p_name VARCHAR(35), IN p_score FLOAT,
+                                   IN p_complete BOOLEAN)
+BEGIN
+    DECLARE v_changed   BOOLEAN DEFAULT FALSE;
+    DECLARE v_found     BOOLEAN DEFAULT TRUE;
+    DECLARE v_count     INTEGER;
+    DECLARE v_score     FLOAT;
+    DECLARE v_rownum    INTEGER;
+    DECLARE v_name      VARCHAR(35);
+
+    -- NO ROW FOUND BY THE REFILL
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_found = FALSE;
+
+    -- 1) REMOVE
+    DELETE FROM leaderboard WHERE rownum = p_rownum;
+    SET v_changed = ROW_COUNT() > 0;
+
+    -- LAST ENTRY (LOWEST SCORE, THEN LATEST REGISTERED)
+    SELECT COUNT(*), MIN(gamehighscore) INTO v_count, v_score FROM leaderboard;
+    SELECT MAX(rownum) INTO v_rownum FROM leaderboard WHERE gamehighscore = v_score;
+
+    -- 2) REFILL
+    IF v_changed AND v_count < 10 THEN
+        SELECT
+              rownum
+            , name
+            , gamehighscore
+        INTO
+              v_rownum
+            , v_name
+            , v_score
+        FROM
+            avatardata
+        WHERE
+            status = 'COMPLETE'
+            AND gamehighscore IS NOT NULL
+            AND rownum <> p_rownum
+            AND (v_rownum IS NULL
+                 OR gamehighscore < v_score
+                 OR (gamehighscore = v_score AND rownum > v_rownum))
+        ORDER BY
+              gamehighscore DESC
+            , rownum ASC
+        LIMIT 1;
+
+        IF v_found THEN
+            INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+            VALUES (0, 0, v_rownum, v_name, v_score);
+            SET v_count = v_count + 1;
+        END IF;
+
+        SELECT MIN(gamehighscore) INTO v_score FROM leaderboard;
+        SELECT MAX(rownum) INTO v_rownum FROM leaderboard WHERE gamehighscore = v_score;
+    END IF;
+
+    -- 3) ADD
+    IF p_complete AND (v_count < 10
+                       OR p_score > v_score
+                       OR (p_score = v_score AND p_rownum < v_rownum)) THEN
+        INSERT INTO leaderboard (position, ranking, rownum, name, gamehighscore)
+        VALUES (0, 0, p_rownum, p_name, p_score);
+        IF v_count >= 10 THEN
+            DELETE FROM leaderboard WHERE rownum = v_rownum;
+        END IF;
+        SET v_changed = TRUE;
+    END IF;
+
+    -- 4) RE-NUMBER
+    IF v_changed THEN
+        UPDATE
+            leaderboard l
+            INNER JOIN (
+                SELECT
+                      a.rownum
+                    , 1 + SUM(b.gamehighscore > a.gamehighscore
+                              OR (b.gamehighscore = a.gamehighscore AND b.rownum < a.rownum))
+                                                                            AS position
+                    , 1 + SUM(b.gamehighscore > a.gamehighscore)            AS ranking
+                FROM
+                    leaderboard a
+                    CROSS JOIN leaderboard b
+                GROUP BY
+                    a.rownum
+            ) r ON r.rownum = l.rownum
+        SET
+              l.position = r.position
+            , l.ranking = r.ranking;
+    END IF;
+END $$
+
+DELIMITER ;
+
+-- RE-POPULATE
+CALL refresh_leaderboard();
@@ -1,3 +0,0 @@
-
--- QUERY USED TO DETERMINE IF AN USER ALIAS ALREADY EXISTS
-SELECT COUNT(*) FROM avatardata WHERE name = %s
\ No newline at end of file
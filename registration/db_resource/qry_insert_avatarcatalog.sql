@@ -0,0 +1,3 @@
+
+-- QUERY USED TO ADD AN AVATAR IMAGE TO THE CATALOG (IGNORED IF THE IMAGE IS ALREADY HELD)
+INSERT IGNORE INTO avatarcatalog (avatar_id, image, datecreated) VALUES (%s, %s, %s)
@@ -10,7 +10,7 @@ INSERT INTO avatardata (
     , number
     , email
     , phone
-    , avatar
+    , avatar_id
     ) VALUES (
       %s
     , %s
@@ -0,0 +1,4 @@
+
+-- QUERY USED TO ADD (OR REPLACE) AN AVATAR THUMBNAIL
+INSERT INTO avatarthumbnail (avatar_id, size, image) VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE image = VALUES(image)
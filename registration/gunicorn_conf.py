@@ -0,0 +1,94 @@
+'''------------------------------------------------------------------------------------------------
+Program:    gunicorn_conf.py
+Version:    0.3.0
+Py Ver:     2.7
+Purpose:    gunicorn server configuration for the registration program; read from config.json.
+
+Dependents: json
+            sys
+            metrics
+            gunicorn (19.x for Python 2.7)
+            futures (the concurrent.futures backport; required by the gthread worker on 2.7)
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The following config.json keys are used:
+                - host / port:      address the server listens on
+                - wsgi_workers:     number of worker processes
+                - wsgi_threads:     number of request threads per worker process
+                - wsgi_keepalive:   seconds an idle keep-alive connection is held open
+                - wsgi_timeout:     seconds a worker may be unresponsive before it is restarted
+
+            The 'gthread' worker class is used; idle keep-alive connections are held by the
+            worker's event loop, rather than by a request thread.  The futures package is
+            required by the gthread worker; this is tested on startup, and the server is not
+            started otherwise.
+
+            The application is not pre-loaded, so each worker process opens its own database
+            connection pool after it is started.
+
+            Each worker writes its final metrics as it exits (worker_exit), and the master process
+            then folds them into the retained totals in wsgi_metrics_dir (child_exit); so the totals
+            reported by /metrics do not fall when a worker is restarted.
+
+Use:        From the registration directory:
+            > pip install "gunicorn<20" futures
+            > gunicorn -c gunicorn_conf.py wsgi:application
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       BUG: The metrics of an exited worker dropped out of the
+                                        totals reported by /metrics.
+                                        FIX: Added the worker_exit and child_exit hooks, which
+                                        fold the worker's metrics into the retained totals.
+18.10.26    J. Berendt      0.3.0       Added the futures package (required by the gthread
+                                        worker on Python 2.7), and a startup test for it.
+------------------------------------------------------------------------------------------------'''
+
+import json
+import sys
+import metrics
+
+
+#READ CONFIG FILE
+_CFG = json.loads(open('config.json').read())
+
+#GUNICORN SETTINGS
+#pylint: disable=invalid-name
+bind                = '%s:%s' % (_CFG['host'], _CFG['port'])
+worker_class        = 'gthread'
+workers             = _CFG['wsgi_workers']
+threads             = _CFG['wsgi_threads']
+keepalive           = _CFG['wsgi_keepalive']
+timeout             = _CFG['wsgi_timeout']
+graceful_timeout    = _CFG['wsgi_timeout']
+preload_app         = False
+accesslog           = '-'
+
+#TEST FOR THE GTHREAD WORKER'S DEPENDENCY (THE CONCURRENT.FUTURES BACKPORT ON PYTHON 2.7)
+try:
+    import concurrent.futures  #pylint: disable=unused-import,wrong-import-position
+except ImportError:
+    print 'ERR: The futures package is required by the gthread worker; install it using: ' \
+          'pip install futures'
+    sys.exit(1)
+
+
+#-----------------------------------------------------------------------
+#HOOK RUN BY A WORKER PROCESS AS IT EXITS
+def worker_exit(server, worker):  #pylint: disable=unused-argument
+
+    #WRITE THE WORKER'S FINAL METRICS (NO ACTION IF NOT EXPORTED)
+    metrics.REGISTRY.flush()
+
+
+#-----------------------------------------------------------------------
+#HOOK RUN BY THE MASTER PROCESS AFTER A WORKER HAS EXITED
+def child_exit(server, worker):  #pylint: disable=unused-argument
+
+    #ADD THE WORKER'S METRICS TO THE RETAINED TOTALS
+    if _CFG['wsgi_metrics_dir']:
+        metrics.fold(directory=_CFG['wsgi_metrics_dir'], pid=worker.pid)
@@ -0,0 +1,44 @@
+'''------------------------------------------------------------------------------------------------
+Program:    wsgi.py
+Version:    0.2.0
+Py Ver:     2.7
+Purpose:    WSGI entry point for running the registration program under a production WSGI server.
+
+Dependents: app
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The Flask development server (python app.py) handles one connection per thread in a
+            single process, and is not intended for production use.  This module allows the
+            program to be served by gunicorn, using several worker processes and threads, as
+            configured in gunicorn_conf.py.
+
+            Debug mode is always disabled when served through this module, regardless of the
+            app_debug value in config.json.
+
+Use:        From the registration directory:
+            > gunicorn -c gunicorn_conf.py wsgi:application
+
+            In a browser, go to 127.0.0.1:5000
+            [the host and port number are defined in config.json]
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       The metrics export is enabled here (init(wsgi=True)),
+                                        rather than by default in config.json.
+------------------------------------------------------------------------------------------------'''
+
+import app
+
+
+#PROGRAM SETUP (RUN ONCE IN EACH WORKER PROCESS)
+app.init(wsgi=True)
+
+#FORCE DEBUG MODE OFF
+app.APP.debug = False
+
+#WSGI APPLICATION OBJECT
+application = app.APP  #pylint: disable=invalid-name
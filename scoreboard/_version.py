@@ -1 +1 @@
-__version__ = '1.4.3' 
+__version__ = '1.24.6' 
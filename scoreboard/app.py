@@ -1,17 +1,20 @@
 '''------------------------------------------------------------------------------------------------
 Program:    app
-Package:    1.4.2
+Package:    1.24.6
 Py Ver:     2.7
 Purpose:    This program runs the scoreboard web interface for the digital engine simulator.
 
 Dependents: json
             os
-            pandas
             sys
             time
-            base64
             flask
+            assets
+            avatars
             db
+            metrics
+            rankindex
+            snapshot
             _version
 
 Developer:  J. Berendt
@@ -19,9 +22,12 @@ Email:      support@73rdstreetdevelopment.co.uk
 
 Comments:
 
-Use:        To start the web interface:
+Use:        To start the web interface (development server):
             > python app.py
 
+            To start the web interface (production server; see wsgi.py):
+            > gunicorn -c gunicorn_conf.py wsgi:application
+
             In a browser, go to 127.0.0.1:5001
             [the host and port number are defined in config.json]
 
@@ -56,18 +62,142 @@ Date        Programmer      Version     Update
                                         BUG01: The table headings for the scoreboard are wrong.
                                         FIX01: Updated range from which Jinga uses to get column
                                         headings.
+18.10.26    J. Berendt      1.5.0       Added a versioned snapshot cache (snapshot.py) for the
+                                        compiled scoreboard data.  The data is rebuilt only when a
+                                        player_* action is performed, or the avatardata table
+                                        fingerprint changes; rather than on every page load.
+18.10.26    J. Berendt      1.6.0       Replaced the per-refresh b64encode() calls with a process-
+                                        wide avatar cache (avatars.py), keyed by image digest.
+                                        Added the /stats route to report the cache counters.
+18.10.26    J. Berendt      1.7.0       Added the /avatar/<avatar_id> route to serve avatar images
+                                        with a strong ETag and long-lived Cache-Control header.
+                                        The scoreboard template now references this route, rather
+                                        than embedding each avatar as a base64 data: URI.
+18.10.26    J. Berendt      1.8.0       Replaced the 2 second meta refresh with a server-sent
+                                        events stream (/stream route).  A new state is pushed only
+                                        when the snapshot changes, or the profile graph is
+                                        re-created.  Keep-alive pings are sent while idle.
+                                        The changing parts of the page are now rendered by the
+                                        macros in _macros.html, for use by the template and the
+                                        stream.  Moved the page's javascript into functions.js.
+18.10.26    J. Berendt      1.9.0       Added the /api/state route, which returns the scoreboard
+                                        data as compact JSON with an ETag; answering 304 when the
+                                        data has not changed.  The since=<version> argument
+                                        returns only the rows which have changed.
+                                        The display's fallback (for a lost update stream) now
+                                        polls this route and patches the page in place, rather
+                                        than reloading the page.
+18.10.26    J. Berendt      1.10.0      Replaced the getdata_queue(), getdata_scoreboard() and
+                                        getdata_now_playing() functions with
+                                        getdata_scoreboard_all(), which collects all three
+                                        datasets over one connection, in one tagged UNION query.
+18.10.26    J. Berendt      1.11.0      Added the database connection pool statistics to the
+                                        /stats route.
+18.10.26    J. Berendt      1.12.0      The scoreboard query is now taken from the SQL statement
+                                        registry (DBC.statements), rather than read from disk.
+18.10.26    J. Berendt      1.13.0      Removed the pandas dependency.  The scoreboard data is
+                                        collected as a list of dictionaries (DBC.query()) and
+                                        split into lists of rows; rather than into dataframes.
+18.10.26    J. Berendt      1.14.0      The scoreboard rows are now read from the leaderboard
+                                        table, which is maintained by the database as players
+                                        complete their game.  The RANK column is taken from the
+                                        leaderboard, so tied scores share a rank.
+18.10.26    J. Berendt      1.15.0      Added the /leaderboard page and /api/leaderboard route,
+                                        to browse all results a page at a time.  Pages are read
+                                        using keyset pagination (after=<cursor>), rather than
+                                        OFFSET; ranks are carried across pages in the cursor.
+18.10.26    J. Berendt      1.16.0      Added an in-process rank index (rankindex.py) over the
+                                        completed players' scores, and the /rank/<alias> route
+                                        for player rank lookups.  The index is seeded on startup
+                                        and synced when the scoreboard snapshot changes.
+18.10.26    J. Berendt      1.17.0      The /player_playing route now reports the outcome of the
+                                        status change (as returned by DBC.player_playing()) on
+                                        the scoreboard, using a flashed message; for example,
+                                        when another player is already playing.
+18.10.26    J. Berendt      1.18.0      Added the /api/queue route, which applies a batch of
+                                        delete, move and play actions in one transaction, and
+                                        returns the new scoreboard state once.
+18.10.26    J. Berendt      1.19.0      Moved the program setup from main() into init(), so the
+                                        program can also be started by a WSGI server (wsgi.py).
+                                        The app_debug and app_threaded config values are now
+                                        parsed using str2bool(); previously any non-empty string
+                                        (including "False") enabled debug mode.
+18.10.26    J. Berendt      1.20.0      Static file URLs now carry a content version (?v=), added
+                                        by static_version(); versioned files are cached by the
+                                        browser as immutable.  The profile graph's version is now
+                                        its content version, rather than its modification time.
+                                        Text responses (HTML, CSS, JS and JSON) are gzip
+                                        compressed by after_request(), if accepted.
+18.10.26    J. Berendt      1.21.0      When the snapshot_file key is set in config.json, the
+                                        scoreboard snapshot is shared by all worker processes
+                                        (snapshot.SharedSnapshot); only one process queries the
+                                        database.  The avatar images are included in the
+                                        snapshot data, and added to each process's avatar cache
+                                        by load_avatars().
+18.10.26    J. Berendt      1.22.0      Added metrics (metrics.py), reported by the /metrics route
+                                        in the Prometheus text format: request time by route,
+                                        snapshot build time and queue depth; plus the database
+                                        metrics recorded by db.py.
+18.10.26    J. Berendt      1.23.0      The scoreboard query now returns each player's avatar id
+                                        (avatar_id), rather than a copy of the avatar image; the
+                                        images are held once in the avatarcatalog table.  The
+                                        /avatar/<avatar_id> route reads an image from the catalog
+                                        on an avatar cache miss.  The avatar images are no longer
+                                        held in the scoreboard snapshot (load_avatars() removed).
+18.10.26    J. Berendt      1.24.0      The /avatar/<avatar_id> route accepts a size argument
+                                        (?size=40 or ?size=200), and serves the thumbnail for
+                                        that size (made by the registration program) if one
+                                        exists.  The templates request the size displayed.
+18.10.26    J. Berendt      1.24.1      BUG: The rank index was re-synced (re-reading every
+                                        completed player) after any scoreboard change; and a
+                                        completed player without a score stopped the sync.
+                                        FIX: The index is re-synced only when the score change
+                                        counter changes; players without a score are skipped;
+                                        deleted players are removed from the index directly.
+18.10.26    J. Berendt      1.24.2      BUG: The shared snapshot was enabled by default; under the
+                                        development server's debug reloader, the idle reloader
+                                        process could be elected to build the snapshot.
+                                        FIX: snapshot_file is now empty by default; when served
+                                        by the WSGI server (init(wsgi=True)), the
+                                        wsgi_snapshot_file key is used.
+18.10.26    J. Berendt      1.24.3      BUG: The shared snapshot file was kept in /tmp, and a
+                                        file planted by another user was accepted.
+                                        FIX: The file is kept in a private directory, and is
+                                        refused if not private to this user; the program then
+                                        keeps a separate snapshot in each process.
+18.10.26    J. Berendt      1.24.4      BUG: Metrics were exported to /tmp by every process,
+                                        including the development server, and the files of
+                                        exited processes were never removed.
+                                        FIX: metrics_dir is now empty by default; when served by
+                                        the WSGI server, the private wsgi_metrics_dir directory
+                                        is used.  An unsafe directory disables the export.
+18.10.26    J. Berendt      1.24.5      BUG: Each /rank request read the score change counter
+                                        from the database, and each change re-read every
+                                        completed player.
+                                        FIX: The counter is read from the snapshot (recorded when
+                                        the snapshot is built); when it has changed, only the
+                                        logged changes are read, and applied to the changed
+                                        players in the rank index.
+18.10.26    J. Berendt      1.24.6      The full leaderboard lists tied scores with the first
+                                        registration first, as the scoreboard originally did
+                                        (registration migration 0012).
 ------------------------------------------------------------------------------------------------'''
 
 import json
 import os
 import sys
+import time
 
-from base64 import b64encode
-
+import assets
+import avatars
 import db
-import pandas as pd
+import metrics
+import rankindex
+import snapshot
 
-from flask import Flask, render_template, request, redirect
+from flask import (Flask, Response, abort, flash, g, get_template_attribute, jsonify,
+                   make_response, render_template, request, redirect, stream_with_context,
+                   url_for)
 from _version import __version__
 
 
@@ -75,6 +205,17 @@ from _version import __version__
 APP = Flask(__name__)
 APP.secret_key = 'devkey'
 
+#FIELDS RETURNED FOR EACH DATA GROUP
+COLS_PLAYING    = ['name', 'avatar']
+COLS_QUEUE      = ['status', 'name', 'avatar']
+COLS_SCORE      = ['gamehighscore', 'name', 'avatar']
+
+#METRICS
+REQUEST_TIME    = metrics.REGISTRY.histogram('http_request_seconds',
+                                             'Time taken to handle a request, by route.')
+BUILD_TIME      = metrics.REGISTRY.histogram('scoreboard_snapshot_build_seconds',
+                                             'Time taken to compile the scoreboard data.')
+
 #ALLOW OPENING DOCSTRING
 #pylint: disable=pointless-string-statement
 
@@ -86,6 +227,24 @@ def setup_config():
     return json.loads(open('config.json').read())
 
 
+#-----------------------------------------------------------------------
+#FUNCTION CONVERTS A CONFIG VALUE TO A BOOLEAN
+def str2bool(value):
+
+    '''
+    PURPOSE:
+    This function is used to convert a true / false config value to a
+    boolean.
+
+    DESIGN:
+    The config file holds these values as strings (e.g. "True"), and
+    any non-empty string is truthy; therefore the string is tested
+    against the accepted 'true' values.
+    '''
+
+    return str(value).strip().lower() in ('true', 'yes', '1')
+
+
 #-----------------------------------------------------------------------
 #CREATE DBC INSTANCE (USED FOR DATABASE ACTIONS)
 def setup_db():
@@ -93,8 +252,9 @@ def setup_db():
     '''
     PURPOSE:
     Using the db.DBConn() class, this method is used to create the
-    gamedata database table, if the table does not already exist, then
-    return the connection object to the main() method.
+    gamedata database table, if the table does not already exist, and
+    apply any pending schema migrations; then return the connection
+    object to the main() method.
     '''
 
     #CREATE DB INSTANCE
@@ -107,123 +267,365 @@ def setup_db():
 
 
 #-----------------------------------------------------------------------
-#FUNCTION TO GET QUEUE DATA
-def getdata_queue():
+#CREATE AVATAR CACHE INSTANCE (USED TO ENCODE AVATAR IMAGES ONCE)
+def setup_avatars():
 
     '''
     PURPOSE:
-    Function designed to get and return a dataframe populated with
-    queue data, using the queue data SQL script.
+    Using the avatars.AvatarCache() class, this function creates the
+    process-wide cache of encoded avatar images.
 
-    If an error occurs, an empty dataframe is returned.
+    DESIGN:
+    The number of cached images is bounded by the 'avatar_cache_size'
+    key in config.json.
     '''
 
-    try:
-        #CONNECT TO DB
-        conn = DBC.connect()
+    return avatars.AvatarCache(max_size=CFG['avatar_cache_size'])
 
-        #READ QUERY
-        qry = open(CFG['qry_getdata_queue']).read()
-        #GET DATA
-        data = pd.read_sql(qry, conn)
 
-        #CLOSE DB CONNECTION
-        conn.close()
+#-----------------------------------------------------------------------
+#CREATE STATIC ASSETS INSTANCE (USED FOR STATIC FILE VERSIONS)
+def setup_assets():
 
-        return data
+    '''
+    PURPOSE:
+    Using the assets.StaticAssets() class, this function creates the
+    cache of static file content versions, used in the static files'
+    URLs.
+    '''
 
-    except Exception as err:
-        #NOTIFICATION
-        print 'ERR: Could not get queue data.'
-        print 'ERR: %s' % err
+    return assets.StaticAssets(folder=APP.static_folder)
 
-        #RETURN AN EMPTY DATAFRAME
-        return pd.DataFrame()
+
+#-----------------------------------------------------------------------
+#CREATE SNAPSHOT INSTANCE (USED TO CACHE THE COMPILED SCOREBOARD DATA)
+def setup_snapshot():
+
+    '''
+    PURPOSE:
+    Using the snapshot.Snapshot() class, this function creates the
+    cache which holds the compiled scoreboard data.
+
+    DESIGN:
+    The compile_data() function (timed by build_snapshot()) is used
+    to build the snapshot, and the db.DBConn.fingerprint() function is
+    used to detect changes to the underlying table.  The fingerprint
+    is checked, at most, once every (n) seconds, as defined by the
+    'snapshot_interval' key in config.json.
+
+    Shared snapshot:
+    If the 'snapshot_file' key in config.json is set (or, when served
+    by the WSGI server, the 'wsgi_snapshot_file' key; refer to
+    init()), a snapshot.SharedSnapshot() is created instead; the snapshot is
+    built by one (elected) worker process and shared with all other
+    workers through the file (refer to snapshot.py).  This requires
+    Linux (fcntl); otherwise each process keeps its own snapshot.
+
+    The file's directory is created with mode 0700.  If the file (or
+    its directory) is not private to this user, an error is printed,
+    and each process keeps its own snapshot.
+    '''
+
+    #TEST FOR SHARED SNAPSHOT
+    if CFG['snapshot_file'] and snapshot.fcntl is not None:
+        try:
+            return snapshot.SharedSnapshot(builder=build_snapshot,
+                                           fingerprint=fingerprint,
+                                           interval=CFG['snapshot_interval'],
+                                           path=CFG['snapshot_file'],
+                                           size=CFG['snapshot_file_size'])
+
+        except OSError as err:
+            #NOTIFICATION
+            print 'ERR: The shared snapshot file cannot be used; each process keeps a snapshot.'
+            print 'ERR: %s' % err
+
+    return snapshot.Snapshot(builder=build_snapshot,
+                             fingerprint=fingerprint,
+                             interval=CFG['snapshot_interval'])
 
 
 #-----------------------------------------------------------------------
-#FUNCTION TO GET SCOREBOARD DATA
-def getdata_scoreboard():
+#FUNCTION BUILDS THE SNAPSHOT DATA (TIMED)
+def build_snapshot():
 
     '''
     PURPOSE:
-    Function designed to get and return a dataframe populated with
-    scoreboard data, using the scoreboard data SQL script.
+    This function is passed to the snapshot as its builder; it calls
+    compile_data() and records the time taken in the
+    scoreboard_snapshot_build_seconds metric.
 
-    If an error occurs, an empty dataframe is returned.
+    DESIGN:
+    The score change counter (refer to db.DBConn.fingerprint()) is
+    added to the data as 'score_changes'; so each worker can test if
+    its rank index is due an update without querying the database
+    (refer to sync_ranks()).  The counter is read before the data, so
+    the data is never older than the counter.
     '''
 
-    try:
-        #CONNECT TO DB
-        conn = DBC.connect()
+    with BUILD_TIME.time():
+        fprint = DBC.fingerprint()
+        data = compile_data()
+
+    #ADD THE SCORE CHANGE COUNTER (NONE IF NOT READ)
+    if data:
+        data['score_changes'] = None if fprint is None else fprint[1]
+
+    return data
+
+
+#-----------------------------------------------------------------------
+#SETUP METRICS
+def setup_metrics():
+
+    '''
+    PURPOSE:
+    This method registers the scoreboard's queue depth gauge and, if
+    the 'metrics_dir' key in config.json is set (or, when served by the
+    WSGI server, the 'wsgi_metrics_dir' key; refer to init()), starts
+    exporting this process's metrics to the directory; so the /metrics
+    route can report the totals of all worker processes (refer to
+    metrics.Registry.render_all()).
+
+    If the directory is not private to this user, an error is printed
+    and only this process's metrics are reported.
+    '''
 
-        #READ QUERY
-        qry = open(CFG['qry_getdata_scoreboard']).read()
-        #GET DATA
-        data = pd.read_sql(qry, conn)
+    metrics.REGISTRY.gauge('scoreboard_queue_depth', 'Players waiting in the queue.',
+                           func=queue_depth, merge='max')
 
-        #CLOSE CONNECTION
-        conn.close()
+    if CFG['metrics_dir']:
+        try:
+            metrics.REGISTRY.start_export(directory=CFG['metrics_dir'],
+                                          interval=CFG['metrics_export_interval'])
 
-        return data
+        except OSError as err:
+            #NOTIFICATION
+            print 'ERR: The metrics directory cannot be used; only this process\'s metrics are ' \
+                  'reported.'
+            print 'ERR: %s' % err
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE NUMBER OF QUEUED PLAYERS
+def queue_depth():
+
+    return sum(1 for row in SNAP.get().get('data_queue', []) if row['status'] == 'QUEUED')
+
+
+#-----------------------------------------------------------------------
+#RECORD THE REQUEST START TIME
+@APP.before_request
+def metrics_start():
+
+    g.metrics_start = time.time()
+
+
+#-----------------------------------------------------------------------
+#RECORD THE REQUEST TIME
+@APP.after_request
+def metrics_record(resp):
+
+    '''
+    PURPOSE:
+    This function records the time taken to handle each request in
+    the http_request_seconds metric, labelled by the route (the URL
+    rule, such as '/rank/<alias>'), method and status code.
+
+    DESIGN:
+    As this hook is registered before the after_request() hook, it
+    runs after it; so the time includes compression.  For a streamed
+    response (/stream), the time taken to start the stream is
+    recorded.
+    '''
+
+    #TEST FOR A START TIME (NOT SET IF A BEFORE_REQUEST HOOK FAILED)
+    start = getattr(g, 'metrics_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_TIME.observe(time.time() - start, route=route, method=request.method,
+                             status=resp.status_code)
+
+    return resp
+
+
+#-----------------------------------------------------------------------
+#CREATE RANK INDEX INSTANCE (USED FOR PLAYER RANK LOOKUPS)
+def setup_ranks():
+
+    '''
+    PURPOSE:
+    Using the rankindex.RankIndex() class, this function creates the
+    index of completed players' scores, and seeds it from the database.
+    '''
+
+    ranks = rankindex.RankIndex()
+    sync_ranks(ranks=ranks)
+
+    return ranks
+
+
+#-----------------------------------------------------------------------
+#METHOD USED TO BRING THE RANK INDEX UP TO DATE WITH THE DATABASE
+def sync_ranks(ranks, version=None):
+
+    '''
+    PURPOSE:
+    This method brings the rank index up to the passed score change
+    counter value (version), if the completed players have changed
+    since the index was last updated; or seeds the index, if it has
+    not been seeded.
+
+    DESIGN:
+    The avatardata score change counter is incremented by the
+    avatardata triggers for each change to the completed players (a
+    player's status moves to, or from, 'COMPLETE', or a completed
+    player's score or name changes), and each change is logged (refer
+    to the 0011_avatardata_score_log.sql migration in the registration
+    program).  The caller passes the counter value held in the
+    scoreboard snapshot (refer to build_snapshot()); so a rank lookup
+    does not query the database unless the counter has moved.
+
+    When the counter has moved, only the log entries after the index's
+    version are read, and applied to the changed players (refer to
+    rankindex.RankIndex.apply()).  All completed players are re-read
+    (rankindex.RankIndex.sync()) only when the index is seeded, or if
+    the entries it needs are no longer held in the log.
+
+    A game is completed by the game program, outside this program;
+    so completions are always picked up from the log.  A player
+    deleted by this program is also removed from the index directly
+    (refer to player_delete() and api_queue()).
+
+    If the data cannot be read, the index is left as it is, and the
+    update is retried on the next lookup.
+    '''
+
+    #TEST IF AN UPDATE IS DUE
+    if ranks.version is not None and (version is None or version <= ranks.version):
+        return
+
+    try:
+        #READ THE LATER CHANGES >> APPLY (IF NONE HAVE BEEN DROPPED FROM THE LOG)
+        if ranks.version is not None:
+            rows = DBC.query('qry_getdata_rank_changes', (ranks.version,))
+            if rows and rows[0]['seq'] == ranks.version + 1:
+                ranks.apply(rows=rows)
+                return
+
+        #READ THE COUNTER >> RE-READ ALL COMPLETED PLAYERS
+        fprint = DBC.fingerprint()
+        if fprint is None:
+            return
+        rows = DBC.query('qry_getdata_ranks')
+        ranks.sync(rows=rows, version=fprint[1])
 
     except Exception as err:
         #NOTIFICATION
-        print 'ERR: Could not get scoreboard data.'
+        print 'ERR: Could not sync the rank index.'
         print 'ERR: %s' % err
 
-        #RETURN AN EMPTY DATAFRAME
-        return pd.DataFrame()
-
 
 #-----------------------------------------------------------------------
-#FUNCTION TO GET THE NAME AND AVATAR OF THE PLAYER CURRENTLY PLAYING
-def getdata_now_playing():
+#FUNCTION RETURNS THE VERSION STAMP OF THE PROFILE GRAPH
+def profile_stamp():
 
     '''
     PURPOSE:
-    Function designed to get and return a dataframe populated with
-    the name and alias of the player who is currently playing, using
-    the now_playing SQL script.
+    This function returns the content version of the profile graph
+    (profile.png), which is re-created by the profiler program each
+    time a player finishes.
+
+    DESIGN:
+    The value is used as the profile graph's version, both to detect
+    a new graph and to change the graph's URL, so the browser loads
+    the new image.  As the version is taken from the file's content
+    (refer to assets.StaticAssets), a new graph always has a new URL;
+    and each URL can be cached by the browser indefinitely.  If the
+    file cannot be found, None is returned.
+    '''
+
+    return ASSETS.version(filename='images/profile.png')
 
-    If an error occurs, an empty dataframe is returned.
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE FINGERPRINT OF ALL DATA SHOWN ON THE SCOREBOARD
+def fingerprint():
+
+    '''
+    PURPOSE:
+    This function is used by the snapshot to detect changes to any of
+    the data shown on the scoreboard.
 
     DESIGN:
-    The query returns the name and alias of the record with a 'status'
-    of 'PLAYING'.
+    The avatardata change counters (db.DBConn.fingerprint()) are
+    combined with the version stamp of the profile graph.  If the
+    database cannot be read, None is returned.
+    '''
+
+    fprint = DBC.fingerprint()
+
+    return None if fprint is None else fprint + (profile_stamp(),)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION TO GET THE NOW PLAYING, QUEUE AND SCOREBOARD DATA
+def getdata_scoreboard_all():
 
-    If no players have a status of 'PLAYING', the dataframe is populated
-    with default values, for display on the screen.
     '''
+    PURPOSE:
+    Function designed to get and return a tuple of three lists of rows
+    (dictionaries) populated with the now playing, queue and
+    scoreboard data, using a single connection and a single query.
 
-    try:
-        #OPEN DB CONNECTION
-        conn = DBC.connect()
+    If an error occurs, a tuple of three empty lists is returned.
 
-        #READ QUERY
-        qry = open(CFG['qry_getdata_now_playing']).read()
-        #GET THE NAME OF WHO IS CURRENTLY PLAYING
-        df_playing = pd.read_sql(qry, conn)
+    DESIGN:
+    The query combines the now playing, queue and scoreboard queries
+    using UNION ALL, with a 'grp' field to tag each row with its
+    group.  This replaces three connections and three queries with a
+    single round trip to the database.
+
+    The results are split into a list for each group, with each row
+    containing the same fields as the original queries:
+        - now playing: name, avatar
+        - queue: status, name, avatar
+        - scoreboard: gamehighscore, name, avatar, rank
+
+    The scoreboard rows are read from the leaderboard table, which
+    holds the top players and their ranks; refer to the
+    0004_leaderboard.sql migration in the registration program.
+
+    If no players have a status of 'PLAYING', the now playing list is
+    populated with a row of default values, for display on the screen.
+    '''
 
-        #TEST IF DATA WAS FOUND
-        if df_playing.empty:
+    try:
+        #GET DATA (AS A LIST OF DICTIONARIES)
+        data = DBC.query('qry_getdata_scoreboard_all')
+
+        #SPLIT INTO GROUPS
+        playing = [dict((key, row[key]) for key in COLS_PLAYING)
+                   for row in data if row['grp'] == 'playing']
+        queue = [dict((key, row[key]) for key in COLS_QUEUE)
+                 for row in data if row['grp'] == 'queue']
+        score = [dict([(key, row[key]) for key in COLS_SCORE] + [('rank', row['ranking'])])
+                 for row in data if row['grp'] == 'score']
+
+        #TEST IF A PLAYER IS PLAYING
+        if not playing:
             #IF NO DATA FOUND ADD DEFAULT VALUE TO FIELDS
-            df_playing.loc[0, 'name'] = 'Who is next?'
-            df_playing.loc[0, 'avatar'] = ''
-
-        #CLOSE DB CONNECTION
-        conn.close()
+            playing = [dict(name='Who is next?', avatar='')]
 
-        #RETURN FRAME
-        return df_playing
+        return playing, queue, score
 
     except Exception as err:
         #NOTIFICATION
-        print 'ERR: Could not get the name and avatar for the current player.'
+        print 'ERR: Could not get the scoreboard data.'
         print 'ERR: %s' % err
 
-        #RETURN AN EMPTY DATAFRAME
-        return pd.DataFrame()
+        #RETURN EMPTY LISTS
+        return [], [], []
 
 
 #-----------------------------------------------------------------------
@@ -239,58 +641,50 @@ def compile_data():
 
     DESIGN:
     The name and alias of the current player, the queue data and
-    scoreboard data are compiled together, along with column names, are
-    compiled into a dictionary and returned to the calling procedure.
+    scoreboard data are collected in a single round trip (refer to
+    getdata_scoreboard_all()), and are compiled together, along with
+    column names, into a dictionary and returned to the calling
+    procedure.
 
-    All data groups call the b64encode() function to transform the
-    avatar's binary data (as collected form the database) into a
-    displayable image.
+    Each row holds the player's avatar id (the key of the image in the
+    avatarcatalog table), rather than the image itself.  The template
+    uses the id to reference the image via the /avatar/<avatar_id>
+    route, so the browser can cache each image.
 
     The column names are extracted into a list for each datagroup, for
     upper case conversion, and to enable the jinja template to iterate
     over the list, and populate the column names as required.
 
-    The RANK column of the scoreboard is hard coded to a list of 1-5.
+    The RANK column of the scoreboard is taken from the leaderboard
+    table; tied scores share the same rank.
+
+    The content version of the profile graph is added, for use in the
+    graph's URL.
     '''
 
     try:
-        #ALLOW LAMBDA FOR BINARY TO IMG CONVERSION
-        #pylint: disable=unnecessary-lambda
-
-        #GET NOW PLAYING DATA
-        df_playing = getdata_now_playing()
-        #CONVERT AVATAR DATA TO BASE64 STRING
-        df_playing['avatar'] = df_playing['avatar'].apply(lambda img: b64encode(img))
-        data_playing = df_playing.to_dict('records')[0]
-
-        #GET DATA (QUEUE)
-        df_queue = getdata_queue()
-        #CONVERT AVATAR DATA TO BASE64 STRING
-        df_queue['avatar'] = df_queue['avatar'].apply(lambda img: b64encode(img))
-        #EXTRACT COLUMN NAMES FROM FRAME >> TO UPPER CASE
-        cols_queue = [col.upper() for col in df_queue.columns]
-        #CONVERT FRAME TO DICTIONARY FOR HTML TEMPLATE
-        data_queue = df_queue.to_dict('records')
-
-        #INITIALISE RANK NUMBER
-        #GET DATA (SCOREBOARD)
-        df_score = getdata_scoreboard()
-        #CONVERT AVATAR DATA TO BASE64 STRING
-        df_score['avatar'] = df_score['avatar'].apply(lambda img: b64encode(img))
-        #ADD RANK FIELD FOR SCOREBOARD
-        #(DYNAMIC RANK LIST (1-5) TO ALLOW FOR HIGH SCORES COUNTS < 5)
-        df_score['rank'] = [idx for idx, _ in enumerate(df_score.index, 1)]
-        #EXTRACT COLUMN NAMES FROM FRAME >> TO UPPER CASE
-        cols_score = [col.upper() for col in df_score.columns]
-        #CONVERT FRAME TO DICTIONARY FOR HTML TEMPLATE
-        data_score = df_score.to_dict('records')
+        #GET DATA (NOW PLAYING, QUEUE AND SCOREBOARD)
+        data_playing, data_queue, data_score = getdata_scoreboard_all()
+
+        #TEST FOR FAILED QUERY (NOW PLAYING ALWAYS HOLDS A ROW)
+        if not data_playing:
+            return dict()
+
+        #PLAYERS WITHOUT AN AVATAR >> EMPTY ID
+        for row in data_playing + data_queue + data_score:
+            row['avatar'] = row['avatar'] or ''
+
+        #COLUMN NAMES >> TO UPPER CASE
+        cols_queue = [col.upper() for col in COLS_QUEUE]
+        cols_score = [col.upper() for col in COLS_SCORE + ['rank']]
 
         #RETURN DICTIONARY OF DATASETS
-        return dict(data_playing=data_playing,
+        return dict(data_playing=data_playing[0],
                     data_queue=data_queue,
                     data_score=data_score,
                     columns_queue=cols_queue,
-                    columns_score=cols_score)
+                    columns_score=cols_score,
+                    profile_version=profile_stamp())
 
 
     except Exception as err:
@@ -317,10 +711,705 @@ def pop_scoreboard():
 
     The dictionary argument has been shortcutted take advantage of
     Python's **kwargs capability.
+
+    The state version is passed to the page, for use by the display's
+    update functions (refer to functions.js).
+
+    The data is taken from the snapshot cache, rather than calling
+    compile_data() directly; so the database is not queried for each
+    page load, or for each display.
     '''
 
+    #GET CURRENT STATE
+    version, data = SNAP.state()
+
     #LOAD PAGE AND PASS TEMPLATE DATA
-    return render_template('scoreboard.html', **compile_data())
+    return render_template('scoreboard.html', state_version=state_version(version), **data)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE STATE VERSION PASSED TO CLIENTS
+def state_version(version):
+
+    '''
+    PURPOSE:
+    This function returns the version string which identifies a
+    snapshot to a client (display).
+
+    DESIGN:
+    The snapshot's token is combined with the version number, as the
+    version number restarts each time the program starts.  This
+    ensures a version received from a previous run is never matched.
+    '''
+
+    return '%s-%s' % (SNAP.token, version)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE SCOREBOARD STATE AS A JSON-READY DICTIONARY
+def build_state(data):
+
+    '''
+    PURPOSE:
+    This function converts the compiled scoreboard data into the
+    state dictionary returned by the /api/state route.
+
+    DESIGN:
+    The same data as compiled by compile_data() is returned; however
+    the keys are shortened to keep the JSON compact.
+    '''
+
+    return dict(playing=data.get('data_playing', {}),
+                queue=data.get('data_queue', []),
+                score=data.get('data_score', []),
+                columns=dict(queue=data.get('columns_queue', []),
+                             score=data.get('columns_score', [])),
+                profile=url_for('static', filename='images/profile.png',
+                                v=data.get('profile_version')))
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE CHANGES BETWEEN TWO SCOREBOARD STATES
+def build_delta(old, new):
+
+    '''
+    PURPOSE:
+    This function returns only the parts of the new state which differ
+    from the old state.
+
+    DESIGN:
+    The playing, columns and profile keys are only included if they
+    have changed.
+
+    For the queue and score lists, a dictionary is included (only if
+    the list has changed) containing:
+        - length: the new number of rows
+        - rows: a dictionary of {row index: row} for each row which
+          differs from the row at the same position in the old list
+
+    Therefore, the client replaces the changed rows, then trims the
+    list to the new length.
+    '''
+
+    #INITIALISE
+    delta = dict()
+
+    #TEST SINGLE VALUES
+    for key in ['playing', 'columns', 'profile']:
+        if old[key] != new[key]:
+            delta[key] = new[key]
+
+    #TEST LISTS, ROW BY ROW
+    for key in ['queue', 'score']:
+        if old[key] != new[key]:
+            rows = dict((idx, row) for idx, row in enumerate(new[key])
+                        if idx >= len(old[key]) or old[key][idx] != row)
+            delta[key] = dict(length=len(new[key]), rows=rows)
+
+    return delta
+
+
+#-----------------------------------------------------------------------
+#SCOREBOARD STATE AS JSON
+@APP.route('/api/state')
+def api_state():
+
+    '''
+    PURPOSE:
+    This function returns the scoreboard data as compact JSON, for
+    the displays and operator tablets.
+
+    DESIGN:
+    The response carries an ETag of the state version.  If the
+    client's If-None-Match header matches, a 304 (not modified)
+    response is returned with no body.
+
+    If the since=<version> argument is passed, and that version is
+    still held in the snapshot history, only the changes since that
+    version are returned (refer to build_delta()), with 'delta' set to
+    true.  Otherwise, the full state is returned with 'delta' set to
+    false.  If since matches the current version, a 304 response is
+    returned.
+    '''
+
+    #GET CURRENT STATE
+    version, data = SNAP.state()
+    etag = state_version(version)
+    since = request.args.get('since')
+
+    #TEST FOR UNCHANGED STATE
+    if request.if_none_match.contains(etag) or since == etag:
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    state = build_state(data)
+
+    #TEST FOR DELTA REQUEST
+    old = None
+    if since and since.startswith('%s-' % SNAP.token):
+        old_version = since.split('-')[-1]
+        if old_version.isdigit():
+            old = SNAP.previous(version=int(old_version))
+
+    if old is not None:
+        body = build_delta(old=build_state(old), new=state)
+        body.update(delta=True, base=since)
+    else:
+        body = state
+        body.update(delta=False)
+
+    body.update(version=etag)
+
+    #BUILD COMPACT RESPONSE
+    resp = Response(json.dumps(body, separators=(',', ':')), mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+
+    return resp
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RENDERS THE CHANGING PARTS OF THE SCOREBOARD
+def render_fragments(data):
+
+    '''
+    PURPOSE:
+    This function renders the parts of the scoreboard which change
+    (now playing, queue and scoreboard rows) and the profile graph URL
+    into a dictionary; to be pushed to the displays by the update
+    stream.
+
+    DESIGN:
+    The same macros (templates/_macros.html) are used by the
+    scoreboard.html template, so the pushed content matches a page
+    load exactly.
+    '''
+
+    #GET MACROS
+    now_playing = get_template_attribute('_macros.html', 'now_playing')
+    queue_rows = get_template_attribute('_macros.html', 'queue_rows')
+    score_rows = get_template_attribute('_macros.html', 'score_rows')
+
+    return dict(playing=now_playing(data.get('data_playing', {})),
+                queue=queue_rows(data.get('data_queue', [])),
+                score=score_rows(data.get('data_score', [])),
+                profile=url_for('static', filename='images/profile.png',
+                                v=data.get('profile_version')))
+
+
+#-----------------------------------------------------------------------
+#SCOREBOARD UPDATE STREAM
+@APP.route('/stream')
+def stream():
+
+    '''
+    PURPOSE:
+    This function serves a server-sent events stream, which pushes a
+    new scoreboard state to the display only when the data changes.
+
+    DESIGN:
+    Each connected display waits on the snapshot (SNAP.wait()) until
+    it is rebuilt or invalidated, or the snapshot interval expires.
+    When woken, SNAP.state() is called to perform the fingerprint
+    check (at most once per interval, for all displays).  If the
+    version has changed, an 'update' event is sent containing the
+    rendered fragments (refer to render_fragments()).
+
+    While idle, a 'ping' event is sent every (n) seconds, as defined
+    by the 'stream_keepalive' key in config.json.  This keeps the
+    connection open, and allows the display to detect a dropped
+    stream.
+
+    The event id is the state version.  If a display
+    reconnects with a Last-Event-ID header matching the current state,
+    the initial update is not re-sent.
+
+    Fallback:
+    Displays which cannot connect, or which lose the stream, fall back
+    to polling the /api/state route every 2 seconds (refer to
+    functions.js).
+    '''
+
+    def events():
+
+        #INITIALISE
+        last_id = request.headers.get('Last-Event-ID')
+        last_sent = time.time()
+        version = None
+
+        #RECONNECTION DELAY FOR THE BROWSER (MS)
+        yield 'retry: 2000\n\n'
+
+        while True:
+            #GET CURRENT STATE
+            version, data = SNAP.state()
+            event_id = state_version(version)
+
+            #SEND UPDATE IF CHANGED
+            if event_id != last_id:
+                last_id = event_id
+                last_sent = time.time()
+                yield 'id: %s\nevent: update\ndata: %s\n\n' \
+                      % (event_id, json.dumps(render_fragments(data)))
+
+            #SEND KEEP-ALIVE
+            elif time.time() - last_sent >= CFG['stream_keepalive']:
+                last_sent = time.time()
+                yield 'event: ping\ndata: %s\n\n' % event_id
+
+            #WAIT FOR A CHANGE
+            SNAP.wait(version=version, timeout=CFG['snapshot_interval'])
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+#-----------------------------------------------------------------------
+#SERVE AN AVATAR IMAGE
+@APP.route('/avatar/<avatar_id>')
+def avatar(avatar_id):
+
+    '''
+    PURPOSE:
+    This function serves the raw image data for an avatar, at the
+    display size passed as the size argument (e.g. ?size=40).
+
+    DESIGN:
+    The avatar id is the digest of the image data, therefore the
+    image for a given id never changes.  This allows the id to be used
+    as a strong ETag, and the image to be cached by the browser for a
+    year.  If the browser sends a matching If-None-Match header, a
+    304 (not modified) response is returned by make_conditional().
+
+    Sizes:
+    The registration program stores a thumbnail of each image for
+    each display size (the avatarthumbnail table), so a 40px queue
+    avatar is sent as a 40px image rather than the full size image.
+    The size must be one of the sizes in the 'avatar_sizes' key in
+    config.json; if the size is not passed (or is not listed), or no
+    thumbnail exists for the size (for example, the image is already
+    smaller), the full size image is served.  Each size is a separate
+    URL, and so is cached by the browser separately; the ETag is the
+    id and the size.
+
+    Images are served from the avatar cache, keyed by id and size.  On
+    a cache miss, the image is read from the database (once per
+    process, for each image and size) and added to the cache.  If the
+    id is not a valid digest, or is not found in the catalog, a 404
+    response is returned.
+    '''
+
+    #TEST FOR A VALID ID (A SHA-1 HEX DIGEST)
+    if len(avatar_id) != 40 or avatar_id.strip('0123456789abcdef'):
+        abort(404)
+
+    #GET DISPLAY SIZE (0: FULL SIZE)
+    size = request.args.get('size', 0, type=int)
+    if size not in CFG['avatar_sizes']:
+        size = 0
+    key = '%s-%d' % (avatar_id, size) if size else avatar_id
+
+    #GET IMAGE FROM CACHE >> FROM THE DATABASE
+    data = AVATARS.get(key)
+    if data is None:
+        rows = DBC.query('qry_avatar_image', (size, avatar_id))
+        if not rows:
+            abort(404)
+        data = bytes(rows[0]['image'])
+        AVATARS.put(key, data)
+
+    #BUILD RESPONSE >> ADD CACHE HEADERS
+    resp = make_response(data)
+    resp.mimetype = avatars.mimetype(data)
+    resp.set_etag(key)
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+
+    return resp.make_conditional(request)
+
+
+#-----------------------------------------------------------------------
+#ADD THE CONTENT VERSION TO STATIC FILE URLS
+@APP.url_defaults
+def static_version(endpoint, values):
+
+    '''
+    PURPOSE:
+    This function adds the file's content version (?v=<version>) to
+    every static file URL built by url_for(), unless a version is
+    passed explicitly.
+
+    DESIGN:
+    As the version changes only when the file's content changes, the
+    versioned URL can be cached by the browser as immutable; refer to
+    after_request().
+    '''
+
+    if endpoint == 'static' and 'v' not in values:
+        values['v'] = ASSETS.version(filename=values['filename'])
+
+
+#-----------------------------------------------------------------------
+#ADD CACHE HEADERS AND COMPRESS RESPONSES
+@APP.after_request
+def after_request(resp):
+
+    '''
+    PURPOSE:
+    This function adds the browser cache headers to static files, and
+    gzip compresses text responses; for every response.
+
+    DESIGN:
+    Static files:
+    If the URL's version (?v=) matches the file's current content
+    version, the file is cached for 'static_max_age' seconds (config)
+    and marked immutable, so the browser does not re-validate it.
+    Otherwise (no version, or an old version) the browser must
+    re-validate the file on each use, using the ETag and
+    Last-Modified headers added by Flask.
+
+    Compression:
+    Responses are compressed if the browser accepts gzip, the
+    mimetype is text (refer to assets.COMPRESSIBLE) and the body is
+    at least 'gzip_min_size' bytes (config).  Streamed responses
+    (such as the /stream route) are never compressed.  The compressed
+    content of static files is cached per file version.
+    '''
+
+    static = request.endpoint == 'static'
+
+    #STATIC FILES >> CACHE HEADERS
+    if static:
+        filename = request.view_args['filename']
+        version = request.args.get('v')
+        if version and version == ASSETS.version(filename=filename):
+            resp.headers['Cache-Control'] = ('public, max-age=%d, immutable'
+                                             % CFG['static_max_age'])
+        else:
+            resp.headers['Cache-Control'] = 'no-cache'
+
+    #TEST IF THE RESPONSE CAN BE COMPRESSED
+    if resp.mimetype not in assets.COMPRESSIBLE:
+        return resp
+    resp.vary.add('Accept-Encoding')
+    if (resp.status_code != 200 or 'Content-Encoding' in resp.headers
+            or 'gzip' not in request.accept_encodings
+            or (resp.is_streamed and not static)):
+        return resp
+
+    #READ BODY (STATIC FILES ARE SERVED AS A FILE STREAM)
+    resp.direct_passthrough = False
+    data = resp.get_data()
+    if len(data) < CFG['gzip_min_size']:
+        return resp
+
+    #COMPRESS
+    if static:
+        data = ASSETS.compressed(filename=filename, data=data, level=CFG['gzip_level'])
+    else:
+        data = assets.gzip_bytes(data=data, level=CFG['gzip_level'])
+
+    #UPDATE RESPONSE >> ETAG IS WEAK, AS THE ENCODING HAS CHANGED
+    resp.set_data(data)
+    resp.headers['Content-Encoding'] = 'gzip'
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+
+    return resp
+
+
+#-----------------------------------------------------------------------
+#REPORT CACHE COUNTERS
+@APP.route('/stats')
+def stats():
+
+    '''
+    PURPOSE:
+    This function returns the avatar cache counters, the current
+    snapshot version (and whether this process builds the snapshot)
+    and the database connection pool statistics as JSON; used to
+    confirm the caches are working.
+    '''
+
+    return jsonify(avatar_cache=AVATARS.stats(), snapshot_version=SNAP.version,
+                   snapshot_leader=getattr(SNAP, 'leader', True), db_pool=DBC.pool_stats())
+
+
+#-----------------------------------------------------------------------
+#REPORT METRICS
+@APP.route('/metrics')
+def metrics_page():
+
+    '''
+    PURPOSE:
+    This function returns the program's metrics in the Prometheus text
+    format; for all worker processes, if the 'metrics_dir' key in
+    config.json is set (refer to setup_metrics()).
+    '''
+
+    return Response(metrics.REGISTRY.render_all(), content_type=metrics.CONTENT_TYPE)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE PARTS OF A LEADERBOARD CURSOR
+def parse_cursor(after):
+
+    '''
+    PURPOSE:
+    This function returns a tuple of (rownum, position, rank) for the
+    passed leaderboard cursor string, or None if no cursor was passed.
+
+    DESIGN:
+    The cursor is created by getdata_leaderboard(), in the form
+    'rownum-position-rank', for the last row of a page.  An invalid
+    cursor aborts the request with a 400 (bad request) response.
+    '''
+
+    #TEST FOR FIRST PAGE
+    if not after:
+        return None
+
+    try:
+        rownum, position, rank = [int(val) for val in after.split('-')]
+
+    except ValueError:
+        abort(400)
+
+    return rownum, position, rank
+
+
+#-----------------------------------------------------------------------
+#FUNCTION TO GET A PAGE OF THE FULL LEADERBOARD
+def getdata_leaderboard(after, limit):
+
+    '''
+    PURPOSE:
+    Function designed to get and return a page of the full leaderboard
+    (all completed players), as a tuple of the page's rows and the
+    cursor for the next page.  The cursor is None on the last page.
+
+    If an error occurs, an empty page is returned.
+
+    DESIGN:
+    Keyset pagination is used, rather than OFFSET; each page is read
+    starting after the last row of the previous page (the cursor row),
+    in gamehighscore descending, then rownum ascending order (the
+    leaderboard order; tied scores are listed with the first
+    registration first).  Therefore, each page is read directly from
+    the (status, gamehighscore DESC, rownum) index, and the time taken
+    does not grow as the user pages deeper.
+
+    One row more than the page size is requested, to test if a next
+    page exists.
+
+    Ranks are calculated as the rows are read; tied scores share the
+    same rank, and the following rank is skipped (e.g. 1, 2, 2, 4).
+    The position and rank of the last row are carried in the cursor,
+    along with its rownum; so ranks continue correctly across pages.
+    The query's 'tied' field shows if the first row of a page has the
+    same score as the cursor row.
+    '''
+
+    #PARSE CURSOR >> (ROWNUM, POSITION, RANK)
+    cursor = parse_cursor(after=after)
+
+    try:
+        #GET DATA (ONE EXTRA ROW TO TEST FOR A NEXT PAGE)
+        if cursor is None:
+            rows = DBC.query('qry_leaderboard_first', (limit + 1, ))
+            position, rank = 0, 0
+        else:
+            rows = DBC.query('qry_leaderboard_after', (cursor[0], limit + 1))
+            position, rank = cursor[1], cursor[2]
+
+    except Exception as err:
+        #NOTIFICATION
+        print 'ERR: Could not get the leaderboard data.'
+        print 'ERR: %s' % err
+
+        #RETURN AN EMPTY PAGE
+        return [], None
+
+    #INITIALISE
+    page = list()
+    previous = None
+
+    for row in rows[:limit]:
+        #ADD RANK (SHARED BY TIED SCORES)
+        position += 1
+        tied = row['tied'] if previous is None else row['gamehighscore'] == previous
+        if not tied:
+            rank = position
+        previous = row['gamehighscore']
+
+        page.append(dict(rank=rank, position=position, name=row['name'],
+                         gamehighscore=row['gamehighscore']))
+
+    #BUILD CURSOR FOR THE NEXT PAGE
+    more = len(rows) > limit
+    cursor = '%d-%d-%d' % (rows[limit - 1]['rownum'], position, rank) if more else None
+
+    return page, cursor
+
+
+#-----------------------------------------------------------------------
+#FULL LEADERBOARD PAGE
+@APP.route('/leaderboard')
+def leaderboard():
+
+    '''
+    PURPOSE:
+    This function displays a page of the full leaderboard, for
+    browsing all results on the operator screen.
+
+    DESIGN:
+    The after=<cursor> argument selects the page; refer to the
+    docstring for getdata_leaderboard().  The page size is set by the
+    leaderboard_page_size key in config.json.
+    '''
+
+    #GET PAGE
+    rows, cursor = getdata_leaderboard(after=request.args.get('after'),
+                                       limit=CFG['leaderboard_page_size'])
+
+    return render_template('leaderboard.html', rows=rows, cursor=cursor,
+                           first=not request.args.get('after'))
+
+
+#-----------------------------------------------------------------------
+#FULL LEADERBOARD AS JSON
+@APP.route('/api/leaderboard')
+def api_leaderboard():
+
+    '''
+    PURPOSE:
+    This function returns a page of the full leaderboard as JSON.
+
+    DESIGN:
+    Arguments:
+        - after: the cursor returned with the previous page (optional)
+        - limit: the page size (1-100); defaults to the
+          leaderboard_page_size key in config.json
+
+    The response contains the page's rows (rank, position, name and
+    gamehighscore) and the cursor for the next page ('next'), which is
+    null on the last page.
+    '''
+
+    #GET PAGE SIZE (BOUNDED)
+    limit = request.args.get('limit', CFG['leaderboard_page_size'], type=int)
+    limit = max(1, min(limit, 100))
+
+    #GET PAGE
+    rows, cursor = getdata_leaderboard(after=request.args.get('after'), limit=limit)
+
+    return jsonify(rows=rows, next=cursor)
+
+
+#-----------------------------------------------------------------------
+#PLAYER RANK LOOKUP
+@APP.route('/rank/<alias>')
+def rank(alias):
+
+    '''
+    PURPOSE:
+    This function returns a player's overall rank, and the total
+    number of completed players, as JSON; for example, to show a
+    player 'you placed #N of M'.  This is used by the profiler program
+    for the profile graph's subtitle.
+
+    DESIGN:
+    The rank is read from the in-process rank index (a binary search),
+    rather than counting the rows above the player's score in the
+    database.  The index is updated first, if the completed players
+    have changed since the snapshot was built (refer to sync_ranks());
+    so the rank may be up to snapshot_interval seconds old.
+
+    If the player is not (yet) in the index, and the score=<score>
+    argument is passed, the rank the score would place at is returned;
+    as the profile graph may be created before the player's status is
+    set to 'COMPLETE'.  Otherwise, a 404 response is returned.
+
+    Tied scores share the same rank.
+    '''
+
+    #UPDATE INDEX (IF THE COMPLETED PLAYERS HAVE CHANGED)
+    sync_ranks(ranks=RANKS, version=SNAP.get().get('score_changes'))
+
+    #GET RANK
+    result = RANKS.rank(alias=alias)
+
+    #TEST FOR PLAYER NOT FOUND >> USE SCORE IF PASSED
+    if result is None:
+        score = request.args.get('score', type=float)
+        if score is None:
+            abort(404)
+        result = RANKS.placing(score=score)
+
+    return jsonify(alias=alias, rank=result[0], total=result[1])
+
+
+#-----------------------------------------------------------------------
+#BATCH QUEUE ACTIONS
+@APP.route('/api/queue', methods=['POST'])
+def api_queue():
+
+    '''
+    PURPOSE:
+    This function applies a batch of queue actions (for example,
+    clearing several no-shows at the start of a session), and returns
+    the new scoreboard state; rather than one request, one redirect
+    and one scoreboard rebuild per action.
+
+    DESIGN:
+    The request body is JSON, in the form:
+        {"ops": [{"op": "delete", "alias": "..."},
+                 {"op": "move", "alias": "..."},
+                 {"op": "play", "alias": "..."}]}
+
+    The actions are applied in a single transaction; refer to the
+    docstring for db.DBConn.player_batch() for the order in which the
+    actions are applied.  The number of actions is limited by the
+    batch_max_ops key in config.json.  An invalid request returns a
+    400 (bad request) response, and no actions are applied.
+
+    The response contains the outcome of each action ('results'), and
+    the new scoreboard state and version, in the same form as the
+    /api/state route.
+
+    Deleted players are removed from the rank index; the other actions
+    do not change a player's score, or completed status.
+    '''
+
+    #GET AND VALIDATE ACTIONS
+    body = request.get_json(silent=True)
+    ops = body.get('ops') if isinstance(body, dict) else None
+
+    if not isinstance(ops, list) or not 0 < len(ops) <= CFG['batch_max_ops']:
+        abort(400)
+    if not all(isinstance(item, dict) and item.get('op') in ('delete', 'move', 'play')
+               and isinstance(item.get('alias'), basestring) and item['alias']
+               for item in ops):
+        abort(400)
+
+    #APPLY ACTIONS
+    ops = [(item['op'], item['alias']) for item in ops]
+    outcomes = DBC.player_batch(ops=ops)
+    #FORCE THE SCOREBOARD DATA TO BE REBUILT (ONCE)
+    SNAP.invalidate()
+
+    #REMOVE DELETED PLAYERS FROM THE RANK INDEX
+    for (_, alias), outcome in zip(ops, outcomes):
+        if outcome == 'DELETED':
+            RANKS.remove(alias=alias)
+
+    #GET NEW STATE
+    version, data = SNAP.state()
+    results = [dict(op=op, alias=alias, outcome=outcome)
+               for (op, alias), outcome in zip(ops, outcomes)]
+
+    return jsonify(results=results, version=state_version(version), state=build_state(data))
 
 
 #-----------------------------------------------------------------------
@@ -335,10 +1424,17 @@ def player_delete():
     DESIGN:
     Refer to the docstring (design section) for:
         - db.DBConn.player_delete()
+
+    The player is also removed from the rank index.
     '''
 
+    alias = request.args.get('alias')
+
     #UPDATE RECORD STATUS TO 'DELETED'
-    DBC.player_delete(alias=request.args.get('alias'))
+    if DBC.player_delete(alias=alias):
+        RANKS.remove(alias=alias)
+    #FORCE THE SCOREBOARD DATA TO BE REBUILT
+    SNAP.invalidate()
 
     #RELOAD SCOREBOARD
     return redirect('/')
@@ -356,10 +1452,15 @@ def player_move():
     DESIGN:
     Refer to the docstring (design section) for:
         - db.DBConn.player_move()
+
+    A move does not change the player's score or status; so the rank
+    index is not changed, and is not re-synced.
     '''
 
     #MOVE A PLAYER TO THE BACK OF THE QUEUE
     DBC.player_move(alias=request.args.get('alias'))
+    #FORCE THE SCOREBOARD DATA TO BE REBUILT
+    SNAP.invalidate()
 
     #RELOAD SCOREBOARD
     return redirect('/')
@@ -377,27 +1478,51 @@ def player_playing():
     DESIGN:
     Refer to the docstring (design section) for:
         - db.DBConn.player_playing()
+
+    If the status is not changed, the reason is flashed to the
+    scoreboard page (e.g. the name of the player already playing).
     '''
 
     #UPDATE A PLAYER'S STATUS TO 'PLAYING'
-    DBC.player_playing(alias=request.args.get('alias'))
+    outcome, name = DBC.player_playing(alias=request.args.get('alias'))
+    #FORCE THE SCOREBOARD DATA TO BE REBUILT
+    SNAP.invalidate()
+
+    #REPORT OUTCOME
+    if outcome == 'BLOCKED':
+        flash('%s is already playing.  Their game must be completed first.' % name)
+    elif outcome == 'NOT_QUEUED':
+        flash('%s is not in the queue.' % name)
+    elif outcome == 'ERROR':
+        flash('%s could not be set to playing.  Please try again.' % name)
 
     #RELOAD SCOREBOARD
     return redirect('/')
 
 
 #-----------------------------------------------------------------------
-#MAIN CONTROLLER
-def main():
+#PROGRAM INITIALISATION
+def init(wsgi=False):
 
     '''
     PURPOSE:
-    This is the main program controller.
+    This method sets up the program's global objects (database, config,
+    caches and rank index); used by both main() (development server)
+    and wsgi.py (production server).
 
     DESIGN:
-    The scoreboard's port is pulled from the config file.  Using a
-    different port from the registration program allows the programs
-    to be run in parallel, even from the same PC.
+    When run under a WSGI server with several worker processes, each
+    worker calls init() and holds its own caches.
+
+    The wsgi argument is True when called by wsgi.py; the scoreboard
+    snapshot is then shared by the worker processes, using the file
+    named by the 'wsgi_snapshot_file' key in config.json.  The
+    development server does not share the snapshot (unless the
+    'snapshot_file' key is set); as with the debug reloader, the idle
+    reloader process would otherwise be elected to build it.
+    Likewise, the worker processes' metrics are exported to the
+    'wsgi_metrics_dir' directory; the development server does not
+    export its metrics, unless the 'metrics_dir' key is set.
     '''
 
     #ALLOW GLOBALS
@@ -405,14 +1530,47 @@ def main():
 
     global DBC
     global CFG
+    global SNAP
+    global ASSETS
+    global AVATARS
+    global RANKS
 
     DBC = setup_db()
     CFG = setup_config()
 
+    #SHARE THE SNAPSHOT AND METRICS BETWEEN THE WSGI SERVER'S WORKER PROCESSES
+    if wsgi:
+        CFG['snapshot_file'] = CFG['wsgi_snapshot_file']
+        CFG['metrics_dir'] = CFG['wsgi_metrics_dir']
+
+    ASSETS = setup_assets()
+    AVATARS = setup_avatars()
+    SNAP = setup_snapshot()
+    RANKS = setup_ranks()
+    setup_metrics()
+
+
+#-----------------------------------------------------------------------
+#MAIN CONTROLLER
+def main():
+
+    '''
+    PURPOSE:
+    This is the main program controller.
+
+    DESIGN:
+    The scoreboard's port is pulled from the config file.  Using a
+    different port from the registration program allows the programs
+    to be run in parallel, even from the same PC.
+    '''
+
+    #PROGRAM SETUP
+    init()
+
     #RUN APP
     APP.run(host=CFG['host'], port=CFG['port'],
-            debug=CFG['app_debug'],
-            threaded=CFG['app_threaded'])
+            debug=str2bool(CFG['app_debug']),
+            threaded=str2bool(CFG['app_threaded']))
 
 
 #-----------------------------------------------------------------------
@@ -0,0 +1,174 @@
+'''------------------------------------------------------------------------------------------------
+Program:    assets.py
+Version:    0.1.0
+Py Ver:     2.7
+Purpose:    Content versions (fingerprints) of the scoreboard's static files, and gzip compression
+            of text responses.
+
+Dependents: gzip
+            hashlib
+            os
+            threading
+            StringIO
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:
+
+Use:        From the app program:
+            ---------------------
+            import assets
+
+            static = assets.StaticAssets(folder=APP.static_folder)
+
+            version = static.version(filename='styles/styles.css')
+            data = static.compressed(filename='styles/styles.css', data=raw, level=6)
+
+            data = assets.gzip_bytes(data=raw, level=6)
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+------------------------------------------------------------------------------------------------'''
+
+import gzip
+import hashlib
+import os
+import threading
+
+from StringIO import StringIO
+
+
+#RESPONSE MIMETYPES WHICH ARE COMPRESSED
+COMPRESSIBLE = ('text/html', 'text/css', 'text/plain', 'application/json',
+                'application/javascript', 'application/x-javascript', 'text/javascript')
+
+
+class StaticAssets(object):
+
+    '''
+    PURPOSE:
+    This class returns a content version for each static file, for use
+    in the file's URL (?v=<version>); so a file's URL changes when (and
+    only when) its content changes, and the browser can cache each URL
+    indefinitely.
+
+    DESIGN:
+    The version is the first 12 characters of the SHA-1 digest of the
+    file's content.  Digests are cached, keyed on the file's stat
+    signature (inode, modification time and size); so a file is only
+    read and hashed again after it has been changed or replaced.
+    Checking a version therefore costs one os.stat() call.
+
+    This also applies to the profile graph (images/profile.png), which
+    is replaced by the profiler program each time a player finishes;
+    the graph's version changes with every new graph, even if two
+    graphs are written within the same second.
+
+    If a file cannot be found, None is returned as the version.
+
+    The gzip compressed content of text files is also cached, against
+    the file's version, by the compressed() function.
+
+    USE:
+    import assets
+
+    static = assets.StaticAssets(folder=APP.static_folder)
+    version = static.version(filename='styles/styles.css')
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, folder):
+
+        self._folder        = folder
+        self._lock          = threading.Lock()
+        #{FILENAME: (STAT SIGNATURE, VERSION)}
+        self._versions      = dict()
+        #{FILENAME: (VERSION, COMPRESSED DATA)}
+        self._compressed    = dict()
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CONTENT VERSION OF A STATIC FILE
+    def version(self, filename):
+
+        '''
+        PURPOSE:
+        The version() function returns the content version of the
+        passed static file (path relative to the static folder), or
+        None if the file cannot be read.
+        '''
+
+        path = os.path.join(self._folder, filename)
+
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_ino, stat.st_mtime, stat.st_size)
+
+            #TEST FOR A CACHED VERSION
+            with self._lock:
+                cached = self._versions.get(filename)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+            #HASH FILE CONTENT
+            with open(path, 'rb') as fstatic:
+                version = hashlib.sha1(fstatic.read()).hexdigest()[:12]
+
+        except (IOError, OSError):
+            return None
+
+        with self._lock:
+            self._versions[filename] = (signature, version)
+
+        return version
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE GZIP COMPRESSED CONTENT OF A STATIC FILE
+    def compressed(self, filename, data, level):
+
+        '''
+        PURPOSE:
+        The compressed() function returns the gzip compressed version
+        of the passed file data (as read by the static route), so each
+        static text file is only compressed once per version.
+        '''
+
+        version = self.version(filename=filename)
+
+        with self._lock:
+            cached = self._compressed.get(filename)
+        if version and cached and cached[0] == version:
+            return cached[1]
+
+        data = gzip_bytes(data=data, level=level)
+
+        with self._lock:
+            self._compressed[filename] = (version, data)
+
+        return data
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS GZIP COMPRESSED DATA
+def gzip_bytes(data, level):
+
+    '''
+    PURPOSE:
+    The gzip_bytes() function returns the passed data, compressed
+    using gzip at the passed compression level (1-9).
+
+    DESIGN:
+    The gzip header's timestamp is set to 0, so the same data always
+    compresses to the same bytes.
+    '''
+
+    buf = StringIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=level, mtime=0) as fgzip:
+        fgzip.write(data)
+
+    return buf.getvalue()
@@ -0,0 +1,175 @@
+'''------------------------------------------------------------------------------------------------
+Program:    avatars.py
+Version:    0.3.0
+Py Ver:     2.7
+Purpose:    Process-wide cache of avatar images for the scoreboard.
+
+Dependents: collections
+            threading
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:
+
+Use:        From the app program:
+            ---------------------
+            import avatars
+
+            cache = avatars.AvatarCache(max_size=64)
+
+            cache.put(avatar_id, blob)
+            blob = cache.get(avatar_id)
+            print cache.stats()
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       Replaced encode() with add() and get(), as the avatars
+                                        are now served as raw bytes from the /avatar/<id> route,
+                                        rather than inline base64 strings.
+                                        Added mimetype() function.
+18.10.26    J. Berendt      0.3.0       Replaced add() with put(), as the avatar id (the image's
+                                        SHA-1 digest) is now read from the avatarcatalog table,
+                                        rather than computed from each player's copy of the
+                                        image.  get() now counts the cache hits and misses.
+------------------------------------------------------------------------------------------------'''
+
+import threading
+
+from collections import OrderedDict
+
+
+class AvatarCache(object):
+
+    '''
+    PURPOSE:
+    This class is used to cache the binary data of each avatar image,
+    so the images can be served by the scoreboard's /avatar/<id> route
+    and cached by the browser, rather than being embedded in the page
+    on every scoreboard refresh.
+
+    DESIGN:
+    The cache is keyed by the avatar's id; the SHA-1 digest of the
+    image, as held in the avatarcatalog table.  There are only a
+    small number of distinct avatar images, shared by many players.
+    The id is also used as the image's (strong) ETag; as the id only
+    ever refers to the same image data.
+
+    On a cache miss, the caller reads the image from the avatar
+    catalog, and adds it to the cache using put().
+
+    The cache is bounded by the max_size argument.  When full, the
+    least recently used entry is evicted.
+
+    Hit, miss and eviction counters are kept, and can be reported
+    using the stats() function.
+
+    USE:
+    import avatars
+
+    cache = avatars.AvatarCache(max_size=64)
+    blob = cache.get(avatar_id)
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, max_size):
+
+        self._max_size  = max_size
+        self._lock      = threading.Lock()
+        self._cache     = OrderedDict()
+        self._hits      = 0
+        self._misses    = 0
+        self._evictions = 0
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE BINARY DATA FOR AN AVATAR ID
+    def get(self, avatar_id):
+
+        '''
+        PURPOSE:
+        The get() function returns the binary data for the passed
+        avatar id, or None if the id is not in the cache.
+
+        DESIGN:
+        If the id is found in the cache, the entry is moved to the end
+        of the eviction order.
+        '''
+
+        with self._lock:
+            #TEST FOR CACHED VALUE
+            if avatar_id in self._cache:
+                self._hits += 1
+                #MOVE TO THE END OF THE EVICTION ORDER
+                self._cache[avatar_id] = self._cache.pop(avatar_id)
+                return self._cache[avatar_id]
+
+            self._misses += 1
+
+        return None
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO ADD AN AVATAR TO THE CACHE
+    def put(self, avatar_id, blob):
+
+        '''
+        PURPOSE:
+        The put() method adds the passed avatar binary data to the
+        cache, under the passed avatar id.
+
+        DESIGN:
+        When the cache is full, the least recently used entries are
+        evicted.
+        '''
+
+        with self._lock:
+            #ADD TO CACHE >> EVICT LEAST RECENTLY USED ENTRIES
+            self._cache.pop(avatar_id, None)
+            self._cache[avatar_id] = bytes(blob)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CACHE COUNTERS
+    def stats(self):
+
+        '''
+        PURPOSE:
+        The stats() function returns a dictionary of the cache's
+        counters; used to confirm the cache is working as expected.
+        '''
+
+        with self._lock:
+            return dict(size=len(self._cache),
+                        max_size=self._max_size,
+                        hits=self._hits,
+                        misses=self._misses,
+                        evictions=self._evictions)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE MIMETYPE OF AN IMAGE
+def mimetype(blob):
+
+    '''
+    PURPOSE:
+    The mimetype() function returns the mimetype of the passed image
+    data, by testing the file signature.  The avatar images are PNG
+    files by design, however JPEG and GIF images are also recognised.
+    '''
+
+    #TEST FILE SIGNATURE
+    if blob.startswith('\x89PNG'):
+        return 'image/png'
+    elif blob.startswith('\xff\xd8'):
+        return 'image/jpeg'
+    elif blob.startswith('GIF8'):
+        return 'image/gif'
+
+    return 'application/octet-stream'
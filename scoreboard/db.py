@@ -1,12 +1,15 @@
 '''------------------------------------------------------------------------------------------------
 Program:    db.py
-Version:    0.2.1
+Version:    1.2.0
 Py Ver:     2.7
 Purpose:    Database class for the pibike scoreboard interface.
 
 Dependents: json
+            metrics
+            migrate
             mysql.connector
-            pandas
+            pool
+            statements
             time
 
 Developer:  J. Berendt
@@ -34,12 +37,62 @@ Date        Programmer      Version     Update
 14.08.17    J. Berendt      0.2.0       Added a create() method to create the db table on class
                                         instantiation, if it doesn't already exist.
 24.08.17    J. Berendt      0.2.1       Generalised company branding for github.
+18.10.26    J. Berendt      0.3.0       Added fingerprint() function, used by the snapshot cache
+                                        to detect changes to the avatardata table.
+18.10.26    J. Berendt      0.4.0       Added a connection pool (pool.py).  connect() now returns a
+                                        pooled connection, and close() returns the connection to
+                                        the pool.  Pool settings are read from the 'pool' key in
+                                        db_config.json.  Added pool_stats() function.
+18.10.26    J. Berendt      0.5.0       Added a SQL statement registry (statements.py).  All SQL
+                                        files are loaded and validated once, on instantiation,
+                                        rather than being read from disk on each call.
+18.10.26    J. Berendt      0.6.0       Added query() function, which returns the results of a
+                                        query as a list of dictionaries (one per row).
+                                        Removed the pandas dependency.
+18.10.26    J. Berendt      0.7.0       create() now applies the versioned schema migrations in
+                                        db_resource/migrations (migrate.py), which create the
+                                        gamedata table and its indexes, and upgrade existing
+                                        databases in place.
+18.10.26    J. Berendt      0.8.0       player_playing() now calls the player_playing stored
+                                        procedure, which checks for another playing player and
+                                        updates the status in one locked transaction (one round
+                                        trip).  Returns the outcome and player name to the caller.
+18.10.26    J. Berendt      0.9.0       Added player_batch() method, which applies a list of
+                                        delete, move and play actions in a single transaction.
+18.10.26    J. Berendt      1.0.0       Added metrics (metrics.py): the time taken by each SQL
+                                        statement (by statement name), the time taken to open a
+                                        new connection, and the connection pool gauges.
+                                        query() now takes the statement name, rather than the
+                                        statement text.
+18.10.26    J. Berendt      1.0.1       BUG: If a query failed, the connection was not returned
+                                        to the connection pool (only closed on success), and was
+                                        later dropped by the pool; skewing the pool statistics.
+                                        FIX: Each connection is closed in a finally block, as in
+                                        query().
+18.10.26    J. Berendt      1.1.0       fingerprint() now reads the avatardata change counters
+                                        (a single row, maintained by triggers), rather than a
+                                        checksum of every avatardata row (a full table scan).
+18.10.26    J. Berendt      1.2.0       player_delete() now returns True if the player was
+                                        updated; used to update the rank index.
 ------------------------------------------------------------------------------------------------'''
 
 import json
 import time
-import pandas as pd
+import metrics
+import migrate
 import mysql.connector
+import pool
+import statements
+
+
+#MYSQL ERROR NUMBER FOR A TRANSACTION ROLLED BACK AS A DEADLOCK
+ERR_DEADLOCK = 1213
+
+#METRICS
+QUERY_TIME      = metrics.REGISTRY.histogram('db_query_seconds',
+                                             'Time taken to execute a SQL statement, by name.')
+CONNECT_TIME    = metrics.REGISTRY.histogram('db_connect_seconds',
+                                             'Time taken to open a new database connection.')
 
 
 class DBConn(object):
@@ -52,6 +105,20 @@ class DBConn(object):
         self._db_config = json.loads(open(db_config_file).read())
         self._config    = json.loads(open('config.json').read())
 
+        #LOAD AND VALIDATE ALL SQL STATEMENTS (FAILS ON STARTUP IF A FILE IS MISSING)
+        self.statements = statements.Statements(config=self._config,
+                                                reload_interval=self._config['sql_reload_interval'])
+
+        #CREATE CONNECTION POOL (POOL SETTINGS ARE NOT PASSED TO THE CONNECTION)
+        self._pool = pool.ConnectionPool(connect=self._connect,
+                                         **self._db_config.pop('pool', {}))
+
+        #REPORT CONNECTION POOL GAUGES
+        metrics.REGISTRY.gauge('db_pool_open_connections', 'Open database connections.',
+                               func=lambda: self._pool.stats()['open'])
+        metrics.REGISTRY.gauge('db_pool_idle_connections', 'Idle database connections.',
+                               func=lambda: self._pool.stats()['idle'])
+
 
     #-------------------------------------------------------------------
     #FUNCTION RETURNS THE DB CONNECTION OBJECT
@@ -63,13 +130,14 @@ class DBConn(object):
         in the db_config.json file, which is read into the
         self._db_config variable on class instantiation.
 
-        This dictionary is passed into the mysql.connector.connect()
-        function as a **kwargs argument.
+        Connections are taken from the connection pool, which opens new
+        connections using this dictionary (refer to _connect()).  Calling
+        close() on the returned connection returns it to the pool.
         '''
 
         try:
             #RETURN A CONNECTION TO THE DATABASE
-            return mysql.connector.connect(**self._db_config)
+            return self._pool.acquire()
 
         except Exception as err:
             #NOTIFICATION
@@ -83,67 +151,126 @@ class DBConn(object):
 
         '''
         PURPOSE:
-        This method is used to create the gamedata table.
+        This method is used to create the gamedata table and its
+        indexes, or upgrade an existing table to the latest schema.
 
         DESIGN:
         This method should be called *once* on program startup; perhaps
         from the main() method of the program.
 
-        The create script is contained in the
-        /db_resource/qry_create_gamedata.sql file.
+        The create script and the schema changes are contained in the
+        /db_resource/migrations directory, and are applied in order by
+        the migrate.Migrator class.  The schema version is recorded in
+        the schema_version table under the 'scoreboard' component.
         '''
 
         try:
-            #CREATE CONNECTION AND CURSOR OBJECTS
-            conn = self.connect()
-            cur  = conn.cursor()
+            #APPLY PENDING MIGRATIONS
+            migrator = migrate.Migrator(connect=self.connect, component='scoreboard',
+                                        path=self._config['dir_migrations'])
+            migrator.migrate()
+
+        except Exception as err:
+            #NOTIFICATION
+            print 'ERR: An error occurred while creating / migrating the table.'
+            print 'ERR: %s' % err
 
-            #READ QUERY
-            qry = open(self._config['qry_create_gamedata']).read()
 
-            #EXECUTE / COMMIT / CLOSE CONNECTION
-            cur.execute(qry)
-            conn.commit()
-            conn.close()
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A FINGERPRINT OF THE SCOREBOARD'S PLAYER DATA
+    def fingerprint(self):
+
+        '''
+        PURPOSE:
+        The fingerprint() function is used by the scoreboard snapshot
+        cache to determine if the avatardata table has changed since
+        the scoreboard data was last compiled.
+
+        DESIGN:
+        The query returns the avatardata change counters, as a tuple of
+        (changes, score_changes).  The counters are a single row,
+        incremented by the avatardata triggers when the data shown on
+        the scoreboard changes (refer to the 0010_avatardata_changes.sql
+        migration in the registration program).  The row is read by its
+        primary key; so the check takes the same time for any number of
+        players, and is run every snapshot_interval seconds.
+
+        If an error occurs, None is returned; which forces the snapshot
+        to be rebuilt.
+        '''
+
+        #CONNECT TO DB
+        conn = self.connect()
+
+        try:
+            #GET CURSOR OBJECT
+            cur = conn.cursor()
+
+            #GET AND EXECUTE QUERY
+            qry = self.statements['qry_fingerprint']
+            with QUERY_TIME.time(query='qry_fingerprint'):
+                cur.execute(qry)
+                res = tuple(cur.fetchone())
+
+            return res
 
         except Exception as err:
             #NOTIFICATION
-            print 'ERR: An error occurred while creating the table.'
+            print 'ERR: An error occurred while reading the scoreboard fingerprint.'
             print 'ERR: %s' % err
 
+            return None
+
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
 
     #-------------------------------------------------------------------
-    #METHOD USED TO DELETE A PLAYER FROM THE QUEUE
+    #FUNCTION USED TO DELETE A PLAYER FROM THE QUEUE
     def player_delete(self, alias):
 
         '''
         PURPOSE:
-        The player_delete() method is used to remove a player from the
-        queue.
+        The player_delete() function is used to remove a player from the
+        queue.  True is returned if the player was updated, or False if
+        an error occurred.
 
         DESIGN:
         The player's record *is not* deleted, however their 'status'
         is changed to 'DELETED'.
         '''
 
+        #CONNECT TO DB
+        conn = self.connect()
+
         try:
-            #CONNECT TO DB >> GEGT CURSOR OBJECT
-            conn = self.connect()
+            #GET CURSOR OBJECT
             cur = conn.cursor()
 
-            #READ AND EXECUTE QUERY
-            qry = open(self._config['qry_player_delete']).read()
-            cur.execute(qry, (alias,))
+            #GET AND EXECUTE QUERY
+            qry = self.statements['qry_player_delete']
+            with QUERY_TIME.time(query='qry_player_delete'):
+                cur.execute(qry, (alias,))
 
-            #COMMIT AND CLOSE CONNECTION
+            #COMMIT
             conn.commit()
-            conn.close()
+
+            return True
 
         except Exception as err:
             #NOTIFICATION
             print 'ERR: An error occurred while deleting player: (%s)' % alias
             print 'ERR: %s' % err
 
+            return False
+
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
 
     #-------------------------------------------------------------------
     #METHOD USED TO MOVE A PLAYER TO THE BACK OF THE QUEUE
@@ -159,21 +286,23 @@ class DBConn(object):
         epoch time; thus pushing the player to the back of the order.
         '''
 
+        #CONNECT TO DB
+        conn = self.connect()
+
         try:
             #GET CURRENT EPOCH TIME (USED AS THE NEW QUEUEPOSITION VALUE)
             epoch = int(time.time())
 
-            #CONNECT TO DB >> GET CURSOR OBJECT
-            conn = self.connect()
+            #GET CURSOR OBJECT
             cur = conn.cursor()
 
-            #READ AND EXECUTE QUERY
-            qry = open(self._config['qry_player_move']).read()
-            cur.execute(qry, (epoch, alias))
+            #GET AND EXECUTE QUERY
+            qry = self.statements['qry_player_move']
+            with QUERY_TIME.time(query='qry_player_move'):
+                cur.execute(qry, (epoch, alias))
 
-            #COMMIT AND CLOSE CONNECTION
+            #COMMIT
             conn.commit()
-            conn.close()
 
         except Exception as err:
             #NOTIFICATION
@@ -181,6 +310,11 @@ class DBConn(object):
                   'queue.' % alias
             print 'ERR: %s' % err
 
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
 
     #-------------------------------------------------------------------
     #METHOD TO SET A PLAYER'S STATUS TO PLAYING
@@ -189,46 +323,241 @@ class DBConn(object):
         '''
         PURPOSE:
         The player_playing() method is used to set a player's status
-        to 'PLAYING'.
+        to 'PLAYING', and returns a tuple of (outcome, name):
+            - ('PLAYING', alias): the player is now playing
+            - ('BLOCKED', name): another player (name) is already
+              playing; the status is not changed
+            - ('NOT_QUEUED', alias): the player is not in the queue
+            - ('ERROR', alias): the database action failed
 
         DESIGN:
-        The player's status is updated to 'PLAYING' after first
-        verifying another player does not already have a 'PLAYING'
-        status.
-
-        If other players are found with a 'PLAYING' status, a
-        STATUS ERROR is output to the console showing a list of player
-        names with a 'PLAYING' status.
+        The player_playing stored procedure (created by the
+        0003_player_playing_procedure.sql migration) locks the rows
+        with a 'PLAYING' status, checks another player is not playing,
+        and updates the player's status; in a single transaction and a
+        single round trip.  Therefore two operators clicking at the
+        same time cannot both set a player to 'PLAYING'.
+
+        If the database rolls back the call as a deadlock (the losing
+        side of two concurrent calls), the call is retried; the retry
+        then reports the other player as BLOCKED.
         '''
 
-        try:
-            #CONNECT TO DB >> GET CURSOR OBJECT
+        for attempt in range(1, 4):
+            #CONNECT TO DB
             conn = self.connect()
-            cur = conn.cursor()
 
-            #GET COUNT OF RECORDS WITH STATUS OF 'PLAYING'
-            qry_playing = open(self._config['qry_count_playing']).read()
-            cur.execute(qry_playing)
-            count = cur.fetchall()[0][0]
+            try:
+                #GET CURSOR OBJECT
+                cur = conn.cursor()
+
+                #CALL PROCEDURE >> GET OUTCOME
+                with QUERY_TIME.time(query='proc_player_playing'):
+                    cur.callproc('player_playing', (alias, ))
+                    outcome, name = [result.fetchall() for result in cur.stored_results()][0][0]
 
-            #TEST IF ANOTHER PLAYER IS PLAYING
-            if count == 0:
-                #UPDATE PLAYER STATUS TO 'PLAYING'
-                qry = open(self._config['qry_player_playing']).read()
-                cur.execute(qry, (alias, ))
-                conn.commit()
-            else:
-                #GET NAME OF PLAYER ALREADY PLAYING
-                df = pd.read_sql(sql=open(self._config['qry_getdata_now_playing']).read(),
-                                 con=conn)
                 #PRINT TROUBLESHOOTING ERROR TO CONSOLE
-                print "STATUS ERROR: These players already have a status of 'PLAYING': %s" \
-                      % df['name'].tolist()
+                if outcome == 'BLOCKED':
+                    print "STATUS ERROR: This player already has a status of 'PLAYING': %s" % name
 
-            #CLOSE DB CONNECTION
-            conn.close()
+                return outcome, name
 
-        except Exception as err:
-            #NOTIFICATION
-            print "ERR: An error occurred while updating player (%s) to 'PLAYING'" % alias
-            print 'ERR: %s' % err
+            except mysql.connector.Error as err:
+                #TEST FOR DEADLOCK >> RETRY
+                if err.errno == ERR_DEADLOCK and attempt < 3:
+                    continue
+
+                #NOTIFICATION
+                print "ERR: An error occurred while updating player (%s) to 'PLAYING'" % alias
+                print 'ERR: %s' % err
+
+            except Exception as err:
+                #NOTIFICATION
+                print "ERR: An error occurred while updating player (%s) to 'PLAYING'" % alias
+                print 'ERR: %s' % err
+
+            finally:
+                #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+                if conn is not None:
+                    conn.close()
+
+            return 'ERROR', alias
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION TO APPLY A BATCH OF QUEUE ACTIONS
+    def player_batch(self, ops):
+
+        '''
+        PURPOSE:
+        The player_batch() function applies a list of queue actions,
+        as (op, alias) tuples, where op is 'delete', 'move' or 'play';
+        and returns a list of the outcome for each action (in the same
+        order):
+            - delete: 'DELETED'
+            - move: 'MOVED'
+            - play: 'PLAYING', 'BLOCKED' or 'NOT_QUEUED'; refer to the
+              docstring for player_playing()
+        If the batch fails, it is rolled back and every outcome is
+        'ERROR'.
+
+        DESIGN:
+        All actions are applied in a single transaction, using one
+        executemany() call per action type, in this order:
+            - delete: status is set to 'DELETED'
+            - move: players are moved to the back of the queue, in the
+              order passed
+            - play: the 'PLAYING' rows are locked (as in the
+              player_playing procedure), and if no other player is
+              playing, the first queued player of the play actions
+              is set to 'PLAYING'.  Any further play actions are
+              BLOCKED by that player.
+        Therefore a playing no-show can be deleted, and the next
+        player set to playing, in one batch.
+
+        If the database rolls back the batch as a deadlock, the batch
+        is retried.
+        '''
+
+        deletes = [(alias, ) for op, alias in ops if op == 'delete']
+        moves = [alias for op, alias in ops if op == 'move']
+        plays = [alias for op, alias in ops if op == 'play']
+
+        for attempt in range(1, 4):
+            #CONNECT TO DB
+            conn = self.connect()
+
+            try:
+                #GET CURRENT EPOCH TIME (USED AS THE NEW QUEUEPOSITION VALUES)
+                epoch = int(time.time())
+
+                #GET CURSOR OBJECT
+                cur = conn.cursor()
+
+                #DELETE PLAYERS
+                if deletes:
+                    with QUERY_TIME.time(query='qry_player_delete'):
+                        cur.executemany(self.statements['qry_player_delete'], deletes)
+
+                #MOVE PLAYERS TO THE BACK OF THE QUEUE (KEEPING THEIR ORDER)
+                if moves:
+                    with QUERY_TIME.time(query='qry_player_move'):
+                        cur.executemany(self.statements['qry_player_move'],
+                                        [(epoch + idx, alias) for idx, alias in enumerate(moves)])
+
+                #SET FIRST QUEUED PLAY PLAYER TO PLAYING (IF NO OTHER PLAYER IS PLAYING)
+                playing = dict()
+                if plays:
+                    with QUERY_TIME.time(query='qry_lock_playing'):
+                        cur.execute(self.statements['qry_lock_playing'])
+                        rows = cur.fetchall()
+                    blocker = rows[0][0] if rows else None
+                    for alias in plays:
+                        if blocker:
+                            playing[alias] = 'PLAYING' if alias == blocker else 'BLOCKED'
+                            continue
+                        with QUERY_TIME.time(query='qry_player_playing_queued'):
+                            cur.execute(self.statements['qry_player_playing_queued'], (alias, ))
+                        if cur.rowcount == 1:
+                            blocker = alias
+                            playing[alias] = 'PLAYING'
+                        else:
+                            playing[alias] = 'NOT_QUEUED'
+
+                #COMMIT
+                conn.commit()
+
+                #BUILD OUTCOMES
+                done = dict(delete='DELETED', move='MOVED')
+                return [done[op] if op in done else playing[alias] for op, alias in ops]
+
+            except mysql.connector.Error as err:
+                #TEST FOR DEADLOCK >> RETRY
+                if err.errno == ERR_DEADLOCK and attempt < 3:
+                    continue
+
+                #NOTIFICATION
+                print 'ERR: An error occurred while applying a batch of queue actions.'
+                print 'ERR: %s' % err
+
+            except Exception as err:
+                #NOTIFICATION
+                print 'ERR: An error occurred while applying a batch of queue actions.'
+                print 'ERR: %s' % err
+
+            finally:
+                #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+                if conn is not None:
+                    conn.close()
+
+            return ['ERROR'] * len(ops)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE RESULTS OF A QUERY AS A LIST OF DICTIONARIES
+    def query(self, name, params=None):
+
+        '''
+        PURPOSE:
+        The query() function executes the named query (the statement's
+        config key, e.g. 'qry_getdata_ranks') and returns the results
+        as a list of dictionaries, one per row, keyed by the field
+        names.
+
+        DESIGN:
+        A dictionary cursor is used, so the rows are mapped to their
+        field names by the connector as they are fetched; rather than
+        building a dataframe for a handful of rows.
+
+        Errors are raised to the caller; the connection is returned to
+        the pool in either case.
+        '''
+
+        #CONNECT TO DB >> GET DICTIONARY CURSOR
+        conn = self.connect()
+
+        try:
+            cur = conn.cursor(dictionary=True)
+            with QUERY_TIME.time(query=name):
+                cur.execute(self.statements[name], params)
+                rows = cur.fetchall()
+            cur.close()
+
+        finally:
+            #CLOSE DB CONNECTION (NONE IF THE CONNECTION FAILED)
+            if conn is not None:
+                conn.close()
+
+        return rows
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CONNECTION POOL STATISTICS
+    def pool_stats(self):
+
+        '''
+        PURPOSE:
+        The pool_stats() function returns the connection pool's
+        statistics; including the time spent waiting for a connection.
+        Refer to the docstring for pool.ConnectionPool.stats().
+        '''
+
+        return self._pool.stats()
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TO OPEN A NEW DB CONNECTION (USED BY THE POOL)
+    def _connect(self):
+
+        '''
+        DESIGN:
+        The dictionary of connection values (db_config.json) is passed
+        into the mysql.connector.connect() function as a **kwargs
+        argument.
+
+        The time taken to open the connection is recorded in the
+        db_connect_seconds metric.
+        '''
+
+        with CONNECT_TIME.time():
+            return mysql.connector.connect(**self._db_config)
@@ -0,0 +1,11 @@
+
+-- ADD INDEXES FOR THE PROFILER QUERIES
+
+-- UPDATE PROFILED FLAG (LOOKUP BY NAME)
+ALTER TABLE gamedata ADD INDEX ix_gamedata_name (name);
+
+-- LATEST UNPROFILED GAME (FILTER ON PROFILED, MAX COMPLETION TIME)
+ALTER TABLE gamedata ADD INDEX ix_gamedata_profiled_time (profiled, completiontime);
+
+-- PROFILE DATA FOR THE LATEST GAME (LOOKUP BY COMPLETION TIME)
+ALTER TABLE gamedata ADD INDEX ix_gamedata_time (completiontime);
\ No newline at end of file
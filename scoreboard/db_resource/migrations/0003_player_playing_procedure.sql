@@ -0,0 +1,49 @@
+
+-- PROCEDURE USED TO SET A PLAYER'S STATUS TO 'PLAYING' (CALLED BY db.DBConn.player_playing())
+-- THE CHECK FOR ANOTHER PLAYING PLAYER AND THE UPDATE ARE MADE IN ONE TRANSACTION, IN ONE ROUND TRIP
+-- THE 'PLAYING' RANGE OF THE (status, queueposition) INDEX IS LOCKED (FOR UPDATE), SO TWO CONCURRENT
+-- CALLS CANNOT BOTH SEE NO PLAYING PLAYER (THE SECOND WAITS, OR IS ROLLED BACK AS A DEADLOCK)
+-- RETURNS A SINGLE ROW OF (outcome, name):
+--   - ('PLAYING', alias):      THE PLAYER IS NOW (OR WAS ALREADY) PLAYING
+--   - ('BLOCKED', name):       ANOTHER PLAYER IS ALREADY PLAYING; name IS THAT PLAYER
+--   - ('NOT_QUEUED', alias):   THE PLAYER WAS NOT FOUND IN THE QUEUE
+
+DROP PROCEDURE IF EXISTS player_playing;
+
+DELIMITER $$
+
+CREATE PROCEDURE player_playing(IN p_alias VARCHAR(35))
+BEGIN
+    DECLARE v_playing VARCHAR(35) DEFAULT NULL;
+    DECLARE v_updated INTEGER DEFAULT 0;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_playing = NULL;
+
+    START TRANSACTION;
+
+    -- LOCK AND GET THE PLAYER ALREADY PLAYING (IF ANY)
+    SELECT name INTO v_playing
+    FROM avatardata
+    WHERE status = 'PLAYING'
+    ORDER BY queueposition ASC
+    LIMIT 1
+    FOR UPDATE;
+
+    -- SET PLAYER TO PLAYING, ONLY IF NO OTHER PLAYER IS PLAYING
+    IF v_playing IS NULL THEN
+        UPDATE avatardata SET status = 'PLAYING' WHERE name = p_alias AND status = 'QUEUED';
+        SET v_updated = ROW_COUNT();
+    END IF;
+
+    COMMIT;
+
+    SELECT
+          CASE
+              WHEN v_playing = p_alias THEN 'PLAYING'
+              WHEN v_playing IS NOT NULL THEN 'BLOCKED'
+              WHEN v_updated = 1 THEN 'PLAYING'
+              ELSE 'NOT_QUEUED'
+          END                               AS outcome
+        , COALESCE(v_playing, p_alias)      AS name;
+END $$
+
+DELIMITER ;
\ No newline at end of file
@@ -0,0 +1,10 @@
+
+-- GET AN AVATAR IMAGE BY ITS ID (THE IMAGE'S SHA-1 DIGEST), AT A DISPLAY SIZE
+-- THE THUMBNAIL FOR THE SIZE IS RETURNED IF ONE EXISTS; OTHERWISE THE FULL SIZE IMAGE FROM THE CATALOG
+SELECT
+      COALESCE(t.image, c.image)    AS image
+FROM
+    avatarcatalog c
+    LEFT JOIN avatarthumbnail t ON t.avatar_id = c.avatar_id AND t.size = %s
+WHERE
+    c.avatar_id = %s
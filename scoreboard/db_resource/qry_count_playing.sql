@@ -1,8 +0,0 @@
-
--- COUNT NUMBER OF PLAYERS WITH A 'PLAYING' STATUS
-SELECT
-    COUNT(*)
-FROM
-    avatardata
-WHERE
-    status = 'PLAYING'
\ No newline at end of file
@@ -0,0 +1,11 @@
+
+-- CHANGE COUNTERS OF THE PLAYER DATA SHOWN ON THE SCOREBOARD (A SINGLE ROW, READ BY PRIMARY KEY)
+-- MAINTAINED BY THE avatardata TRIGGERS; REFER TO 0010_avatardata_changes.sql IN THE REGISTRATION
+-- PROGRAM
+SELECT
+      changes
+    , score_changes
+FROM
+    avatardata_changes
+WHERE
+    id = 1
\ No newline at end of file
@@ -1,9 +0,0 @@
-
--- GET PLAYER NOW PLAYING
-SELECT
-      name
-    , avatar
-FROM
-    avatardata
-WHERE
-    UPPER(status) = 'PLAYING'
\ No newline at end of file
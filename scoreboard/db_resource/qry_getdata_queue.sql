@@ -1,13 +0,0 @@
-
--- GET DATA FOR QUEUE
-SELECT
-      status
-    , name
-    , avatar
-FROM
-    avatardata
-WHERE
-    UPPER(status) not in ('COMPLETE', 'DELETED')
-ORDER BY
-    queueposition ASC 
-LIMIT 5
\ No newline at end of file
@@ -0,0 +1,13 @@
+-- CHANGES TO THE COMPLETED PLAYERS AFTER THE PASSED score_changes VALUE (USED TO UPDATE THE RANK
+-- INDEX); A NULL SCORE REMOVES THE PLAYER. REFER TO 0011_avatardata_score_log.sql IN THE
+-- REGISTRATION PROGRAM
+SELECT
+      seq
+    , name
+    , gamehighscore
+FROM
+    avatardata_score_log
+WHERE
+    seq > %s
+ORDER BY
+    seq ASC
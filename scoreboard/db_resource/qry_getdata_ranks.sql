@@ -0,0 +1,10 @@
+
+-- SCORES OF ALL COMPLETED PLAYERS (USED TO SYNC THE RANK INDEX); PLAYERS WITHOUT A SCORE ARE SKIPPED
+SELECT
+      name
+    , gamehighscore
+FROM
+    avatardata
+WHERE
+    status = 'COMPLETE'
+    AND gamehighscore IS NOT NULL
\ No newline at end of file
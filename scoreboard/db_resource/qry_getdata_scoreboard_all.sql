@@ -0,0 +1,62 @@
+
+-- GET ALL DATA FOR THE SCOREBOARD (NOW PLAYING, QUEUE AND HIGH-SCORES) IN A SINGLE ROUND TRIP
+-- THE 'grp' FIELD IS USED TO SPLIT THE RESULTS INTO THEIR GROUPS
+-- THE 'grp_order' AND 'sort_key' FIELDS KEEP EACH GROUP IN ITS ORIGINAL ORDER
+(
+    -- PLAYER NOW PLAYING
+    SELECT
+          'playing'         AS grp
+        , 1                 AS grp_order
+        , 0                 AS sort_key
+        , status
+        , name
+        , avatar_id         AS avatar
+        , gamehighscore
+        , 0                 AS ranking
+    FROM
+        avatardata
+    WHERE
+        status = 'PLAYING'
+)
+UNION ALL
+(
+    -- QUEUE
+    SELECT
+          'queue'           AS grp
+        , 2                 AS grp_order
+        , queueposition     AS sort_key
+        , status
+        , name
+        , avatar_id         AS avatar
+        , gamehighscore
+        , 0                 AS ranking
+    FROM
+        avatardata
+    WHERE
+        status IN ('QUEUED', 'PLAYING')
+    ORDER BY
+        queueposition ASC
+    LIMIT 5
+)
+UNION ALL
+(
+    -- SCOREBOARD (FROM THE PRE-COMPUTED LEADERBOARD TABLE)
+    SELECT
+          'score'           AS grp
+        , 3                 AS grp_order
+        , l.position        AS sort_key
+        , a.status
+        , l.name
+        , a.avatar_id       AS avatar
+        , l.gamehighscore
+        , l.ranking
+    FROM
+        leaderboard l
+        INNER JOIN avatardata a ON a.rownum = l.rownum
+    ORDER BY
+        l.position ASC
+    LIMIT 5
+)
+ORDER BY
+      grp_order
+    , sort_key
\ No newline at end of file
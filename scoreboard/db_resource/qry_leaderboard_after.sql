@@ -0,0 +1,21 @@
+
+-- NEXT PAGE OF THE FULL LEADERBOARD (KEYSET PAGINATION)
+-- RETURNS THE ROWS AFTER THE LAST ROW OF THE PREVIOUS PAGE (THE CURSOR ROW, c), BY ROWNUM
+-- THE CURSOR ROW'S SCORE IS READ FROM THE TABLE, SO THE FLOAT VALUES ARE COMPARED IN THE DATABASE
+-- THE 'tied' FIELD SHOWS IF A ROW HAS THE SAME SCORE AS THE CURSOR ROW (USED TO CARRY THE RANK)
+SELECT
+      a.rownum
+    , a.name
+    , a.gamehighscore
+    , a.gamehighscore = c.gamehighscore     AS tied
+FROM
+    avatardata a
+    INNER JOIN avatardata c ON c.rownum = %s
+WHERE
+    a.status = 'COMPLETE'
+    AND (a.gamehighscore < c.gamehighscore
+         OR (a.gamehighscore = c.gamehighscore AND a.rownum > c.rownum))
+ORDER BY
+      a.gamehighscore DESC
+    , a.rownum ASC
+LIMIT %s
\ No newline at end of file
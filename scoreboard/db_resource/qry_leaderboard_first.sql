@@ -0,0 +1,17 @@
+
+-- FIRST PAGE OF THE FULL LEADERBOARD
+-- ORDER MATCHES THE leaderboard TABLE (HIGH SCORE, THEN FIRST REGISTRATION); READ IN ORDER FROM
+-- THE (status, gamehighscore DESC, rownum) INDEX
+SELECT
+      rownum
+    , name
+    , gamehighscore
+    , 0                 AS tied
+FROM
+    avatardata
+WHERE
+    status = 'COMPLETE'
+ORDER BY
+      gamehighscore DESC
+    , rownum ASC
+LIMIT %s
\ No newline at end of file
@@ -0,0 +1,13 @@
+
+-- LOCK AND GET THE PLAYER ALREADY PLAYING (IF ANY); USED BEFORE SETTING A PLAYER TO 'PLAYING'
+-- LOCKS THE 'PLAYING' RANGE OF THE (status, queueposition) INDEX UNTIL THE TRANSACTION ENDS
+SELECT
+    name
+FROM
+    avatardata
+WHERE
+    status = 'PLAYING'
+ORDER BY
+    queueposition ASC
+LIMIT 1
+FOR UPDATE
\ No newline at end of file
@@ -1,8 +0,0 @@
-
--- UPDATE STATUS TO PLAYING
-UPDATE
-    avatardata
-SET
-    status = 'PLAYING' 
-WHERE
-    name = %s
\ No newline at end of file
@@ -0,0 +1,9 @@
+
+-- UPDATE A QUEUED PLAYER'S STATUS TO PLAYING (AFTER qry_lock_playing HAS FOUND NO PLAYING PLAYER)
+UPDATE
+    avatardata
+SET
+    status = 'PLAYING'
+WHERE
+    name = %s
+    AND status = 'QUEUED'
\ No newline at end of file
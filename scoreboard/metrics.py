@@ -0,0 +1,781 @@
+'''------------------------------------------------------------------------------------------------
+Program:    metrics.py
+Version:    0.3.0
+Py Ver:     2.7
+Purpose:    In-process metrics (counters, gauges and latency histograms), reported in the
+            Prometheus text format.
+
+Dependents: contextlib
+            errno
+            fcntl (Linux; used to lock the retained totals file)
+            glob
+            json
+            os
+            stat
+            threading
+            time
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   This module is shared by the registration, scoreboard and profiler programs.  Each
+            program holds its own copy; keep the copies identical.
+
+Use:        From any module:
+            ---------------------
+            import metrics
+
+            QUERY_TIME = metrics.REGISTRY.histogram('db_query_seconds', 'SQL statement time.')
+
+            with QUERY_TIME.time(query='qry_player_delete'):
+                cur.execute(qry)
+
+            text = metrics.REGISTRY.render()
+            metrics.REGISTRY.dump(path='/tmp/profiler.prom')
+
+            From the gunicorn master process, when a worker exits:
+            ---------------------
+            metrics.fold(directory='/tmp/scoreboard_run/metrics', pid=worker.pid)
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       BUG: The export files of exited processes were ignored by
+                                        render_all() after 60 seconds; so when a worker was
+                                        restarted, its counts dropped out of the totals, and the
+                                        reported counters went backwards.
+                                        FIX: Added fold(), which adds an exited process's
+                                        counters and histograms to a retained totals file, and
+                                        removes the process's file; and flush(), to write a
+                                        process's final samples as it exits.  The counters and
+                                        histograms of old files are no longer ignored; only
+                                        their gauges.  Export files are now named
+                                        <pid>-<start>.json, so a re-used pid is not confused with
+                                        an exited process.
+18.10.26    J. Berendt      0.3.0       BUG: Files left by processes which exited without fold()
+                                        (for example, under the development server, or after the
+                                        gunicorn master was killed) were never removed; and the
+                                        export directory could be written by other users.
+                                        FIX: start_export() folds the files of processes which
+                                        no longer exist; fold() is locked, so it can be called
+                                        by any process.  The export directory is created with
+                                        mode 0700, and must be private to this user.
+------------------------------------------------------------------------------------------------'''
+
+import errno
+import glob
+import json
+import os
+import stat
+import threading
+import time
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    #NOT AVAILABLE ON WINDOWS; FOLDS ARE NOT LOCKED
+    fcntl = None
+
+
+#DEFAULT HISTOGRAM BUCKETS (SECONDS)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#MIMETYPE OF THE PROMETHEUS TEXT FORMAT
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+#EXPORT DIRECTORY FILE HOLDING THE TOTALS OF EXITED PROCESSES (REFER TO fold())
+RETAINED = 'retained.json'
+#EXPORT DIRECTORY LOCK FILE, HELD WHILE THE RETAINED TOTALS ARE UPDATED
+RETAINED_LOCK = 'retained.lock'
+
+
+class Metric(object):
+
+    '''
+    PURPOSE:
+    Base class for the counter, gauge and histogram metrics.
+
+    DESIGN:
+    Each metric holds a dictionary of series, keyed by the series'
+    label string (as it appears in the text format; for example
+    'route="/",method="GET"').  The sample() function returns a
+    JSON-ready copy of the metric, which is used both to render the
+    text format and to merge the metrics of several processes.
+    '''
+
+    kind = None
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, name, doc):
+
+        self.name       = name
+        self.doc        = doc
+        self._lock      = threading.Lock()
+        self._series    = dict()
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A JSON-READY COPY OF THE METRIC
+    def sample(self):
+
+        with self._lock:
+            series = dict((key, list(val) if isinstance(val, list) else val)
+                          for key, val in self._series.items())
+
+        return dict(name=self.name, type=self.kind, doc=self.doc, series=series)
+
+
+class Counter(Metric):
+
+    '''
+    PURPOSE:
+    A value which only increases; for example the number of requests.
+    '''
+
+    kind = 'counter'
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO INCREMENT THE COUNTER
+    def inc(self, value=1, **labels):
+
+        key = label_key(labels)
+
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+
+class Gauge(Metric):
+
+    '''
+    PURPOSE:
+    A value which can go up and down; for example the queue depth.
+
+    DESIGN:
+    The value is either set using set(), or read from the func
+    function (if passed) each time the metric is sampled.
+
+    When the metrics of several processes are merged, the values are
+    summed (merge='sum'; for example, open connections) or the highest
+    value is kept (merge='max'; for example, a value shared by all
+    processes).
+    '''
+
+    kind = 'gauge'
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, name, doc, func=None, merge='sum'):
+
+        super(Gauge, self).__init__(name=name, doc=doc)
+        self.func   = func
+        self.merge  = merge
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO SET THE GAUGE'S VALUE
+    def set(self, value, **labels):
+
+        with self._lock:
+            self._series[label_key(labels)] = value
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A JSON-READY COPY OF THE METRIC
+    def sample(self):
+
+        '''
+        PURPOSE:
+        Refer to Metric.sample().  If the gauge's function fails, the
+        series is omitted.
+        '''
+
+        sample = super(Gauge, self).sample()
+        sample['merge'] = self.merge
+
+        if self.func is not None:
+            try:
+                sample['series'][''] = self.func()
+
+            except Exception:
+                pass
+
+        return sample
+
+
+class Histogram(Metric):
+
+    '''
+    PURPOSE:
+    A distribution of observed values; for example request latency.
+
+    DESIGN:
+    Each series holds a count per bucket (non-cumulative), followed by
+    the sum and the count of all observed values.  The buckets are
+    made cumulative when rendered.
+    '''
+
+    kind = 'histogram'
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, name, doc, buckets=BUCKETS):
+
+        super(Histogram, self).__init__(name=name, doc=doc)
+        self.buckets = tuple(buckets)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO RECORD A VALUE
+    def observe(self, value, **labels):
+
+        key = label_key(labels)
+        #INDEX OF THE FIRST BUCKET HOLDING THE VALUE (+INF IF NONE)
+        idx = next((i for i, bound in enumerate(self.buckets) if value <= bound),
+                   len(self.buckets))
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+
+    #-------------------------------------------------------------------
+    #CONTEXT MANAGER RECORDS THE TIME TAKEN BY A BLOCK OF CODE
+    @contextmanager
+    def time(self, **labels):
+
+        '''
+        PURPOSE:
+        The time() context manager records the seconds taken by the
+        enclosed block; also when the block raises an error.
+        '''
+
+        start = time.time()
+
+        try:
+            yield
+
+        finally:
+            self.observe(time.time() - start, **labels)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A JSON-READY COPY OF THE METRIC
+    def sample(self):
+
+        sample = super(Histogram, self).sample()
+        sample['buckets'] = list(self.buckets)
+
+        return sample
+
+
+class Registry(object):
+
+    '''
+    PURPOSE:
+    This class holds all of a program's metrics, and reports them in
+    the Prometheus text format.
+
+    DESIGN:
+    Metrics are created by the counter(), gauge() and histogram()
+    functions.  If a metric of the same name already exists, the
+    existing metric is returned; so modules can declare their metrics
+    at import time.
+
+    Several processes:
+    When a program runs as several worker processes, each process
+    holds its own metrics.  If a directory is passed to
+    start_export(), each process writes its samples to
+    <directory>/<pid>-<start>.json every (n) seconds; and render_all()
+    merges the current process's metrics with the other processes'
+    files, so any process can report the totals.
+
+    When a process exits, its counters and histograms are added to
+    the retained totals file by fold(), so the totals do not fall
+    (which Prometheus would read as a counter reset).  Files left by
+    processes which exited without a fold() are folded when the next
+    process starts its export (refer to fold_exited()).
+
+    USE:
+    import metrics
+
+    counter = metrics.REGISTRY.counter('requests_total', 'Requests served.')
+    counter.inc(route='/')
+    text = metrics.REGISTRY.render()
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self):
+
+        self._lock      = threading.Lock()
+        self._metrics   = dict()
+        self._export    = None
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A NEW OR EXISTING COUNTER
+    def counter(self, name, doc):
+
+        return self._add(Counter, name=name, doc=doc)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A NEW OR EXISTING GAUGE
+    def gauge(self, name, doc, func=None, merge='sum'):
+
+        return self._add(Gauge, name=name, doc=doc, func=func, merge=merge)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A NEW OR EXISTING HISTOGRAM
+    def histogram(self, name, doc, buckets=BUCKETS):
+
+        return self._add(Histogram, name=name, doc=doc, buckets=buckets)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE SAMPLES OF ALL METRICS
+    def samples(self):
+
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+
+        return [metric.sample() for metric in metrics]
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE METRICS IN THE PROMETHEUS TEXT FORMAT
+    def render(self):
+
+        return render(samples=self.samples())
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE METRICS OF ALL PROCESSES IN THE TEXT FORMAT
+    def render_all(self, max_age=60):
+
+        '''
+        PURPOSE:
+        The render_all() function returns the merged metrics of this
+        process and of every other process exporting to the same
+        directory (refer to start_export()).  If no export has been
+        started, only this process's metrics are returned.
+
+        DESIGN:
+        The gauges of files not updated for max_age seconds (for
+        example, from a worker which has been stopped) are ignored;
+        their counters and histograms are always included, so the
+        totals never fall.
+
+        The retained totals (refer to fold()) are read after the
+        other files, and any file already folded into them is
+        skipped; as fold() writes the retained totals before removing
+        the folded file, each file is counted exactly once.
+        '''
+
+        groups = [self.samples()]
+
+        if self._export:
+            directory, own = self._export
+            files = dict()
+
+            #READ THE OTHER PROCESSES' FILES
+            for path in glob.glob(os.path.join(directory, '*-*.json')):
+                try:
+                    if path == own:
+                        continue
+                    stale = time.time() - os.path.getmtime(path) > max_age
+                    with open(path) as fjson:
+                        samples = json.load(fjson)
+                    files[os.path.basename(path)] = _totals(samples) if stale else samples
+
+                except (IOError, OSError, ValueError):
+                    #FILE REPLACED OR REMOVED WHILE READING (FOLDED); SKIP
+                    continue
+
+            #READ THE RETAINED TOTALS >> SKIP THE FILES FOLDED INTO THEM
+            retained = _load_retained(directory=directory)
+            groups.append(retained['samples'])
+            groups.extend(samples for name, samples in sorted(files.items())
+                          if name not in retained['folded'])
+
+        return render(samples=merge(groups=groups))
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO WRITE THE METRICS TO A FILE
+    def dump(self, path, fmt='text'):
+
+        '''
+        PURPOSE:
+        The dump() method writes the metrics to the passed file, in the
+        Prometheus text format (fmt='text'; for example, for the
+        node_exporter textfile collector) or as JSON samples
+        (fmt='json'; used by start_export()).
+
+        DESIGN:
+        The file is written to a temporary file and renamed into
+        place, so a reader never sees a partly written file.
+        '''
+
+        data = self.render() if fmt == 'text' else json.dumps(self.samples())
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+
+        with open(tmp, 'w') as fout:
+            fout.write(data)
+        os.rename(tmp, path)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO START WRITING THIS PROCESS'S SAMPLES TO A DIRECTORY
+    def start_export(self, directory, interval=5):
+
+        '''
+        PURPOSE:
+        The start_export() method starts a background thread, which
+        writes this process's samples to <directory>/<pid>-<start>.json
+        every (interval) seconds; refer to render_all().
+
+        DESIGN:
+        The directory is created with mode 0700; an existing directory
+        must be owned by this user, with no group or other permissions,
+        as every process reads the files in it.  Otherwise, an OSError
+        is raised.
+
+        The files of processes which no longer exist (for example, left
+        by a previous run) are folded into the retained totals first;
+        refer to fold_exited().
+        '''
+
+        #CREATE (OR TEST) THE PRIVATE DIRECTORY >> TIDY UP AFTER EXITED PROCESSES
+        _make_private(directory=directory)
+        fold_exited(directory=directory)
+
+        path = os.path.join(directory, '%d-%d.json' % (os.getpid(), int(time.time() * 1000)))
+        self._export = (directory, path)
+
+        def export():
+
+            while True:
+                try:
+                    self.dump(path=path, fmt='json')
+
+                except (IOError, OSError) as err:
+                    #NOTIFICATION
+                    print 'ERR: Could not export the metrics to: %s' % path
+                    print 'ERR: %s' % err
+
+                time.sleep(interval)
+
+        thread = threading.Thread(target=export, name='metrics')
+        thread.daemon = True
+        thread.start()
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO WRITE THIS PROCESS'S SAMPLES TO THE EXPORT DIRECTORY NOW
+    def flush(self):
+
+        '''
+        PURPOSE:
+        The flush() method writes this process's samples to its export
+        file immediately; for example, as the process exits, so the
+        changes since the last export are kept by fold().  Nothing is
+        written if no export has been started.
+        '''
+
+        if self._export:
+            self.dump(path=self._export[1], fmt='json')
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION RETURNS A NEW OR EXISTING METRIC
+    def _add(self, cls, name, **kwargs):
+
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name=name, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError('Metric %s already exists as a %s.' % (name, metric.kind))
+            elif kwargs.get('func') is not None:
+                #GAUGE RE-DECLARED WITH A NEW SOURCE FUNCTION
+                metric.func = kwargs['func']
+
+        return metric
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS THE LABEL STRING FOR A DICTIONARY OF LABELS
+def label_key(labels):
+
+    '''
+    PURPOSE:
+    The label_key() function returns the labels as they appear in the
+    text format, sorted by name; for example 'method="GET",route="/"'.
+    '''
+
+    return ','.join('%s="%s"' % (name, str(labels[name]).replace('\\', '\\\\')
+                                 .replace('"', '\\"').replace('\n', '\\n'))
+                    for name in sorted(labels))
+
+
+#-----------------------------------------------------------------------
+#FUNCTION MERGES THE SAMPLES OF SEVERAL PROCESSES
+def merge(groups):
+
+    '''
+    PURPOSE:
+    The merge() function returns a single list of samples from a list
+    of sample lists (one per process).
+
+    DESIGN:
+    Counters and histograms are summed per series.  Gauges are summed,
+    or the highest value is kept, as defined by the gauge's merge
+    value.  Histograms whose buckets differ are not merged; the first
+    is kept.
+    '''
+
+    merged = dict()
+
+    for samples in groups:
+        for sample in samples:
+            name = sample['name']
+            if name not in merged:
+                merged[name] = dict(sample, series=dict(sample['series']))
+                continue
+
+            into = merged[name]
+            if into['type'] != sample['type'] or into.get('buckets') != sample.get('buckets'):
+                continue
+
+            for key, val in sample['series'].items():
+                if key not in into['series']:
+                    into['series'][key] = val
+                elif sample['type'] == 'histogram':
+                    into['series'][key] = [a + b for a, b in zip(into['series'][key], val)]
+                elif sample.get('merge') == 'max':
+                    into['series'][key] = max(into['series'][key], val)
+                else:
+                    into['series'][key] += val
+
+    return [merged[name] for name in sorted(merged)]
+
+
+#-----------------------------------------------------------------------
+#FUNCTION ADDS AN EXITED PROCESS'S METRICS TO THE RETAINED TOTALS
+def fold(directory, pid):
+
+    '''
+    PURPOSE:
+    The fold() function adds the counters and histograms exported by an
+    exited process to the retained totals file in the directory
+    (RETAINED), then removes the process's export file; so the totals
+    reported by render_all() do not fall when a worker process is
+    restarted.  Gauges are not kept.
+
+    DESIGN:
+    This function is called by the gunicorn master process, from the
+    child_exit hook (refer to gunicorn_conf.py), and on startup by
+    fold_exited().  The retained file is updated while holding an
+    exclusive lock (flock) on the RETAINED_LOCK file, so several
+    processes may fold at once.
+
+    The retained file lists the names of the files folded into it, and
+    is written (by rename) before the folded files are removed; refer
+    to the docstring for Registry.render_all().
+    '''
+
+    with _locked(directory=directory):
+        _fold(directory=directory, pid=pid)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION FOLDS THE FILES OF ALL PROCESSES WHICH NO LONGER EXIST
+def fold_exited(directory):
+
+    '''
+    PURPOSE:
+    The fold_exited() function folds (refer to fold()) the export files
+    of every process which no longer exists; for example, files left
+    by a development server, or by workers whose master process was
+    killed before its child_exit hook ran.  So the directory does not
+    grow from run to run.
+
+    DESIGN:
+    The process id is taken from the file name (<pid>-<start>.json).
+    If a process id has been re-used by a running process, its files
+    are left (and still counted by render_all()) until it exits.
+    '''
+
+    pids = set()
+    for path in glob.glob(os.path.join(directory, '*-*.json')):
+        pid = os.path.basename(path).split('-')[0]
+        if pid.isdigit() and not _running(pid=int(pid)):
+            pids.add(int(pid))
+
+    for pid in sorted(pids):
+        fold(directory=directory, pid=pid)
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION ADDS A PROCESS'S FILES TO THE RETAINED TOTALS (LOCK MUST BE HELD)
+def _fold(directory, pid):
+
+    retained = _load_retained(directory=directory)
+    paths = list()
+
+    for path in sorted(glob.glob(os.path.join(directory, '%d-*.json' % pid))):
+        name = os.path.basename(path)
+        try:
+            if name not in retained['folded']:
+                with open(path) as fjson:
+                    samples = json.load(fjson)
+                retained['samples'] = merge(groups=[retained['samples'], _totals(samples)])
+                retained['folded'].append(name)
+            paths.append(path)
+
+        except (IOError, OSError, ValueError) as err:
+            #NOTIFICATION
+            print 'ERR: Could not fold the metrics file: %s' % path
+            print 'ERR: %s' % err
+
+    if not paths:
+        return
+
+    #WRITE THE RETAINED TOTALS >> REMOVE THE FOLDED FILES
+    path = os.path.join(directory, RETAINED)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as fout:
+        fout.write(json.dumps(retained))
+    os.rename(tmp, path)
+
+    for path in paths:
+        os.remove(path)
+
+
+#-----------------------------------------------------------------------
+#FUNCTION RETURNS SAMPLES IN THE PROMETHEUS TEXT FORMAT
+def render(samples):
+
+    '''
+    PURPOSE:
+    The render() function returns the passed samples in the
+    Prometheus text exposition format (version 0.0.4).
+    '''
+
+    lines = list()
+
+    for sample in samples:
+        name = sample['name']
+        lines.append('# HELP %s %s' % (name, sample['doc']))
+        lines.append('# TYPE %s %s' % (name, sample['type']))
+
+        for key in sorted(sample['series']):
+            val = sample['series'][key]
+
+            if sample['type'] != 'histogram':
+                lines.append('%s%s %s' % (name, '{%s}' % key if key else '', _number(val)))
+                continue
+
+            #CUMULATIVE BUCKETS >> SUM >> COUNT
+            total = 0
+            sep = ',' if key else ''
+            for bound, count in zip(sample['buckets'] + ['+Inf'], val[:-2]):
+                total += count
+                lines.append('%s_bucket{%s%sle="%s"} %d' % (name, key, sep, bound, total))
+            lines.append('%s_sum%s %s' % (name, '{%s}' % key if key else '', _number(val[-2])))
+            lines.append('%s_count%s %d' % (name, '{%s}' % key if key else '', val[-1]))
+
+    return '\n'.join(lines) + '\n'
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION HOLDS THE RETAINED TOTALS LOCK OF A DIRECTORY
+@contextmanager
+def _locked(directory):
+
+    if fcntl is None:
+        yield
+        return
+
+    fdesc = os.open(os.path.join(directory, RETAINED_LOCK), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fdesc, fcntl.LOCK_EX)
+        yield
+    finally:
+        #CLOSING THE FILE RELEASES THE LOCK
+        os.close(fdesc)
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION RETURNS TRUE IF A PROCESS EXISTS
+def _running(pid):
+
+    try:
+        os.kill(pid, 0)
+
+    except OSError as err:
+        #EPERM: THE PROCESS EXISTS, BUT IS OWNED BY ANOTHER USER
+        return err.errno != errno.ESRCH
+
+    return True
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION CREATES A DIRECTORY, OR RAISES AN OSERROR IF IT IS NOT PRIVATE TO THIS USER
+def _make_private(directory):
+
+    if not os.path.lexists(directory):
+        os.makedirs(directory, 0o700)
+
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise OSError('%s must be a directory owned by this user (uid %d), with no group or '
+                      'other permissions.' % (directory, os.getuid()))
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION RETURNS THE COUNTER AND HISTOGRAM SAMPLES (NO GAUGES)
+def _totals(samples):
+
+    return [sample for sample in samples if sample['type'] != 'gauge']
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION READS THE RETAINED TOTALS FILE
+def _load_retained(directory):
+
+    '''
+    PURPOSE:
+    The _load_retained() function returns the retained totals of the
+    directory, as a dictionary of 'folded' (file names) and 'samples';
+    both empty if the file does not exist.
+    '''
+
+    try:
+        with open(os.path.join(directory, RETAINED)) as fjson:
+            retained = json.load(fjson)
+        return dict(folded=retained['folded'], samples=retained['samples'])
+
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return dict(folded=list(), samples=list())
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION FORMATS A SAMPLE VALUE
+def _number(value):
+
+    return repr(float(value))
+
+
+#PROGRAM-WIDE REGISTRY
+REGISTRY = Registry()
@@ -0,0 +1,295 @@
+'''------------------------------------------------------------------------------------------------
+Program:    migrate.py
+Version:    0.2.0
+Py Ver:     2.7
+Purpose:    Versioned database schema migrations, used by the db.DBConn.create() method.
+
+Dependents: os
+            re
+            time
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   This module is shared by the registration and scoreboard programs.  Each program
+            holds its own copy; keep the copies identical.
+
+            Each program owns the tables it creates, and keeps the migrations for those tables
+            in its own db_resource/migrations directory:
+                - registration: avatardata, avatarcatalog, leaderboard
+                - scoreboard:   gamedata
+
+Use:        From the db module:
+            ---------------------
+            import migrate
+
+            migrator = migrate.Migrator(connect=dbc.connect, component='scoreboard',
+                                        path='db_resource/migrations')
+
+            applied = migrator.migrate()
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       Added support for the DELIMITER directive in migration
+                                        files; used for trigger and procedure definitions.
+------------------------------------------------------------------------------------------------'''
+
+import os
+import re
+import time
+
+
+#MIGRATION FILE NAME FORMAT: NNNN_DESCRIPTION.SQL
+RE_FILENAME = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+#ERRORS RAISED WHEN A STATEMENT HAS ALREADY BEEN APPLIED; IGNORED ON RE-RUN
+#1050: TABLE EXISTS, 1060: DUPLICATE COLUMN, 1061: DUPLICATE KEY NAME, 1091: CANNOT DROP
+ERR_APPLIED = (1050, 1060, 1061, 1091)
+
+#VERSION TRACKING TABLE (SHARED BY ALL COMPONENTS)
+QRY_CREATE_VERSION = '''
+CREATE TABLE IF NOT EXISTS schema_version (
+      component     VARCHAR(32)     PRIMARY KEY  NOT NULL
+    , version       INTEGER         NOT NULL
+    , updated       DATETIME        NOT NULL
+    )'''
+
+QRY_GET_VERSION = 'SELECT version FROM schema_version WHERE component = %s'
+
+QRY_SET_VERSION = '''
+INSERT INTO schema_version (component, version, updated) VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE version = VALUES(version), updated = VALUES(updated)'''
+
+
+class MigrationError(Exception):
+
+    '''
+    PURPOSE:
+    Raised when the migration files are invalid, the migration lock
+    cannot be obtained, or a migration fails.
+    '''
+
+    pass
+
+
+class Migrator(object):
+
+    '''
+    PURPOSE:
+    This class brings a component's database tables up to the latest
+    schema version, by applying any migration files which have not
+    yet been applied.  This is used both for new deployments (the
+    first migration creates the tables) and to upgrade existing
+    deployments in place.
+
+    DESIGN:
+    Migration files are stored in the path directory, and are named
+    NNNN_description.sql, where NNNN is the (zero padded) version
+    number.  Migrations are applied in version order.
+
+    A file may contain several statements, each ending with a
+    semi-colon at the end of a line.  Comment lines (starting with
+    '--') are ignored.  As with the mysql client, the DELIMITER
+    directive changes the statement terminator; for statements whose
+    body contains semi-colons, such as triggers and procedures.
+
+    The version applied for each component is stored in the
+    schema_version table, and is updated after each migration is
+    applied.  As MySQL commits DDL statements implicitly, a migration
+    interrupted part way through is re-run from the start; therefore,
+    errors raised for an index, column or table which already exists
+    (or has already been dropped) are ignored.  Data changes in a
+    migration should be written so they can be safely re-run.
+
+    A named database lock (GET_LOCK) is held while migrating, so
+    several programs (or processes) starting at the same time do not
+    apply the same migration twice.
+
+    USE:
+    import migrate
+
+    migrator = migrate.Migrator(connect=dbc.connect, component='scoreboard',
+                                path='db_resource/migrations')
+    applied = migrator.migrate()
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, connect, component, path, lock_timeout=30):
+
+        '''
+        DESIGN:
+        connect:        function returning a database connection
+        component:      name under which the schema version is stored
+        path:           directory containing the migration files
+        lock_timeout:   seconds to wait for the migration lock
+        '''
+
+        self._connect       = connect
+        self._component     = component
+        self._path          = path
+        self._lock_timeout  = lock_timeout
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A SORTED LIST OF THE AVAILABLE MIGRATIONS
+    def migrations(self):
+
+        '''
+        PURPOSE:
+        The migrations() function returns a list of (version, name,
+        filepath) tuples for each migration file, in version order.
+
+        DESIGN:
+        A MigrationError is raised if two files share a version number.
+        Files not matching the naming format are ignored.
+        '''
+
+        found = dict()
+
+        for fname in os.listdir(self._path):
+            match = RE_FILENAME.match(fname)
+            if not match:
+                continue
+
+            version = int(match.group(1))
+            if version in found:
+                raise MigrationError('Duplicate migration version %d: %s, %s'
+                                     % (version, found[version][1], fname))
+
+            found[version] = (version, fname, os.path.join(self._path, fname))
+
+        return [found[version] for version in sorted(found)]
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION APPLIES ALL PENDING MIGRATIONS
+    def migrate(self):
+
+        '''
+        PURPOSE:
+        The migrate() function applies each migration newer than the
+        component's current schema version, and returns a list of the
+        migration file names applied.
+
+        DESIGN:
+        Refer to the class docstring.  If a migration fails, the error
+        is raised as a MigrationError; the version is left at the last
+        successful migration, so the failed migration is re-run on the
+        next call.
+        '''
+
+        applied = list()
+        conn = self._connect()
+
+        try:
+            cur = conn.cursor()
+
+            #GET MIGRATION LOCK
+            cur.execute('SELECT GET_LOCK(%s, %s)', ('schema_migrate', self._lock_timeout))
+            if cur.fetchall()[0][0] != 1:
+                raise MigrationError('Could not get the migration lock after %ss.'
+                                     % self._lock_timeout)
+
+            try:
+                #GET CURRENT VERSION
+                cur.execute(QRY_CREATE_VERSION)
+                current = self._version(cur=cur)
+
+                for version, fname, fpath in self.migrations():
+                    if version <= current:
+                        continue
+
+                    #APPLY MIGRATION >> RECORD VERSION
+                    self._apply(cur=cur, fname=fname, fpath=fpath)
+                    cur.execute(QRY_SET_VERSION, (self._component, version,
+                                                  time.strftime('%Y-%m-%d %H:%M:%S')))
+                    conn.commit()
+                    applied.append(fname)
+
+                    #NOTIFICATION
+                    print 'Applied database migration: %s (%s)' % (fname, self._component)
+
+            finally:
+                #RELEASE MIGRATION LOCK
+                cur.execute('SELECT RELEASE_LOCK(%s)', ('schema_migrate', ))
+                cur.fetchall()
+
+        finally:
+            conn.close()
+
+        return applied
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION RETURNS THE COMPONENT'S CURRENT SCHEMA VERSION
+    def _version(self, cur):
+
+        cur.execute(QRY_GET_VERSION, (self._component, ))
+        rows = cur.fetchall()
+
+        return rows[0][0] if rows else 0
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD TO APPLY A SINGLE MIGRATION FILE
+    def _apply(self, cur, fname, fpath):
+
+        for stmt in split(open(fpath).read()):
+            try:
+                cur.execute(stmt)
+
+            except Exception as err:
+                #TEST FOR AN ALREADY APPLIED STATEMENT (RE-RUN)
+                if getattr(err, 'errno', None) in ERR_APPLIED:
+                    continue
+                raise MigrationError('Migration %s failed: %s' % (fname, err))
+
+
+#-----------------------------------------------------------------------
+#FUNCTION SPLITS A MIGRATION FILE INTO STATEMENTS
+def split(sql):
+
+    '''
+    PURPOSE:
+    The split() function returns a list of the statements contained in
+    a migration file.
+
+    DESIGN:
+    Comment lines (starting with '--') and blank lines are removed.
+    A statement ends with the delimiter (a semi-colon by default) at
+    the end of a line, or at the end of the file.
+
+    A 'DELIMITER <delimiter>' line changes the delimiter used for the
+    following statements, and is not returned as a statement.
+    '''
+
+    stmts = list()
+    lines = list()
+    delim = ';'
+
+    for line in sql.splitlines():
+        #SKIP COMMENTS AND BLANK LINES
+        if not line.strip() or line.strip().startswith('--'):
+            continue
+
+        #TEST FOR DELIMITER DIRECTIVE
+        if line.strip().upper().startswith('DELIMITER '):
+            delim = line.split()[1]
+            continue
+
+        #TEST FOR END OF STATEMENT
+        if line.rstrip().endswith(delim):
+            lines.append(line.rstrip()[:-len(delim)])
+            stmts.append('\n'.join(lines))
+            lines = list()
+        else:
+            lines.append(line)
+
+    #ADD FINAL STATEMENT (NO TRAILING SEMI-COLON)
+    if lines:
+        stmts.append('\n'.join(lines))
+
+    return stmts
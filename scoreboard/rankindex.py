@@ -0,0 +1,232 @@
+'''------------------------------------------------------------------------------------------------
+Program:    rankindex.py
+Version:    0.3.0
+Py Ver:     2.7
+Purpose:    In-process rank index over the completed players' scores, for player rank lookups.
+
+Dependents: bisect
+            threading
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:
+
+Use:        From the app program:
+            ---------------------
+            import rankindex
+
+            ranks = rankindex.RankIndex()
+            ranks.sync(rows=[dict(name='alias', gamehighscore=123.4), ...], version=1)
+            ranks.apply(rows=[dict(seq=2, name='alias', gamehighscore=125.0), ...])
+
+            rank, total = ranks.rank(alias='alias')
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       Players without a score (None) are not held in the index;
+                                        previously a None score raised a TypeError from sync().
+18.10.26    J. Berendt      0.3.0       Added the apply() method, which applies the logged changes
+                                        to the completed players, one player at a time.
+------------------------------------------------------------------------------------------------'''
+
+import bisect
+import threading
+
+
+class RankIndex(object):
+
+    '''
+    PURPOSE:
+    This class holds the scores of all completed players in sorted
+    order, so a player's overall rank ('you placed #N of M') can be
+    found without counting the rows above their score in the
+    database on every lookup.
+
+    DESIGN:
+    The scores are held in a list sorted in descending order (stored
+    as negative values, as the bisect module requires ascending
+    order), along with a dictionary of {alias: score}.
+
+    A rank lookup is a binary search (bisect) of the sorted list;
+    O(log n).  The rank is 1 + the number of higher scores; so tied
+    scores share the same rank, as on the leaderboard.
+
+    The index is seeded by the sync() method, which applies only the
+    differences between the passed rows (all completed players) and
+    the index.  It is then kept up to date by the apply() method, which
+    applies the logged changes to single players (a binary search
+    insert or removal each); so the completed players are not re-read.
+    The index's version is the database's score change counter, as of
+    the last change applied; so the caller can test if an update is
+    due, and read only the later changes.  Single players can also be
+    changed using the update() and remove() methods; for example, when
+    a player is deleted.
+
+    Players without a score (None) are not held in the index; passing
+    a None score removes the player.
+
+    USE:
+    import rankindex
+
+    ranks = rankindex.RankIndex()
+    rank, total = ranks.rank(alias='alias')
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self):
+
+        self._lock      = threading.Lock()
+        self._sorted    = list()
+        self._scores    = dict()
+        self._version   = None
+
+
+    #-------------------------------------------------------------------
+    #PROPERTY RETURNS THE VERSION OF THE LAST SYNC
+    @property
+    def version(self):
+
+        return self._version
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A PLAYER'S RANK AND THE TOTAL NUMBER OF PLAYERS
+    def rank(self, alias):
+
+        '''
+        PURPOSE:
+        The rank() function returns a tuple of the player's rank and
+        the total number of completed players, or None if the player
+        is not in the index.
+        '''
+
+        with self._lock:
+            #TEST FOR PLAYER
+            if alias not in self._scores:
+                return None
+
+            return self._rank(score=self._scores[alias]), len(self._sorted)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE RANK A SCORE WOULD PLACE AT
+    def placing(self, score):
+
+        '''
+        PURPOSE:
+        The placing() function returns a tuple of the rank the passed
+        score would place at, and the total number of completed players
+        including this score; for a player not yet in the index.
+        '''
+
+        with self._lock:
+            return self._rank(score=score), len(self._sorted) + 1
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO ADD OR UPDATE A PLAYER'S SCORE
+    def update(self, alias, score):
+
+        with self._lock:
+            #TEST FOR A SCORE
+            if score is None:
+                self._remove(alias=alias)
+            else:
+                self._update(alias=alias, score=score)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO REMOVE A PLAYER
+    def remove(self, alias):
+
+        with self._lock:
+            self._remove(alias=alias)
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO BRING THE INDEX IN LINE WITH THE DATABASE
+    def sync(self, rows, version):
+
+        '''
+        PURPOSE:
+        The sync() method updates the index to match the passed rows
+        (a list of dictionaries with 'name' and 'gamehighscore' keys,
+        for all completed players).
+
+        DESIGN:
+        Only the players which are new, have a changed score, or are
+        no longer in the rows are updated.  The lock is held for the
+        whole sync, so a lookup never sees a partly synced index.
+        '''
+
+        scores = dict((row['name'], row['gamehighscore']) for row in rows
+                      if row['gamehighscore'] is not None)
+
+        with self._lock:
+            #REMOVE PLAYERS NO LONGER COMPLETE
+            for alias in set(self._scores) - set(scores):
+                self._remove(alias=alias)
+
+            #ADD NEW AND CHANGED PLAYERS
+            for alias, score in scores.items():
+                if self._scores.get(alias) != score:
+                    self._update(alias=alias, score=score)
+
+            self._version = version
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO APPLY THE LOGGED CHANGES TO THE COMPLETED PLAYERS
+    def apply(self, rows):
+
+        '''
+        PURPOSE:
+        The apply() method updates the index from the passed change log
+        rows (a list of dictionaries with 'seq', 'name' and
+        'gamehighscore' keys, in seq order); a None score removes the
+        player.
+
+        DESIGN:
+        Rows at or before the index's version are skipped, as they have
+        already been applied; the version is set to the last row's seq.
+        '''
+
+        with self._lock:
+            for row in rows:
+                if self._version is not None and row['seq'] <= self._version:
+                    continue
+                if row['gamehighscore'] is None:
+                    self._remove(alias=row['name'])
+                else:
+                    self._update(alias=row['name'], score=row['gamehighscore'])
+                self._version = row['seq']
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION RETURNS THE RANK OF A SCORE (LOCK MUST BE HELD)
+    def _rank(self, score):
+
+        #NUMBER OF HIGHER SCORES + 1
+        return bisect.bisect_left(self._sorted, -score) + 1
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD TO ADD OR UPDATE A PLAYER (LOCK MUST BE HELD)
+    def _update(self, alias, score):
+
+        self._remove(alias=alias)
+        self._scores[alias] = score
+        bisect.insort(self._sorted, -score)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD TO REMOVE A PLAYER (LOCK MUST BE HELD)
+    def _remove(self, alias):
+
+        if alias in self._scores:
+            score = self._scores.pop(alias)
+            del self._sorted[bisect.bisect_left(self._sorted, -score)]
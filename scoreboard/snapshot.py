@@ -0,0 +1,767 @@
+'''------------------------------------------------------------------------------------------------
+Program:    snapshot.py
+Version:    0.5.0
+Py Ver:     2.7
+Purpose:    Versioned in-memory cache of the compiled scoreboard data.
+
+Dependents: collections
+            fcntl (Linux; for SharedSnapshot)
+            json
+            mmap
+            os
+            stat
+            struct
+            threading
+            time
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:
+
+Use:        From the app program:
+            ---------------------
+            import snapshot
+
+            snap = snapshot.Snapshot(builder=compile_data, fingerprint=DBC.fingerprint,
+                                     interval=2)
+
+            data = snap.get()
+            version, data = snap.state()
+            snap.wait(version=version, timeout=2)
+            old_data = snap.previous(version=version - 1)
+            snap.invalidate()
+
+            For several worker processes (same interface):
+            snap = snapshot.SharedSnapshot(builder=compile_data, fingerprint=DBC.fingerprint,
+                                           interval=2, path='/tmp/scoreboard_run/snapshot.bin')
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written.  pylint (10/10)
+18.10.26    J. Berendt      0.2.0       Added state() and wait() functions, and the token
+                                        property; used by the scoreboard's update stream.
+18.10.26    J. Berendt      0.3.0       Added a short history of previous snapshots, and the
+                                        previous() function; used to build delta updates.
+18.10.26    J. Berendt      0.4.0       Added the SharedSnapshot class; a snapshot shared by
+                                        several worker processes through a memory-mapped file,
+                                        built by a single elected process.
+18.10.26    J. Berendt      0.4.1       BUG: Two processes calling invalidate() at the same time
+                                        could lose an increment of the shared invalidation
+                                        counter; the change was then not rebuilt until the next
+                                        fingerprint check.
+                                        FIX: The counter is incremented under a record lock
+                                        (lockf) on the counter's bytes in the file.
+18.10.26    J. Berendt      0.5.0       BUG: The shared file was decoded with pickle by every
+                                        worker, and a file created by another user (at the
+                                        same path) was accepted; so another local user could
+                                        run code in the workers.
+                                        FIX: The data is stored as JSON.  The file's directory
+                                        is created with mode 0700; the directory and file must
+                                        be owned by this user with no group or other
+                                        permissions, and the file is not opened through a
+                                        symbolic link.  An unsafe file raises an OSError.
+------------------------------------------------------------------------------------------------'''
+
+import json
+import mmap
+import os
+import stat
+import struct
+import threading
+import time
+
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    #NOT AVAILABLE ON WINDOWS; SHAREDSNAPSHOT CANNOT BE USED
+    fcntl = None
+
+
+#SHARED SNAPSHOT FILE HEADER:
+#MAGIC, SEQUENCE, TOKEN, VERSION, LENGTH, SERVED, INVALIDATED, LEADER PID
+HEADER          = struct.Struct('<8sQQQQQQQ')
+HEADER_SIZE     = 64
+MAGIC           = 'SBSNAP02'
+#OFFSETS OF THE FIELDS WRITTEN INDIVIDUALLY
+OFF_SEQ         = 8
+OFF_DATA        = 16
+OFF_INVALIDATED = 48
+OFF_PID         = 56
+#TOKEN, VERSION, LENGTH, SERVED
+DATA            = struct.Struct('<QQQQ')
+COUNTER         = struct.Struct('<Q')
+
+
+class Snapshot(object):
+
+    '''
+    PURPOSE:
+    This class holds a single compiled copy of the scoreboard data,
+    along with a version number, so every display shares the same
+    result rather than each page load querying the database.
+
+    DESIGN:
+    The snapshot is rebuilt (using the builder function) only when:
+        - invalidate() has been called; for example after a player_*
+          action has changed a player's state
+        - the fingerprint of the underlying table has changed
+
+    The fingerprint function is called at most once per (interval)
+    seconds, regardless of the number of displays requesting data.
+    This keeps the database load flat as more screens are added.
+
+    Each successful rebuild increments the version number.  If a
+    rebuild fails (the builder returns an empty dictionary), the last
+    good data is kept and the rebuild is retried on the next check.
+
+    The version number restarts at 1 each time the program starts,
+    therefore the token property (unique to each instance) should be
+    combined with the version number when it is passed to a client.
+
+    Callers can block on the wait() function until the snapshot is
+    rebuilt, or invalidated, rather than polling.
+
+    The last (n) snapshots are kept, as defined by the history
+    argument, so a caller can build a delta between the snapshot a
+    client last received and the current snapshot.
+
+    USE:
+    import snapshot
+
+    snap = snapshot.Snapshot(builder=compile_data, fingerprint=DBC.fingerprint,
+                             interval=2)
+    data = snap.get()
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    def __init__(self, builder, fingerprint, interval, history=16):
+
+        '''
+        DESIGN:
+        builder:     function returning the compiled data dictionary
+        fingerprint: function returning a value which changes when the
+                     underlying table(s) change
+        interval:    minimum number of seconds between fingerprint
+                     checks
+        history:     number of previous snapshots to keep
+        '''
+
+        self._builder       = builder
+        self._fingerprint   = fingerprint
+        self._interval      = interval
+        self._lock          = threading.Condition(threading.Lock())
+        self._token         = '%x' % int(time.time() * 1000)
+        self._data          = dict()
+        self._version       = 0
+        self._print         = None
+        self._checked       = 0
+        self._stale         = True
+        self._history       = OrderedDict()
+        self._history_size  = history
+
+
+    #-------------------------------------------------------------------
+    #PROPERTY RETURNS THE CURRENT SNAPSHOT VERSION NUMBER
+    @property
+    def version(self):
+
+        return self._version
+
+
+    #-------------------------------------------------------------------
+    #PROPERTY RETURNS THE TOKEN UNIQUE TO THIS SNAPSHOT INSTANCE
+    @property
+    def token(self):
+
+        return self._token
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO FORCE A REBUILD ON THE NEXT CALL TO get()
+    def invalidate(self):
+
+        '''
+        PURPOSE:
+        The invalidate() method is called after the application changes
+        a player's state, so the next get() call rebuilds the snapshot
+        without waiting for the fingerprint check interval.
+        '''
+
+        with self._lock:
+            self._stale = True
+            #WAKE ANY WAITING CALLERS
+            self._lock.notify_all()
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO BLOCK UNTIL THE SNAPSHOT CHANGES
+    def wait(self, version, timeout):
+
+        '''
+        PURPOSE:
+        The wait() method blocks the caller until the snapshot version
+        differs from the passed version, the snapshot is invalidated,
+        or the timeout (in seconds) expires.
+
+        DESIGN:
+        The caller should call state() after wait() returns, as state()
+        performs the rebuild and/or fingerprint check.
+        '''
+
+        with self._lock:
+            if self._version == version and not self._stale:
+                self._lock.wait(timeout)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A PREVIOUS SNAPSHOT
+    def previous(self, version):
+
+        '''
+        PURPOSE:
+        The previous() function returns the data for the passed
+        snapshot version, or None if the version is no longer held in
+        the history.
+        '''
+
+        with self._lock:
+            return self._history.get(version)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CURRENT SNAPSHOT, REBUILDING IF REQUIRED
+    def get(self):
+
+        '''
+        PURPOSE:
+        The get() function returns the compiled scoreboard data.
+        Refer to the docstring for state().
+        '''
+
+        return self.state()[1]
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CURRENT VERSION AND SNAPSHOT
+    def state(self):
+
+        '''
+        PURPOSE:
+        The state() function returns a tuple of the snapshot version
+        and the compiled scoreboard data.
+
+        DESIGN:
+        The lock is held while the fingerprint is checked and the data
+        is rebuilt; therefore concurrent callers wait for the single
+        rebuild rather than each starting their own.
+
+        When a new snapshot is built, any callers blocked on wait() are
+        woken.
+        '''
+
+        with self._lock:
+
+            #TEST IF A FINGERPRINT CHECK IS DUE
+            now = time.time()
+            if not self._stale and now - self._checked < self._interval:
+                return self._version, self._data
+
+            self._checked = now
+            fprint = self._fingerprint()
+
+            #REBUILD IF INVALIDATED OR THE TABLE HAS CHANGED
+            if self._stale or fprint is None or fprint != self._print:
+                data = self._builder()
+                self._stale = False
+
+                #KEEP THE LAST GOOD DATA IF THE BUILD FAILED
+                #(THE FINGERPRINT IS NOT STORED, SO THE BUILD IS RETRIED)
+                if data:
+                    self._data    = data
+                    self._version += 1
+                    self._print   = fprint
+                    #ADD TO HISTORY >> DROP THE OLDEST SNAPSHOTS
+                    self._history[self._version] = data
+                    while len(self._history) > self._history_size:
+                        self._history.popitem(last=False)
+                    #WAKE ANY WAITING CALLERS
+                    self._lock.notify_all()
+
+            return self._version, self._data
+
+
+class SharedSnapshot(object):
+
+    '''
+    PURPOSE:
+    This class provides the same interface as the Snapshot class;
+    however the compiled data is shared by all worker processes on the
+    host (for example, the gunicorn workers), through a memory-mapped
+    file.  Only one process queries the database; so the database load
+    is one fingerprint check per interval, and one rebuild per change,
+    regardless of the number of workers or displays.
+
+    DESIGN:
+    Leader election:
+    Each process starts a background thread, which tries to take an
+    exclusive lock (flock) on the snapshot file.  The process holding
+    the lock (the leader) checks the fingerprint and rebuilds the
+    snapshot, using the same rules as the Snapshot class, and writes it
+    to the file.  The lock is released by the operating system if the
+    leader exits, and is then taken by another process.
+
+    File layout:
+    A fixed size header (refer to HEADER), followed by the snapshot data
+    (as JSON).  The header holds the token, version and length of the
+    current data.  The token and version are carried over when a new
+    leader is elected; so a state version sent to a client remains
+    valid whichever worker serves the client.
+
+    Seqlock:
+    The leader increments the header's sequence number before writing
+    (making it odd) and again after writing (making it even).  A reader
+    copies the header and data, then re-reads the sequence number; if
+    it was odd, or has changed, the read is retried.  Readers never
+    block the leader, and never see a partly written snapshot.
+
+    Readers:
+    Each process's background thread checks the header every (poll)
+    seconds.  The data is only read and decoded when the version has
+    changed; then the on_load function (if passed) is called with the
+    new data, and any callers blocked on wait() are woken.  Between
+    changes, state() returns the decoded data without reading the
+    file.
+
+    Invalidation:
+    invalidate() increments the header's invalidation counter, which
+    the leader checks every (poll) seconds.  The increment is made
+    under a record lock (lockf) on the counter's bytes, so concurrent
+    increments by several processes are not lost.  (The leader's flock
+    is held for as long as the process leads, and is a separate lock
+    on Linux; so the record lock does not wait for the leader.)  The leader records the
+    counter value each snapshot was built after (served); state()
+    waits (up to interval seconds) until this process's invalidation
+    has been served, so a caller always sees its own change.
+
+    The file's data area is (size) bytes.  If a snapshot is larger, an
+    error is printed and the previous snapshot is kept.
+
+    Security:
+    Every worker decodes the data written to the file; so the data is
+    stored as JSON (which cannot run code, unlike pickle), and the file
+    must be private to this user (refer to _open_private()).  An
+    OSError is raised on creation if it is not.
+
+    USE:
+    import snapshot
+
+    snap = snapshot.SharedSnapshot(builder=compile_data, fingerprint=DBC.fingerprint,
+                                   interval=2, path='/tmp/scoreboard_run/snapshot.bin')
+    data = snap.get()
+    '''
+
+    #-------------------------------------------------------------------
+    #INITIALISATION
+    #pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, builder, fingerprint, interval, path, size=8388608, history=16,
+                 poll=0.1, on_load=None):
+
+        '''
+        DESIGN:
+        builder:     function returning the compiled data dictionary
+        fingerprint: function returning a value which changes when the
+                     underlying table(s) change
+        interval:    minimum number of seconds between fingerprint
+                     checks
+        path:        path to the shared snapshot file; its directory
+                     is created (mode 0700) if required
+        size:        size of the file's data area, in bytes
+        history:     number of previous snapshots to keep
+        poll:        seconds between checks of the file's header
+        on_load:     function called with the data of each snapshot
+                     read from the file
+        '''
+
+        self._builder       = builder
+        self._fingerprint   = fingerprint
+        self._interval      = interval
+        self._poll          = poll
+        self._on_load       = on_load
+        self._cond          = threading.Condition(threading.Lock())
+        self._token         = ''
+        self._data          = dict()
+        self._version       = 0
+        self._served        = 0
+        self._pending       = 0
+        self._history       = OrderedDict()
+        self._history_size  = history
+        #LEADER STATE
+        self._leader        = False
+        self._print         = None
+        self._checked       = 0
+        self._failed        = 0
+        self._handled       = None
+
+        #OPEN (OR CREATE) THE PRIVATE SHARED FILE >> MAP INTO MEMORY
+        self._fd = _open_private(path=path)
+        if os.fstat(self._fd).st_size < HEADER_SIZE + size:
+            os.ftruncate(self._fd, HEADER_SIZE + size)
+        self._mm = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        self._capacity = len(self._mm) - HEADER_SIZE
+
+        #START THE BACKGROUND THREAD
+        thread = threading.Thread(target=self._run, name='snapshot')
+        thread.daemon = True
+        thread.start()
+
+
+    #-------------------------------------------------------------------
+    #PROPERTY RETURNS THE CURRENT SNAPSHOT VERSION NUMBER
+    @property
+    def version(self):
+
+        return self._version
+
+
+    #-------------------------------------------------------------------
+    #PROPERTY RETURNS THE TOKEN SHARED BY ALL PROCESSES
+    @property
+    def token(self):
+
+        return self._token
+
+
+    #-------------------------------------------------------------------
+    #PROPERTY RETURNS TRUE IF THIS PROCESS BUILDS THE SNAPSHOT
+    @property
+    def leader(self):
+
+        return self._leader
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO FORCE A REBUILD BY THE LEADER
+    def invalidate(self):
+
+        '''
+        PURPOSE:
+        The invalidate() method is called after the application changes
+        a player's state; the leader rebuilds the snapshot on its next
+        check (within poll seconds).
+        '''
+
+        with self._cond:
+            #INCREMENT THE SHARED COUNTER (LOCKED AGAINST OTHER PROCESSES)
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, COUNTER.size, OFF_INVALIDATED)
+            try:
+                counter = COUNTER.unpack_from(self._mm, OFF_INVALIDATED)[0] + 1
+                COUNTER.pack_into(self._mm, OFF_INVALIDATED, counter)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, COUNTER.size, OFF_INVALIDATED)
+            self._pending = counter
+            #WAKE THE BACKGROUND THREAD (IF THIS PROCESS IS THE LEADER)
+            self._cond.notify_all()
+
+
+    #-------------------------------------------------------------------
+    #METHOD USED TO BLOCK UNTIL THE SNAPSHOT CHANGES
+    def wait(self, version, timeout):
+
+        '''
+        PURPOSE:
+        The wait() method blocks the caller until a new snapshot is
+        read, or the timeout (in seconds) expires.
+        '''
+
+        with self._cond:
+            if self._version == version and self._served >= self._pending:
+                self._cond.wait(timeout)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS A PREVIOUS SNAPSHOT
+    def previous(self, version):
+
+        '''
+        PURPOSE:
+        The previous() function returns the data for the passed
+        snapshot version, or None if the version was not read by this
+        process, or is no longer held in the history.
+        '''
+
+        with self._cond:
+            return self._history.get(version)
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CURRENT SNAPSHOT
+    def get(self):
+
+        return self.state()[1]
+
+
+    #-------------------------------------------------------------------
+    #FUNCTION RETURNS THE CURRENT VERSION AND SNAPSHOT
+    def state(self):
+
+        '''
+        PURPOSE:
+        The state() function returns a tuple of the snapshot version
+        and the compiled scoreboard data.
+
+        DESIGN:
+        If no snapshot has been read yet (on startup), or this process
+        has invalidated the snapshot and the leader has not yet
+        rebuilt it, the caller waits up to interval seconds for the
+        leader; then the latest snapshot is returned.
+        '''
+
+        deadline = time.time() + self._interval
+
+        with self._cond:
+            self._load()
+
+            while not self._data or self._served < self._pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                self._load()
+
+            return self._version, self._data
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD RUN BY THE BACKGROUND THREAD
+    def _run(self):
+
+        while True:
+            try:
+                #TRY TO BECOME THE LEADER >> REBUILD IF DUE
+                if not self._leader:
+                    self._leader = self._elect()
+                if self._leader:
+                    self._refresh()
+
+                #READ ANY NEW SNAPSHOT >> WAIT FOR THE NEXT CHECK
+                with self._cond:
+                    self._load()
+                    self._cond.wait(self._poll)
+
+            except Exception as err:
+                #NOTIFICATION
+                print 'ERR: Shared snapshot update failed.'
+                print 'ERR: %s' % err
+                time.sleep(self._interval)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE FUNCTION TRIES TO TAKE THE LEADER LOCK
+    def _elect(self):
+
+        '''
+        PURPOSE:
+        The _elect() function returns True if this process has taken
+        the leader lock.
+
+        DESIGN:
+        The new leader continues the token and version found in the
+        file, if valid; otherwise a new token is created.  The first
+        check after election always rebuilds the snapshot.
+        '''
+
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        except (IOError, OSError):
+            return False
+
+        fields = HEADER.unpack_from(self._mm, 0)
+        if fields[0] != MAGIC:
+            token = int(time.time() * 1000)
+            self._write(payload='', token=token, version=0, served=0)
+            self._mm[0:len(MAGIC)] = MAGIC
+
+        COUNTER.pack_into(self._mm, OFF_PID, os.getpid())
+        self._print = None
+        self._handled = None
+
+        return True
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD USED BY THE LEADER TO REBUILD THE SNAPSHOT IF DUE
+    def _refresh(self):
+
+        '''
+        PURPOSE:
+        The _refresh() method rebuilds and writes the snapshot if it
+        has been invalidated, or if the fingerprint check is due and
+        the fingerprint has changed.
+
+        DESIGN:
+        A failed build (empty dictionary) is retried after interval
+        seconds.  The database is not queried while the lock is held;
+        readers in this process are not blocked by a rebuild.
+        '''
+
+        now = time.time()
+        invalidated = COUNTER.unpack_from(self._mm, OFF_INVALIDATED)[0]
+        stale = self._handled is None or invalidated != self._handled
+
+        #TEST IF A REBUILD OR FINGERPRINT CHECK IS DUE
+        if now - self._failed < self._interval:
+            return
+        if not stale and now - self._checked < self._interval:
+            return
+
+        self._checked = now
+        fprint = self._fingerprint()
+
+        if not stale and fprint is not None and fprint == self._print:
+            return
+
+        #REBUILD >> KEEP THE LAST GOOD DATA IF THE BUILD FAILED
+        data = self._builder()
+        payload = json.dumps(data, separators=(',', ':')) if data else ''
+        if not data or len(payload) > self._capacity:
+            if data:
+                print 'ERR: Snapshot (%d bytes) exceeds the shared file size (%d bytes).' \
+                      % (len(payload), self._capacity)
+            self._failed = now
+            return
+
+        #WRITE THE NEW SNAPSHOT
+        token, version = DATA.unpack_from(self._mm, OFF_DATA)[:2]
+        self._write(payload=payload, token=token, version=version + 1, served=invalidated)
+        self._print = fprint
+        self._handled = invalidated
+
+        #PUBLISH LOCALLY WITHOUT RE-READING THE FILE
+        with self._cond:
+            self._store(token=token, version=version + 1, served=invalidated, data=data)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD USED BY THE LEADER TO WRITE TO THE FILE (SEQLOCK)
+    def _write(self, payload, token, version, served):
+
+        #MARK WRITE IN PROGRESS (ODD) >> WRITE >> MARK COMPLETE (EVEN)
+        seq = COUNTER.unpack_from(self._mm, OFF_SEQ)[0]
+        seq += 1 if seq % 2 == 0 else 0
+        COUNTER.pack_into(self._mm, OFF_SEQ, seq)
+        self._mm[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        DATA.pack_into(self._mm, OFF_DATA, token, version, len(payload), served)
+        COUNTER.pack_into(self._mm, OFF_SEQ, seq + 1)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD READS A NEW SNAPSHOT FROM THE FILE (LOCK MUST BE HELD)
+    def _load(self):
+
+        '''
+        PURPOSE:
+        The _load() method reads the file header and, if the version
+        has changed, the snapshot data (refer to the class docstring
+        for the seqlock read).
+        '''
+
+        #RETRY A READ WHICH OVERLAPPED A WRITE (AT MOST ~1 SECOND)
+        for _ in range(1000):
+            seq = COUNTER.unpack_from(self._mm, OFF_SEQ)[0]
+            if seq % 2:
+                time.sleep(0.001)
+                continue
+
+            #READ HEADER >> READ DATA ONLY IF NEW
+            magic, _, token, version, length, served = HEADER.unpack_from(self._mm, 0)[:6]
+            payload = None
+            if version != self._version:
+                payload = self._mm[HEADER_SIZE:HEADER_SIZE + length]
+
+            #TEST FOR A CONSISTENT READ
+            if COUNTER.unpack_from(self._mm, OFF_SEQ)[0] == seq:
+                break
+        else:
+            #WRITE NOT COMPLETED (LEADER EXITED); KEEP THE CURRENT DATA
+            return
+
+        if magic != MAGIC or not length:
+            return
+
+        if payload is None:
+            #SAME SNAPSHOT >> UPDATE THE SERVED COUNTER ONLY
+            if served != self._served:
+                self._served = served
+                self._cond.notify_all()
+            return
+
+        data = json.loads(payload)
+        if self._on_load:
+            self._on_load(data)
+        self._store(token=token, version=version, served=served, data=data)
+
+
+    #-------------------------------------------------------------------
+    #PRIVATE METHOD USED TO STORE A NEW SNAPSHOT LOCALLY (LOCK MUST BE HELD)
+    def _store(self, token, version, served, data):
+
+        self._token   = '%x' % token
+        self._version = version
+        self._served  = served
+        self._data    = data
+        #ADD TO HISTORY >> DROP THE OLDEST SNAPSHOTS
+        self._history[version] = data
+        while len(self._history) > self._history_size:
+            self._history.popitem(last=False)
+        #WAKE ANY WAITING CALLERS
+        self._cond.notify_all()
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION OPENS (OR CREATES) THE SHARED FILE, REFUSING AN UNSAFE FILE
+def _open_private(path):
+
+    '''
+    PURPOSE:
+    The _open_private() function returns a file descriptor for the
+    shared snapshot file, creating the file and its directory if
+    required.
+
+    DESIGN:
+    The directory is created with mode 0700, and the file with mode
+    0600.  An existing directory or file (for example, created first
+    by another user) must be owned by this user, with no group or
+    other permissions; and the file is not opened through a symbolic
+    link (O_NOFOLLOW).  Otherwise, an OSError is raised.
+    '''
+
+    #CREATE (OR TEST) THE DIRECTORY
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.lexists(directory):
+        os.makedirs(directory, 0o700)
+    _test_private(info=os.lstat(directory), kind=stat.S_ISDIR, path=directory)
+
+    #OPEN (OR CREATE) THE FILE >> TEST THE OPENED FILE
+    fdesc = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        _test_private(info=os.fstat(fdesc), kind=stat.S_ISREG, path=path)
+    except OSError:
+        os.close(fdesc)
+        raise
+
+    return fdesc
+
+
+#-----------------------------------------------------------------------
+#PRIVATE FUNCTION RAISES AN OSERROR IF A FILE IS NOT PRIVATE TO THIS USER
+def _test_private(info, kind, path):
+
+    if not kind(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise OSError('%s must be owned by this user (uid %d), with no group or other '
+                      'permissions.' % (path, os.getuid()))
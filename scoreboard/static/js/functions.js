@@ -15,4 +15,232 @@
                 cells[i].style.fontSize =   '1.2em';
             }
         }
-    }
\ No newline at end of file
+    }
+
+    // FUNCTION USED TO PROMPT IF A PLAYER SHOULD BE DELETED
+    function promptBeforeDelete(alias) {
+
+        // GET USER REPLY
+        var reply = confirm('Are you sure you want to delete: ' + alias);
+
+        // TEST REPLY
+        if (reply) {
+            // LOAD PYTHON player_delete() FUNCTION PASSING ALIAS
+            window.location.href = "/player_delete?alias=" + alias;
+        }
+    }
+
+
+    // SECONDS TO WAIT FOR ANY MESSAGE (UPDATE OR PING) BEFORE THE STREAM IS CONSIDERED DROPPED
+    var STREAM_TIMEOUT = 45;
+    // SECONDS BETWEEN STATE REQUESTS WHEN THE STREAM IS NOT AVAILABLE
+    var POLL_INTERVAL = 2;
+
+    // URL OF THE JSON STATE API, AND THE VERSION OF THE STATE SHOWN ON THE PAGE
+    var stateUrl = null;
+    var stateVersion = null;
+
+    // FUNCTION USED TO CONNECT TO THE SCOREBOARD UPDATE STREAM
+    function startStream(url, apiUrl, version) {
+
+        var lastMessage = new Date().getTime();
+
+        // STORE STATE API DETAILS (USED BY THE POLLING FALLBACK)
+        stateUrl = apiUrl;
+        stateVersion = version;
+
+        // APPLY STATUS FONT COLOUR TO THE INITIAL PAGE
+        updateStatusColour();
+
+        // FALL BACK TO POLLING IF THE BROWSER DOES NOT SUPPORT STREAMS
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
+
+        var source = new EventSource(url);
+
+        // NEW SCOREBOARD STATE
+        source.addEventListener('update', function(event) {
+            lastMessage = new Date().getTime();
+            stateVersion = event.lastEventId;
+            applyUpdate(JSON.parse(event.data));
+        });
+
+        // KEEP-ALIVE
+        source.addEventListener('ping', function(event) {
+            lastMessage = new Date().getTime();
+        });
+
+        // THE BROWSER RECONNECTS AUTOMATICALLY, UNLESS THE STREAM HAS BEEN CLOSED
+        source.onerror = function() {
+            if (source.readyState == EventSource.CLOSED) {
+                clearInterval(watchdog);
+                startPolling();
+            }
+        };
+
+        // WATCHDOG: FALL BACK TO POLLING IF THE STREAM HAS GONE QUIET
+        var watchdog = setInterval(function() {
+            if (new Date().getTime() - lastMessage > STREAM_TIMEOUT * 1000) {
+                clearInterval(watchdog);
+                source.close();
+                startPolling();
+            }
+        }, 5000);
+    }
+
+    // FUNCTION USED TO POLL THE STATE API (FALLBACK FOR A LOST STREAM)
+    function startPolling() {
+
+        setInterval(pollState, POLL_INTERVAL * 1000);
+    }
+
+    // FUNCTION USED TO REQUEST THE CHANGES SINCE THE STATE SHOWN ON THE PAGE
+    function pollState() {
+
+        var xhr = new XMLHttpRequest();
+
+        xhr.open('GET', stateUrl + '?since=' + encodeURIComponent(stateVersion));
+        // SERVER RETURNS 304 (NO BODY) IF NOTHING HAS CHANGED
+        xhr.setRequestHeader('If-None-Match', '"' + stateVersion + '"');
+        xhr.onload = function() {
+            if (xhr.status == 200) {
+                applyState(JSON.parse(xhr.responseText));
+            }
+        };
+        xhr.send();
+    }
+
+    // FUNCTION USED TO REPLACE THE SCOREBOARD CONTENT WITH A NEW STATE (FROM THE STREAM)
+    function applyUpdate(state) {
+
+        document.getElementById('now-playing').innerHTML = state.playing;
+        document.getElementById('queue-rows').innerHTML = state.queue;
+        document.getElementById('score-rows').innerHTML = state.score;
+
+        updateProfile(state.profile);
+        updateStatusColour();
+    }
+
+    // FUNCTION USED TO PATCH THE SCOREBOARD CONTENT WITH A STATE FROM THE STATE API
+    function applyState(state) {
+
+        // NOW PLAYING
+        if (state.playing) {
+            var table = document.getElementById('now-playing');
+            var row = playingRow(state.playing);
+            if (table.rows.length > 0) {
+                table.rows[0].parentNode.replaceChild(row, table.rows[0]);
+            } else {
+                table.appendChild(row);
+            }
+        }
+
+        // QUEUE AND SCOREBOARD ROWS (ONLY THE CHANGED ROWS ARE REPLACED)
+        if (state.queue) {
+            patchRows('queue-rows', state.queue, state.delta, queueRow);
+        }
+        if (state.score) {
+            patchRows('score-rows', state.score, state.delta, scoreRow);
+        }
+
+        if (state.profile) {
+            updateProfile(state.profile);
+        }
+
+        stateVersion = state.version;
+        updateStatusColour();
+    }
+
+    // FUNCTION USED TO PATCH A TABLE BODY, ROW BY ROW
+    function patchRows(id, data, isDelta, buildRow) {
+
+        var tbody = document.getElementById(id);
+        // A DELTA HOLDS {length, rows: {index: row}}; A FULL STATE HOLDS A LIST OF ROWS
+        var rows = isDelta ? data.rows : data;
+        var length = data.length;
+
+        for (var idx in rows) {
+            var row = buildRow(rows[idx]);
+            if (idx < tbody.rows.length) {
+                tbody.replaceChild(row, tbody.rows[idx]);
+            } else {
+                tbody.appendChild(row);
+            }
+        }
+
+        // REMOVE ROWS BEYOND THE NEW LENGTH
+        while (tbody.rows.length > length) {
+            tbody.deleteRow(-1);
+        }
+    }
+
+    // FUNCTION USED TO ONLY RELOAD THE PROFILE GRAPH IF IT HAS CHANGED
+    function updateProfile(url) {
+
+        var profile = document.getElementById('profile');
+        if (profile.getAttribute('src') != url) {
+            profile.setAttribute('src', url);
+        }
+    }
+
+    // FUNCTIONS USED TO BUILD TABLE ROWS (MATCHING THE MACROS IN _macros.html)
+    function cell(row, content, href) {
+
+        var td = row.insertCell(-1);
+
+        // WRAP CONTENT IN A LINK, IF REQUIRED
+        if (href) {
+            var link = document.createElement('a');
+            link.href = href;
+            td.appendChild(link);
+            td = link;
+        }
+
+        if (typeof content == 'object') {
+            td.appendChild(content);
+        } else {
+            td.appendChild(document.createTextNode(content));
+        }
+    }
+
+    function avatarImage(avatar, size) {
+
+        var img = document.createElement('img');
+        img.height = size;
+        img.width = size;
+        img.src = '/avatar/' + avatar + '?size=' + size;
+        return img;
+    }
+
+    function playingRow(data) {
+
+        var row = document.createElement('tr');
+        row.className = 'player';
+        cell(row, data.name);
+        cell(row, data.avatar ? avatarImage(data.avatar, 200) : '');
+        row.cells[0].className = 'player-name no-border';
+        row.cells[1].className = 'no-border';
+        return row;
+    }
+
+    function queueRow(data) {
+
+        var row = document.createElement('tr');
+        var alias = encodeURIComponent(data.name);
+        cell(row, data.status, '/player_playing?alias=' + alias);
+        cell(row, data.name, '/player_move?alias=' + alias);
+        cell(row, avatarImage(data.avatar, 40), "javascript:promptBeforeDelete('" + alias + "');");
+        return row;
+    }
+
+    function scoreRow(data) {
+
+        var row = document.createElement('tr');
+        cell(row, data.rank);
+        cell(row, data.gamehighscore);
+        cell(row, data.name);
+        cell(row, avatarImage(data.avatar, 40));
+        return row;
+    }